@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the throughput of enumeration codecs against per value lookups
+
+Run with ``python benchmarks/bench_codec.py``
+"""
+import argparse
+import time
+
+import numpy as np
+
+from property_rosetta.dictionary import DictionaryEnumeration
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def make_enumeration(values: int, stride: int) -> DictionaryEnumeration:
+    return DictionaryEnumeration.from_dict(None, {
+        'id': 'bench', 'name': 'Bench',
+        'values': [{'id': f'value{i}', 'integral_value': i * stride}
+                   for i in range(values)]})
+
+
+def rate(rows: int, f) -> str:
+    start = time.perf_counter()
+    f()
+    elapsed = time.perf_counter() - start
+    return f"{rows / elapsed / 1e6:8.2f} M rows/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--values", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    for name, stride in [('dense', 1), ('sparse', 1000003)]:
+        enumeration = make_enumeration(args.values, stride)
+        codec = enumeration.codec()
+        picks = rng.integers(0, args.values, args.rows)
+        ids = np.array([v.id for v in enumeration.values])[picks]
+        objects = ids.astype(object)
+        integrals = codec.encode(ids)
+        print(f"{name} enumeration of {args.values} values, {args.rows} rows")
+        print(f"{'encode str array':>24}: {rate(args.rows, lambda: codec.encode(ids))}")
+        print(f"{'encode object array':>24}: {rate(args.rows, lambda: codec.encode(objects))}")
+        print(f"{'decode':>24}: {rate(args.rows, lambda: codec.decode(integrals))}")
+        by_id, by_integral = enumeration.value_for_id, enumeration.value_for_integral
+        print(f"{'value_for_id loop':>24}: "
+              f"{rate(args.rows, lambda: [by_id(i).integral_value for i in objects])}")
+        print(f"{'value_for_integral loop':>24}: "
+              f"{rate(args.rows, lambda: [by_integral(i).id for i in integrals.tolist()])}")
+
+
+if __name__ == "__main__":
+    main()
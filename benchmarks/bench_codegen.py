@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Measures template loading, rendering, whole and incremental code generation times
+
+Run with ``python benchmarks/bench_codegen.py``
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from property_rosetta.codegen import Generator, generate
+from property_rosetta.dictionary import Dictionary
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+ENTITY_TEMPLATE = '''class {{ entity.id | identifier | pascalize }}(object):
+    """{{ entity.name }}"""
+{% for property in properties %}
+    # {{ property.name }}: {{ type_of(property).name }}
+    {{ property.id | identifier | decamelize }} = {{ attributes_of(property) | dictsort }}
+
+    def get_{{ property.id | identifier | decamelize }}(self):
+        return self.{{ property.id | identifier | camelize }}
+{% endfor %}
+'''
+
+
+def timed(f):
+    start = time.perf_counter()
+    ret = f()
+    return time.perf_counter() - start, ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=400)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=4)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        path = generate_dictionary(root / 'dictionary', args.entities, args.properties)
+        templates = root / 'templates'
+        (templates / 'entity').mkdir(parents=True)
+        (templates / 'entity' / '{{ entity.id | identifier }}.py.j2').write_text(ENTITY_TEMPLATE)
+        template = 'entity/{{ entity.id | identifier }}.py.j2'
+        for name, cache in [('no cache', False), ('cold cache', True), ('warm cache', True)]:
+            generator = Generator(templates, root / 'cache', cache)
+            elapsed, _ = timed(lambda: generator.environment.get_template(template))
+            print(f"{'template load, ' + name:>32}: {elapsed * 1000:.2f}ms")
+        dictionary = Dictionary.from_yaml_dictionary(path)
+        elapsed, _ = timed(lambda: [generator.render_entity(e) for e in dictionary.entities])
+        print(f"{'render only':>32}: {elapsed:.3f}s")
+        for name, workers in [('sequential', None), (f'{args.jobs} processes', args.jobs)]:
+            elapsed, report = timed(lambda: generate(
+                path, templates, root / 'out', workers=workers, cache_dir=root / 'cache',
+                force=True))
+            print(f"{'load and generate, ' + name:>32}: {elapsed:.3f}s, "
+                  f"{len(report.outputs)} files")
+        elapsed, report = timed(lambda: generate(
+            path, templates, root / 'out', cache_dir=root / 'cache'))
+        print(f"{'rerun, nothing changed':>32}: {elapsed:.3f}s, {report.rendered} rendered")
+        properties = sorted((path.parent / 'properties-by-entity').iterdir())[0]
+        properties.write_text(properties.read_text().replace('name: ', 'name: Renamed ', 1))
+        elapsed, report = timed(lambda: generate(
+            path, templates, root / 'out', cache_dir=root / 'cache'))
+        print(f"{'rerun, one entity changed':>32}: {elapsed:.3f}s, {report.rendered} rendered, "
+              f"{len(report.written)} written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the comparison of two versions of a dictionary
+
+Run with ``python benchmarks/bench_diff.py``
+"""
+import argparse
+import tempfile
+import time
+
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.diff import diff
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=400)
+    parser.add_argument("--properties", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties, enumerations=50)
+        old = Dictionary.from_yaml_dictionary(path)
+        new = Dictionary.from_yaml_dictionary(path)
+        new.entities[0].properties[0].type_id = 'string'
+        new.entities[1].properties[0].description = 'changed'
+        new.reindex()
+        for name, other in [('identical', Dictionary.from_yaml_dictionary(path)),
+                            ('two entities changed', new)]:
+            start = time.perf_counter()
+            result = diff(old, other)
+            elapsed = time.perf_counter() - start
+            properties = args.entities * args.properties
+            print(f"{name:>24}: {elapsed * 1000:.1f}ms, {len(result.changes)} changes, "
+                  f"{elapsed * 1e9 / properties:.0f}ns per property")
+
+
+if __name__ == "__main__":
+    main()
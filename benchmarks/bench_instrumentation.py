@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the cost of instrumenting dictionary loads, and where their time goes
+
+Run with ``python benchmarks/bench_instrumentation.py``
+"""
+import argparse
+import gc
+import json
+import tempfile
+import time
+
+from property_rosetta import instrumentation
+from property_rosetta.dictionary import Dictionary
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties)
+        # imports and file system caches are warmed up before timing
+        Dictionary.from_yaml_dictionary(path)
+        timings = {'disabled': float('inf'), 'recording': float('inf')}
+        # interleaved, so that both suffer the same garbage collections
+        for _ in range(args.repeat):
+            for name in timings:
+                gc.collect()
+                start = time.perf_counter()
+                if name == 'recording':
+                    with instrumentation.recording() as recorder:
+                        Dictionary.from_yaml_dictionary(path).validate()
+                else:
+                    Dictionary.from_yaml_dictionary(path).validate()
+                timings[name] = min(timings[name], time.perf_counter() - start)
+        for name, best in timings.items():
+            print(f"{name:>10}: {best:.3f}s")
+        print(f"  overhead: {(timings['recording'] / timings['disabled'] - 1) * 100:.1f}%")
+        print(json.dumps(recorder.to_dict(), indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the memory used per dictionary model object
+
+Compares the slotted model classes with equivalent classes carrying a per
+instance __dict__, as the model classes did before.
+
+Run with ``python benchmarks/bench_memory.py``
+"""
+import argparse
+import tracemalloc
+
+from property_rosetta.dictionary import DictionaryEntity, DictionaryEnumeration, \
+    DictionaryEnumerationValue, DictionaryDataType, DictionaryProperty
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def unslotted(cls):
+    """Returns a plain class initialized like cls, keeping attributes in a __dict__"""
+    return type(f'Unslotted{cls.__name__}', (object,), {'__init__': cls.__init__})
+
+
+def make_objects(cls, parent, count):
+    objects = []
+    for i in range(count):
+        o = cls(parent)
+        o.id = 'shared.id'
+        o.description = 'shared description'
+        objects.append(o)
+    return objects
+
+
+def bytes_per_object(cls, parent, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = make_objects(cls, parent, count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    entity = DictionaryEntity(None)
+    enumeration = DictionaryEnumeration(None)
+    for cls, parent in [(DictionaryEnumerationValue, enumeration),
+                        (DictionaryEnumeration, entity),
+                        (DictionaryDataType, None),
+                        (DictionaryProperty, entity),
+                        (DictionaryEntity, None)]:
+        slotted_size = bytes_per_object(cls, parent, args.count)
+        dict_size = bytes_per_object(unslotted(cls), parent, args.count)
+        print(f"{cls.__name__:>28}: {dict_size:7.1f} -> {slotted_size:7.1f} bytes "
+              f"({100 * (1 - slotted_size / dict_size):.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how many records per minute a compiled validator checks
+
+Run with ``python benchmarks/bench_records.py``
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.records import compile_validator
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+SAMPLES = {'int32': 7, 'int64': 2 ** 40, 'float64': 0.5, 'bool': True, 'string': 'text'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--properties", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        dictionary = Dictionary.from_yaml_dictionary(
+            generate_dictionary(root, 1, args.properties))
+    entity = dictionary.entities[0]
+    rng = random.Random(0)
+    template = {p.id: SAMPLES[p.type_id] for p in entity.properties}
+    records = []
+    for i in range(args.records):
+        record = dict(template)
+        if rng.random() < 0.01:
+            record[rng.choice(list(record))] = None if rng.random() < 0.5 else object()
+        records.append(record)
+    start = time.perf_counter()
+    validator = compile_validator(entity)
+    compiled = time.perf_counter() - start
+    issues = validator.validate(records)
+    elapsed = time.perf_counter() - start - compiled
+    print(f"compiled in {compiled * 1000:.2f}ms, {args.records} records of "
+          f"{args.properties} values in {elapsed:.3f}s, {len(issues)} issues: "
+          f"{args.records / elapsed * 60 / 1e6:.1f}M records per minute")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Measures building, saving and querying the search index of a dictionary
+
+Run with ``python benchmarks/bench_search.py``
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.search import SearchIndex
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+QUERIES = ['entity0.property1', 'property 42', 'description of ent', 'nothing here']
+FUZZY_QUERIES = ['entty12.proprety3', 'enumeration7', 'xyzzy']
+
+
+def timed(f, repeat: int = 20) -> tuple:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--properties", type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties, enumerations=50)
+        dictionary = Dictionary.from_yaml_dictionary(path)
+        elapsed, index = timed(lambda: SearchIndex.build(dictionary), repeat=1)
+        print(f"{'build':>24}: {elapsed * 1000:.0f}ms, {len(index.ids)} objects")
+        saved = os.path.join(root, 'dictionary.search')
+        elapsed, _ = timed(lambda: index.save(saved), repeat=1)
+        print(f"{'save':>24}: {elapsed * 1000:.0f}ms, {os.path.getsize(saved)} bytes")
+        elapsed, index = timed(lambda: SearchIndex.load(saved, dictionary), repeat=1)
+        print(f"{'load':>24}: {elapsed * 1000:.0f}ms")
+        for query in QUERIES:
+            elapsed, hits = timed(lambda: index.search(query))
+            print(f"{'search ' + query:>24}: {elapsed * 1000:.2f}ms, {len(hits)} hits")
+        for query in FUZZY_QUERIES:
+            elapsed, hits = timed(lambda: index.fuzzy(query))
+            print(f"{'fuzzy ' + query:>24}: {elapsed * 1000:.2f}ms, {len(hits)} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Compares dictionary cold start from yaml and from a compiled snapshot
+
+Run with ``python benchmarks/bench_snapshot.py``
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.mapped import MappedDictionary
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def best_of(repeat, f):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties)
+        output = Path(root) / 'dictionary.snapshot'
+        snapshot.write_snapshot(Dictionary.from_yaml_dictionary(path), output,
+                                snapshot.source_hash(path))
+        yaml_time = best_of(
+            args.repeat, lambda: Dictionary.from_yaml_dictionary(path))
+        snapshot_time = best_of(
+            args.repeat, lambda: Dictionary.from_snapshot(output))
+        checked_time = best_of(
+            args.repeat, lambda: Dictionary.from_snapshot(output, path))
+        mapped_time = best_of(
+            args.repeat, lambda: MappedDictionary(output).entity_by_id('entity1'))
+        print(f"            yaml: {yaml_time:.3f}s")
+        print(f"        snapshot: {snapshot_time:.3f}s "
+              f"({output.stat().st_size} bytes)")
+        print(f"snapshot checked: {checked_time:.3f}s")
+        print(f"mapped, 1 entity: {mapped_time:.3f}s")
+        print(f"speedup: {yaml_time / snapshot_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
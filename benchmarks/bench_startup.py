@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the startup time of the command line tools
+
+Run with ``python benchmarks/bench_startup.py``, it exits with status 1 if
+a time exceeds the limit given with ``--max-import-ms`` or
+``--max-version-ms``.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import property_rosetta
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def best_of(repeat: int, command, env) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-version-ms", type=float, default=None)
+    args = parser.parse_args()
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(Path(property_rosetta.__file__).parent.parent)] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    baseline = best_of(args.repeat, [sys.executable, '-c', 'pass'], env)
+    imports = best_of(args.repeat, [sys.executable, '-c', 'import property_rosetta.validate'], env)
+    version = best_of(args.repeat, [sys.executable, '-m', 'property_rosetta.validate',
+                                    '--version'], env)
+    print(f"      interpreter: {baseline:.1f}ms")
+    print(f"  import validate: {imports:.1f}ms ({imports - baseline:.1f}ms over interpreter)")
+    print(f"        --version: {version:.1f}ms ({version - baseline:.1f}ms over interpreter)")
+    failed = False
+    for name, value, limit in [('import', imports, args.max_import_ms),
+                               ('--version', version, args.max_version_ms)]:
+        if limit is not None and value > limit:
+            print(f"{name} took {value:.1f}ms, over the {limit:.1f}ms limit")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Compares peak memory of streaming and whole document property loading
+
+Run with ``python benchmarks/bench_streaming.py``
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from property_rosetta import yaml_backend
+from property_rosetta.dictionary import DictionaryProperty, iter_properties
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def measure(f):
+    tracemalloc.start()
+    start = time.perf_counter()
+    f()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--properties", type=int, default=20000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, 1, args.properties).parent / \
+            'properties-by-entity' / 'entity0.yaml'
+        for name, f in [
+                ('whole document', lambda: DictionaryProperty.from_yaml_property_list(
+                    None, path, yaml_backend.load_file)),
+                ('streamed list', lambda: DictionaryProperty.from_yaml_property_list(
+                    None, path)),
+                ('iter_properties scan', lambda: sum(1 for _ in iter_properties(path)))]:
+            elapsed, peak = measure(f)
+            print(f"{name:>20}: {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Measures records per second translated between two dialects
+
+Run with ``python benchmarks/bench_translate.py``
+"""
+import argparse
+import tempfile
+import time
+
+from property_rosetta.dictionary import Dictionary, DictionaryDialect
+from property_rosetta.translate import compile_translation
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def walk(dictionary, source, target, record) -> dict:
+    """Translates a record looking each field up in the dialects, for comparison"""
+    by_name = {p.name: p.property_id for p in source.properties}
+    ret = {}
+    for key, value in record.items():
+        property_id = by_name.get(key, key)
+        if dictionary.property_by_id(property_id) is None:
+            continue
+        p = target.property_by_id(property_id)
+        ret[p.name if p is not None else property_id] = value
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--properties", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        dictionary = Dictionary.from_yaml_dictionary(
+            generate_dictionary(root, 1, args.properties))
+    ids = [p.id for p in dictionary.entities[0].properties]
+    dictionary.dialects = [DictionaryDialect.from_dict(dictionary, {
+        'id': dialect, 'name': dialect,
+        'properties': [{'property': id, 'name': f'{dialect}_{i}'} for i, id in enumerate(ids)]})
+        for dialect in ('a', 'b')]
+    dictionary.reindex()
+    records = [{f'a_{i}': n for i in range(len(ids))} for n in range(args.records)]
+    a, b = dictionary.dialect_by_id('a'), dictionary.dialect_by_id('b')
+    start = time.perf_counter()
+    translation = compile_translation(dictionary, 'a', 'b')
+    compiled = time.perf_counter() - start
+    for name, f in [
+            ('compiled table', lambda: translation.translate_batch(records)),
+            ('streamed', lambda: sum(1 for _ in translation.translate_many(records))),
+            ('per field walk', lambda: [walk(dictionary, a, b, r) for r in records])]:
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>16}: {args.records / elapsed / 1e3:8.1f}k records/s")
+    print(f"compiled in {compiled * 1000:.2f}ms, {args.properties} fields per record")
+
+
+if __name__ == "__main__":
+    main()
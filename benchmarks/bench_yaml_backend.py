@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Compares dictionary load times for each available yaml backend
+
+Run with ``python benchmarks/bench_yaml_backend.py``
+"""
+import argparse
+import tempfile
+import time
+
+from property_rosetta import yaml_backend
+from property_rosetta.dictionary import Dictionary
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties)
+        timings = {}
+        for backend in yaml_backend.available_backends():
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                Dictionary.from_yaml_dictionary(path, backend=backend)
+                best = min(best, time.perf_counter() - start)
+            timings[backend] = best
+            print(f"{backend:>8}: {best:.3f}s")
+        if len(timings) > 1:
+            speedup = timings[yaml_backend.PYTHON] / \
+                timings[yaml_backend.LIBYAML]
+            print(f"libyaml speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmark suite over a synthetic dictionary and reports JSON results
+
+Covers loading with ``Dictionary.from_yaml_dictionary``, lookups by id,
+``Dictionary.validate`` and the memory used while loading. Results are
+written as JSON, to standard output or to the file given with ``--output``,
+along with the versions and parameters they were measured with, so that
+they can be kept and compared across releases::
+
+    python benchmarks/suite.py --output results-0.2.json
+    python benchmarks/suite.py --compare results-0.1.json
+
+With ``--compare``, results more than ``--tolerance`` slower or bigger than
+those of the baseline are listed on standard error and the exit status is 1.
+Timings are the best of ``--repeat`` runs, lookups are in nanoseconds per
+lookup, memory in bytes.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import property_rosetta
+from property_rosetta.dictionary import Dictionary
+from synthetic import generate_dictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+FORMAT_VERSION = 1
+
+
+def timings(repeat: int, f) -> list:
+    ret = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        ret.append(time.perf_counter() - start)
+    return ret
+
+
+def result(samples: list, unit: str, scale: float = 1) -> dict:
+    samples = [s * scale for s in samples]
+    return {'value': min(samples), 'median': statistics.median(samples), 'unit': unit,
+            'samples': samples}
+
+
+def lookups(repeat: int, f, keys: list) -> dict:
+    def run():
+        for k in keys:
+            f(k)
+    return result(timings(repeat, run), 'ns', 1e9 / max(1, len(keys)))
+
+
+def memory(path) -> dict:
+    tracemalloc.start()
+    try:
+        dictionary = Dictionary.from_yaml_dictionary(path)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del dictionary
+    return {'memory.load_peak': {'value': peak, 'unit': 'bytes'},
+            'memory.retained': {'value': retained, 'unit': 'bytes'}}
+
+
+def run_suite(path, repeat: int = 5, jobs: int = 4) -> dict:
+    """Returns the results of every benchmark over the dictionary at path, by name"""
+    results = {}
+    results['load'] = result(timings(repeat, lambda: Dictionary.from_yaml_dictionary(path)), 's')
+    results['load.lazy'] = result(timings(
+        repeat, lambda: Dictionary.from_yaml_dictionary(path, lazy=True)), 's')
+    if jobs > 1:
+        results['load.parallel'] = result(timings(
+            repeat, lambda: Dictionary.from_yaml_dictionary(path, workers=jobs)), 's')
+    dictionary = Dictionary.from_yaml_dictionary(path)
+    entities = dictionary.entities
+    properties = [p.id for e in entities for p in e.properties]
+    enumerations = dictionary.enumerations
+    results['lookup.type_by_id'] = lookups(
+        repeat, dictionary.type_by_id, [t.id for t in dictionary.data_types or []] * 100)
+    results['lookup.entity_by_id'] = lookups(
+        repeat, dictionary.entity_by_id, [e.id for e in entities])
+    results['lookup.property_by_id'] = lookups(repeat, dictionary.property_by_id, properties)
+    if enumerations:
+        results['lookup.enumeration_by_id'] = lookups(
+            repeat, dictionary.enumeration_by_id, [e.id for e in enumerations])
+        values = [(e, v.integral_value) for e in enumerations for v in e.values]
+        results['lookup.value_for_integral'] = lookups(
+            repeat, lambda i: i[0].value_for_integral(i[1]), values)
+    results['validate'] = result(timings(repeat, dictionary.validate), 's')
+    if jobs > 1:
+        results['validate.parallel'] = result(timings(
+            repeat, lambda: dictionary.validate(workers=jobs)), 's')
+    results.update(memory(path))
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns the names of the results worse than the baseline beyond the tolerance"""
+    ret = []
+    for name, r in sorted(results.items()):
+        old = baseline.get(name, None)
+        if old is not None and old['unit'] == r['unit'] and old['value'] > 0 and \
+                r['value'] > old['value'] * (1 + tolerance):
+            ret.append(name)
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--enumerations", type=int, default=50)
+    parser.add_argument("--values", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--output", type=argparse.FileType('w'), default=sys.stdout)
+    parser.add_argument("--compare", type=argparse.FileType('r'), default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        path = generate_dictionary(root, args.entities, args.properties, args.enumerations,
+                                   args.values, attributes=True)
+        results = run_suite(path, args.repeat, args.jobs)
+        backend = Dictionary.from_yaml_dictionary(path).yaml_backend
+    report = {
+        'format': FORMAT_VERSION,
+        'property_rosetta': property_rosetta.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'yaml_backend': backend,
+        'parameters': {'entities': args.entities, 'properties': args.properties,
+                       'enumerations': args.enumerations, 'values': args.values,
+                       'repeat': args.repeat, 'jobs': args.jobs},
+        'results': results,
+    }
+    json.dump(report, args.output, indent=2, sort_keys=True)
+    args.output.write('\n')
+    if args.compare is None:
+        return 0
+    baseline = json.load(args.compare)
+    if baseline.get('parameters', None) != report['parameters']:
+        print("The baseline was measured with other parameters, results may not compare",
+              file=sys.stderr)
+    worse = regressions(results, baseline.get('results', {}), args.tolerance)
+    for name in worse:
+        old, new = baseline['results'][name]['value'], results[name]['value']
+        print(f"{name}: {old:.6g} -> {new:.6g} {results[name]['unit']} "
+              f"({100 * (new / old - 1):+.0f}%)", file=sys.stderr)
+    return 1 if worse else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
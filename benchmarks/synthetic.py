@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic dictionary trees for benchmarks
+
+Run with ``python benchmarks/synthetic.py DIRECTORY`` to write a tree for
+use outside the benchmarks.
+"""
+import argparse
+from pathlib import Path
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+DATA_TYPES = ['int32', 'int64', 'float64', 'bool', 'string']
+
+# one property in this many is of an enumeration, when there are enumerations
+ENUMERATION_EVERY = 7
+
+
+def generate_dictionary(root, entities: int = 100, properties: int = 50,
+                        enumerations: int = 0, values: int = 10,
+                        attributes: bool = False) -> Path:
+    """Writes a dictionary tree and returns the path of its dictionary.yaml
+
+    Parameters
+    ----------
+    root
+        Directory to write the tree into, created if missing.
+    entities : int
+        Number of entities.
+    properties : int
+        Number of properties per entity.
+    enumerations : int
+        Number of enumerations. When there are any, one property in
+        ENUMERATION_EVERY is of an enumeration, taken in turn.
+    values : int
+        Number of values per enumeration, the last one deprecated.
+    attributes : bool
+        Whether to write an attribute file for each data type.
+    """
+    root = Path(root)
+    (root / 'properties-by-entity').mkdir(parents=True, exist_ok=True)
+    with open(root / 'dictionary.yaml', 'w') as f:
+        f.write('---\n'
+                'id: synthetic.dictionary\n'
+                'name: A synthetic dictionary\n'
+                'description: Generated for benchmarks\n'
+                'version: 1.0.0\n')
+    with open(root / 'data-types.yaml', 'w') as f:
+        f.write('---\n')
+        for t in DATA_TYPES:
+            f.write(f'- id: {t}\n'
+                    f'  name: The {t} type\n'
+                    f'  semantics: value\n'
+                    f'  description: a synthetic {t}\n')
+    if attributes:
+        (root / 'data-type-attributes').mkdir(exist_ok=True)
+        for t in DATA_TYPES:
+            with open(root / 'data-type-attributes' / f'{t}.yaml', 'w') as f:
+                f.write('---\n'
+                        f'record_type: {t}\n'
+                        f'display_name: The {t} type\n'
+                        'nullable: true\n')
+    if enumerations:
+        with open(root / 'enumerations.yaml', 'w') as f:
+            f.write('---\n')
+            for n in range(enumerations):
+                f.write(f'- id: enumeration{n}\n'
+                        f'  name: Enumeration number {n}\n'
+                        f'  description: A synthetic enumeration\n'
+                        f'  values:\n')
+                for v in range(values):
+                    f.write(f'    - id: enumeration{n}.value{v}\n'
+                            f'      integral_value: {v * 2}\n'
+                            f'      description: Value {v} of enumeration {n}\n')
+                    if v == values - 1:
+                        f.write('      deprecated: true\n')
+    with open(root / 'entities.yaml', 'w') as f:
+        f.write('---\n')
+        for e in range(entities):
+            f.write(f'- id: entity{e}\n'
+                    f'  name: Entity number {e}\n'
+                    f'  description: A synthetic entity\n'
+                    f'  attributes:\n'
+                    f'    important: {"true" if e % 2 else "false"}\n')
+    used = 0
+    for e in range(entities):
+        with open(root / 'properties-by-entity' / f'entity{e}.yaml', 'w') as f:
+            f.write('---\n')
+            for p in range(properties):
+                if enumerations and p % ENUMERATION_EVERY == ENUMERATION_EVERY - 1:
+                    type_id = f'enumeration{used % enumerations}'
+                    used += 1
+                else:
+                    type_id = DATA_TYPES[p % len(DATA_TYPES)]
+                f.write(f'- id: entity{e}.property{p}\n'
+                        f'  name: Property {p} of entity {e}\n'
+                        f'  type: {type_id}\n'
+                        f'  description: |\n'
+                        f'    A synthetic property, with a description long enough\n'
+                        f'    to span a couple of lines like the real ones do\n'
+                        f'  attributes:\n'
+                        f'    important: true\n'
+                        f'    minimum_value: {p}\n')
+    return root / 'dictionary.yaml'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--entities", type=int, default=100)
+    parser.add_argument("--properties", type=int, default=50)
+    parser.add_argument("--enumerations", type=int, default=0)
+    parser.add_argument("--values", type=int, default=10)
+    parser.add_argument("--attributes", action="store_true")
+    args = parser.parse_args()
+    print(generate_dictionary(args.root, args.entities, args.properties, args.enumerations,
+                              args.values, args.attributes))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,27 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution, DistributionNotFound
-
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = 'property_rosetta'
-    __version__ = get_distribution(dist_name).version
-except DistributionNotFound:
-    __version__ = 'unknown'
-finally:
-    del get_distribution, DistributionNotFound
+# Change here if project is renamed and does not equal the package name
+dist_name = 'property_rosetta'
+
+
+def _distribution_version() -> str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        # Python 3.7, use the backport if it is installed
+        try:
+            from importlib_metadata import version, PackageNotFoundError
+        except ImportError:
+            return 'unknown'
+    try:
+        return version(dist_name)
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def __getattr__(name):
+    # reading the distribution metadata is not free, it is done on first use
+    if name == '__version__':
+        global __version__
+        __version__ = _distribution_version()
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
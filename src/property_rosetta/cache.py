@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of parsed yaml files
+
+Each parsed document is stored once per distinct content hash, and an index
+maps source file paths to the size, modification time and hash they had
+when they were last parsed. Unchanged files are recognised from their stat
+alone, touched but unchanged files from their hash, and only files whose
+content really changed are parsed again.
+
+Documents are stored with :mod:`marshal`, which only holds plain data and,
+unlike pickle, cannot run code when an entry is loaded, so a cache directory
+shared with others does not let them execute code in the processes using
+it. Documents holding values marshal cannot store, such as yaml timestamps,
+are parsed every time rather than cached.
+
+:class:`MemoryParseCache` applies the same rules to documents kept in
+memory, for long running processes reloading a dictionary repeatedly.
+"""
+import collections
+import hashlib
+import json
+import logging
+import marshal
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from property_rosetta import instrumentation, yaml_backend
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+
+# files modified this recently may change again within the timestamp
+# granularity of the filesystem, their stat alone is not trusted
+_RACY_SECONDS = 2
+
+_Lookup = collections.namedtuple('_Lookup', ['hit', 'document', 'key', 'data'])
+
+
+def _trusted(st) -> bool:
+    return time.time() - st.st_mtime > _RACY_SECONDS
+
+
+class _BaseParseCache(object):
+    """Reading through a cache, subclasses implement lookup and store"""
+
+    def read(self, path, backend: str = None):
+        """Reads and parses a yaml file, going through the cache
+
+        This has the same contract as the default reader of the yaml loaders.
+
+        Raises
+        ------
+        OSError
+            If the file cannot be read.
+        yaml.YAMLError
+            If the document is invalid, in which case nothing is cached.
+        """
+        hit, document, key, data = self.lookup(path)
+        if hit:
+            return document
+        document = yaml_backend.load(data, backend)
+        self.store(key, document)
+        return document
+
+    def digest(self, path) -> str:
+        """Returns the hash of the content of a file as of its last read, None if never read"""
+        with self._lock:
+            entry = self._files.get(str(Path(path).resolve()), None)
+        return entry[2] if entry else None
+
+    def flush(self):
+        pass
+
+
+class ParseCache(_BaseParseCache):
+    def __init__(self, directory, max_bytes: int = 256 * 1024 * 1024):
+        """A size bounded on-disk cache of parsed yaml documents
+
+        Instances are thread safe and can be used as a reader by all the
+        dictionary yaml loaders through :meth:`read`. Changes to the index
+        are written to disk by :meth:`flush`.
+
+        Entries are plain data, see the module documentation, but the
+        index and entries of a directory written by others are still
+        trusted to hold the parse of the files they name.
+
+        Parameters
+        ----------
+        directory
+            Directory holding the cache, created if missing.
+        max_bytes : int
+            Maximum total size of the cached documents. The least recently
+            used ones are evicted when it is exceeded.
+
+        Attributes
+        ----------
+        hits : int
+            Number of reads served from the cache.
+        misses : int
+            Number of reads that had to parse the file.
+        evictions : int
+            Number of documents evicted to honour max_bytes.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._objects_path = self.directory / 'objects'
+        self._index_path = self.directory / 'index.json'
+        self._objects_path.mkdir(parents=True, exist_ok=True)
+        self._files, self._objects = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            if index.get('version', None) == CACHE_VERSION:
+                return index['files'], index['objects']
+        except (OSError, ValueError, KeyError, AttributeError) as exc:
+            if self._index_path.exists():
+                _logger.warning(
+                    f"Ignoring unreadable parse cache index {self._index_path}: {exc}")
+        return {}, {}
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects_path / f'{digest}.marshal'
+
+    def lookup(self, path) -> _Lookup:
+        """Looks a file up in the cache
+
+        Returns
+        -------
+        tuple
+            A (hit, document, key, data) named tuple. On a hit, document is
+            the cached parse. On a miss, data holds the file contents and key
+            identifies them, to be passed to :meth:`store` once parsed.
+
+        Raises
+        ------
+        OSError
+            If the file cannot be read.
+        """
+        name = str(Path(path).resolve())
+        st = os.stat(name)
+        with self._lock:
+            entry = self._files.get(name, None)
+        if _trusted(st) and entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            document = self._load(entry[2])
+            if document is not None:
+                return _Lookup(True, document[0], None, None)
+        with instrumentation.span(instrumentation.IO):
+            with open(name, 'rb') as f:
+                data = f.read()
+        instrumentation.count(instrumentation.FILES)
+        instrumentation.count(instrumentation.BYTES, len(data))
+        key = (name, st.st_size, st.st_mtime_ns,
+               hashlib.sha256(data).hexdigest())
+        document = self._load(key[3])
+        if document is not None:
+            with self._lock:
+                self._files[name] = list(key[1:])
+                self._dirty = True
+            return _Lookup(True, document[0], None, None)
+        with self._lock:
+            self.misses += 1
+            # the file changed, it is only known again once stored
+            if self._files.pop(name, None) is not None:
+                self._dirty = True
+        return _Lookup(False, None, key, data)
+
+    def _load(self, digest: str):
+        """Returns a one element tuple holding a cached document, None if missing"""
+        try:
+            # unmarshalling stands in for parsing
+            with instrumentation.span(instrumentation.PARSE), \
+                    open(self._object_path(digest), 'rb') as f:
+                document = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            _logger.warning(f"Ignoring unreadable parse cache entry {digest}: {exc}")
+            return None
+        with self._lock:
+            self.hits += 1
+            if digest in self._objects:
+                self._objects[digest][1] = time.time()
+                self._dirty = True
+        return (document,)
+
+    def store(self, key: tuple, document):
+        """Stores the parse of a file previously missed by :meth:`lookup`"""
+        name, size, mtime_ns, digest = key
+        try:
+            data = marshal.dumps(document)
+        except ValueError as exc:
+            _logger.debug("Not caching %s: %s", name, exc)
+            return
+        fd, tmp = tempfile.mkstemp(dir=self._objects_path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._object_path(digest))
+        except OSError as exc:
+            _logger.warning(f"Could not write parse cache entry for {name}: {exc}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._files[name] = [size, mtime_ns, digest]
+            self._objects[digest] = [len(data), time.time()]
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        total = sum(size for size, _ in self._objects.values())
+        if total <= self.max_bytes:
+            return
+        for digest, (size, _) in sorted(self._objects.items(), key=lambda o: o[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(self._object_path(digest))
+            except OSError:
+                pass
+            del self._objects[digest]
+            total -= size
+            self.evictions += 1
+        live = set(self._objects)
+        self._files = {name: entry for name, entry in self._files.items()
+                       if entry[2] in live}
+
+    def flush(self):
+        """Writes the index to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index = json.dumps({'version': CACHE_VERSION,
+                                'files': self._files,
+                                'objects': self._objects})
+            self._dirty = False
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(index)
+            os.replace(tmp, self._index_path)
+        except OSError as exc:
+            _logger.warning(f"Could not write parse cache index: {exc}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Removes all cached documents"""
+        with self._lock:
+            for digest in self._objects:
+                try:
+                    os.unlink(self._object_path(digest))
+                except OSError:
+                    pass
+            self._files, self._objects = {}, {}
+            self._dirty = True
+        self.flush()
+
+
+class MemoryParseCache(_BaseParseCache):
+    def __init__(self):
+        """An in-memory cache of parsed yaml documents
+
+        It has the same interface and thread safety as :class:`ParseCache`,
+        keeping the last parse of each file, which is returned as long as the
+        file is unchanged. Documents are shared between loads and must not be
+        modified.
+
+        Attributes
+        ----------
+        hits : int
+            Number of reads served from the cache.
+        misses : int
+            Number of reads that had to parse the file.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files = {}
+
+    def lookup(self, path) -> _Lookup:
+        """Looks a file up in the cache, see :meth:`ParseCache.lookup`"""
+        name = str(Path(path).resolve())
+        st = os.stat(name)
+        with self._lock:
+            entry = self._files.get(name, None)
+        if _trusted(st) and entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            with self._lock:
+                self.hits += 1
+            return _Lookup(True, entry[3], None, None)
+        with instrumentation.span(instrumentation.IO):
+            with open(name, 'rb') as f:
+                data = f.read()
+        instrumentation.count(instrumentation.FILES)
+        instrumentation.count(instrumentation.BYTES, len(data))
+        key = (name, st.st_size, st.st_mtime_ns,
+               hashlib.sha256(data).hexdigest())
+        with self._lock:
+            if entry and entry[2] == key[3]:
+                self.hits += 1
+                self._files[name] = key[1:] + (entry[3],)
+                return _Lookup(True, entry[3], None, None)
+            self.misses += 1
+            # the file changed, it is only known again once stored
+            self._files.pop(name, None)
+        return _Lookup(False, None, key, data)
+
+    def store(self, key: tuple, document):
+        """Stores the parse of a file previously missed by :meth:`lookup`"""
+        with self._lock:
+            self._files[key[0]] = key[1:] + (document,)
+
+    def clear(self):
+        """Removes all cached documents"""
+        with self._lock:
+            self._files = {}
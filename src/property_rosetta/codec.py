@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk conversion of enumeration columns between value ids and integral values
+
+An :class:`EnumerationCodec` is compiled once from a
+:class:`property_rosetta.dictionary.DictionaryEnumeration` and converts
+whole NumPy arrays at a time:
+
+* encoding hashes the code points of string arrays into a table of value
+  ids, and looks up the elements of object arrays one by one in a dict
+* decoding maps integral values through a dense table indexed by value when
+  the integral values are contiguous enough, and through a binary search of
+  the sorted integral values otherwise
+
+Unknown and deprecated values are handled according to a policy given when
+the codec is compiled. NumPy is an optional dependency, only needed by this
+module.
+"""
+import logging
+from itertools import repeat
+
+import numpy as np
+
+from property_rosetta.dictionary import DictionaryError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+RAISE = 'raise'
+FILL = 'fill'
+WARN = 'warn'
+ALLOW = 'allow'
+
+# a dense decoding table is used while it has at most this many slots per value
+_DENSE_SLOTS_PER_VALUE = 4
+_DENSE_MIN_SLOTS = 1024
+
+
+def _hash_ids(ids: np.ndarray) -> np.ndarray:
+    """FNV-1a hashes of the code points of a contiguous unicode array"""
+    h = np.full(ids.size, 14695981039346656037, dtype=np.uint64)
+    for column in ids.view(np.uint32).reshape(ids.size, ids.dtype.itemsize // 4).T:
+        h ^= column
+        h *= np.uint64(1099511628211)
+    h ^= h >> np.uint64(29)
+    return h.astype(np.intp)
+
+
+class EnumerationCodecError(DictionaryError):
+    """Raised when values cannot be converted under the policy of a codec"""
+    pass
+
+
+class EnumerationCodec(object):
+    def __init__(self, enumeration, unknown: str = RAISE, deprecated: str = ALLOW,
+                 fill_integral: int = -1, fill_id=None):
+        """Converts arrays of enumeration value ids to integral values and back
+
+        Parameters
+        ----------
+        enumeration : DictionaryEnumeration
+            The enumeration to compile.
+        unknown : str
+            What to do with ids or integral values that are not in the
+            enumeration: RAISE an EnumerationCodecError, or FILL them with
+            fill_integral or fill_id.
+        deprecated : str
+            What to do with deprecated values: ALLOW them, ALLOW them while
+            logging a warning (WARN), RAISE an EnumerationCodecError, or FILL
+            them with fill_integral or fill_id.
+        fill_integral : int
+            Integral value of unknown ids when encoding.
+        fill_id
+            Id of unknown integral values when decoding.
+
+        Raises
+        ------
+        ValueError
+            If a policy is invalid.
+        """
+        if unknown not in (RAISE, FILL):
+            raise ValueError(f'Unknown values policy must be raise or fill, not {unknown}')
+        if deprecated not in (ALLOW, WARN, RAISE, FILL):
+            raise ValueError(
+                f'Deprecated values policy must be allow, warn, raise or fill, not {deprecated}')
+        self.enumeration_id = enumeration.id
+        self.unknown = unknown
+        self.deprecated = deprecated
+        self.fill_integral = fill_integral
+        self.fill_id = fill_id
+        values = list(enumeration.values)
+        n = len(values)
+        # index n is the slot of unknown values in all the per value tables
+        self._ids = np.array([v.id for v in values] + [fill_id], dtype=object)
+        self._integrals = np.array([v.integral_value for v in values] + [fill_integral],
+                                   dtype=np.int64)
+        self._deprecated = np.array([bool(v.deprecated) for v in values] + [False])
+        self._lookup = {v.id: i for i, v in enumerate(values)}
+        self._id_tables = {}
+        by_integral = np.argsort(self._integrals[:n], kind='stable')
+        self._sorted_integrals = self._integrals[:n][by_integral]
+        self._sorted_integral_codes = by_integral.astype(np.intp)
+        self._dense = None
+        if n:
+            low, high = int(self._sorted_integrals[0]), int(self._sorted_integrals[-1])
+            if high - low + 1 <= max(_DENSE_MIN_SLOTS, _DENSE_SLOTS_PER_VALUE * n):
+                dense = np.full(high - low + 1, n, dtype=np.intp)
+                # reversed, so that the first of duplicated integral values wins
+                dense[self._integrals[:n][::-1] - low] = np.arange(n, dtype=np.intp)[::-1]
+                self._dense = (low, dense)
+
+    @property
+    def is_dense(self) -> bool:
+        """Whether decoding goes through a dense table"""
+        return self._dense is not None
+
+    def _id_table(self, dtype: np.dtype):
+        # ids of a unicode dtype are hashed from their code points into a table
+        # of codes, known ids longer than the dtype cannot appear in the input
+        table = self._id_tables.get(dtype, None)
+        if table is None:
+            n = len(self._lookup)
+            ids = list(self._lookup)
+            width = dtype.itemsize // 4
+            fitting = np.array([i for i, v in enumerate(ids) if len(v) <= width], dtype=np.intp)
+            size = 8
+            while size < 8 * len(fitting):
+                size *= 2
+            slots = _hash_ids(np.array([ids[i] for i in fitting], dtype=dtype)) & (size - 1)
+            codes = np.full(size, n, dtype=np.intp)
+            codes[slots] = fitting
+            # ids sharing a slot are looked up one by one
+            codes[np.bincount(slots, minlength=size) > 1] = -1
+            candidates = np.array(ids + [''], dtype=dtype)
+            table = self._id_tables[dtype] = (size - 1, codes, candidates)
+        return table
+
+    def _id_codes(self, ids: np.ndarray) -> np.ndarray:
+        n = len(self._lookup)
+        if ids.dtype.kind == 'S':
+            ids = ids.astype(str)
+        if ids.dtype.kind != 'U':
+            return np.fromiter(map(self._lookup.get, ids.ravel().tolist(), repeat(n)),
+                               dtype=np.intp, count=ids.size).reshape(ids.shape)
+        mask, table, candidates = self._id_table(ids.dtype)
+        flat = np.ascontiguousarray(ids).ravel()
+        codes = table[_hash_ids(flat) & mask]
+        collided = codes < 0
+        if collided.any():
+            codes[collided] = np.fromiter(
+                map(self._lookup.get, flat[collided].tolist(), repeat(n)),
+                dtype=np.intp, count=np.count_nonzero(collided))
+        codes[candidates[codes] != flat] = n
+        return codes.reshape(ids.shape)
+
+    def _integral_codes(self, integrals: np.ndarray) -> np.ndarray:
+        n = len(self._lookup)
+        if not n:
+            return np.full(integrals.shape, n, dtype=np.intp)
+        if self._dense is not None:
+            low, dense = self._dense
+            offsets = integrals.astype(np.int64, copy=False) - low
+            inside = (offsets >= 0) & (offsets < len(dense))
+            codes = np.full(integrals.shape, n, dtype=np.intp)
+            codes[inside] = dense[offsets[inside]]
+            return codes
+        positions = np.searchsorted(self._sorted_integrals, integrals)
+        np.minimum(positions, n - 1, out=positions)
+        codes = self._sorted_integral_codes[positions]
+        codes[self._sorted_integrals[positions] != integrals] = n
+        return codes
+
+    def _apply_policy(self, codes: np.ndarray, source: np.ndarray) -> np.ndarray:
+        n = len(self._lookup)
+        unknown = codes == n
+        if self.unknown == RAISE and unknown.any():
+            first = source[unknown][:1].tolist()[0]
+            raise EnumerationCodecError(
+                f'Value {first!r} is not in enumeration {self.enumeration_id}, '
+                f'{np.count_nonzero(unknown)} unknown values in total')
+        if self.deprecated != ALLOW:
+            deprecated = self._deprecated[codes]
+            if deprecated.any():
+                first = source[deprecated][:1].tolist()[0]
+                message = f'Value {first!r} of enumeration {self.enumeration_id} is ' \
+                    f'deprecated, {np.count_nonzero(deprecated)} deprecated values in total'
+                if self.deprecated == RAISE:
+                    raise EnumerationCodecError(message)
+                elif self.deprecated == WARN:
+                    _logger.warning(message)
+                else:
+                    codes[deprecated] = n
+        return codes
+
+    def contains(self, ids) -> np.ndarray:
+        """Returns a boolean array telling which value ids are in the enumeration
+
+        Deprecated values are in the enumeration, whatever the policy.
+        """
+        return self._id_codes(np.asarray(ids)) != len(self._lookup)
+
+    def encode(self, ids) -> np.ndarray:
+        """Returns the integral values of an array of value ids
+
+        Parameters
+        ----------
+        ids : array_like
+            Value ids, as a NumPy string or object array or any sequence.
+
+        Returns
+        -------
+        numpy.ndarray
+            An int64 array of the same shape.
+
+        Raises
+        ------
+        EnumerationCodecError
+            If unknown or deprecated ids are found and the policy is RAISE.
+        """
+        ids = np.asarray(ids)
+        codes = self._apply_policy(self._id_codes(ids), ids)
+        return self._integrals[codes]
+
+    def decode(self, integrals) -> np.ndarray:
+        """Returns the value ids of an array of integral values
+
+        Parameters
+        ----------
+        integrals : array_like
+            Integral values.
+
+        Returns
+        -------
+        numpy.ndarray
+            An object array of value ids of the same shape.
+
+        Raises
+        ------
+        EnumerationCodecError
+            If unknown or deprecated values are found and the policy is RAISE.
+        """
+        integrals = np.asarray(integrals)
+        if integrals.dtype.kind not in 'iu':
+            raise EnumerationCodecError(
+                f'Cannot decode values of type {integrals.dtype} with enumeration '
+                f'{self.enumeration_id}, integers are needed')
+        codes = self._apply_policy(self._integral_codes(integrals), integrals)
+        return self._ids[codes]
@@ -0,0 +1,514 @@
+# -*- coding: utf-8 -*-
+"""
+Code generation from a dictionary with Jinja2 templates
+
+A template directory holds two kinds of templates, both ending in ``.j2``:
+
+* ``dictionary/**``: rendered once, with ``dictionary``, ``data_types``,
+  ``enumerations`` and ``entities`` in their context
+* ``entity/**``: rendered once per entity, with ``dictionary``, ``entity``
+  and ``properties`` in their context
+
+The path of a template, relative to its kind directory and without the
+``.j2`` suffix, is itself rendered with the same context to name the
+output, so ``entity/{{ entity.id | identifier | pascalize }}.py.j2`` writes
+one module per entity.
+
+Besides the pyhumps case conversions ``camelize``, ``pascalize``,
+``decamelize``, ``depascalize`` and ``kebabize``, templates can use the
+``identifier`` filter, which turns dots and dashes into underscores, and
+the ``type_of`` and ``attributes_of`` functions, which return the data type
+or enumeration of a property, and the attributes of its data type updated
+with its own. Case conversions of strings are memoized since the same
+names are converted for every template and property.
+
+Templates are compiled once into a Jinja2 bytecode cache on disk, shared by
+the worker processes rendering entities in parallel. A manifest in the
+output directory records what each output was rendered from, so that runs
+after an edit only render and write the outputs affected, see
+:func:`generate`.
+"""
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+import humps
+import jinja2
+
+from property_rosetta.dictionary import Dictionary, DictionaryError, _content_hash
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIX = '.j2'
+MANIFEST_NAME = '.rosetta-manifest.json'
+MANIFEST_VERSION = 2
+
+
+class GenerationError(DictionaryError):
+    """Raised when templates cannot be loaded or rendered"""
+    pass
+
+
+def _memoized(f):
+    """Memoizes a filter over strings, other values such as mappings are converted every time"""
+    cached = functools.lru_cache(maxsize=None)(f)
+
+    @functools.wraps(f)
+    def memoized(value):
+        if isinstance(value, str):
+            return cached(value)
+        return f(value)
+    memoized.cache_info = cached.cache_info
+    memoized.cache_clear = cached.cache_clear
+    return memoized
+
+
+def _identifier(name: str) -> str:
+    return str(name).replace('.', '_').replace('-', '_')
+
+
+FILTERS = {
+    'camelize': _memoized(humps.camelize),
+    'pascalize': _memoized(humps.pascalize),
+    'decamelize': _memoized(humps.decamelize),
+    'depascalize': _memoized(humps.depascalize),
+    'kebabize': _memoized(humps.kebabize),
+    'identifier': _memoized(_identifier),
+}
+
+
+def type_of(prop):
+    """Returns the data type or the enumeration of a property, None if it does not resolve"""
+    dictionary = prop.dictionary
+    if dictionary is None:
+        return None
+    return dictionary.type_by_id(prop.type_id) or dictionary.enumeration_by_id(prop.type_id)
+
+
+def attributes_of(prop) -> dict:
+    """Returns the attributes of the data type of a property, updated with its own"""
+    data_type = prop.dictionary.type_by_id(prop.type_id) if prop.dictionary else None
+    attributes = dict(data_type.attributes or {}) if data_type is not None else {}
+    attributes.update(prop.attributes or {})
+    return attributes
+
+
+class Generator(object):
+    def __init__(self, templates, cache_dir=None, cache: bool = True):
+        """Renders the templates of a directory over a dictionary
+
+        Parameters
+        ----------
+        templates
+            The template directory.
+        cache_dir : optional
+            Directory of the bytecode cache, defaults to the one Jinja2
+            picks in the temporary directory of the user.
+        cache : bool
+            Whether to use a bytecode cache at all.
+
+        Raises
+        ------
+        GenerationError
+            If the template directory does not exist.
+        """
+        self.templates = Path(templates)
+        if not self.templates.is_dir():
+            raise GenerationError(f'Template directory {self.templates} does not exist')
+        bytecode_cache = None
+        if cache:
+            if cache_dir is not None:
+                Path(cache_dir).mkdir(parents=True, exist_ok=True)
+                cache_dir = str(cache_dir)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+        self.environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(str(self.templates)),
+            bytecode_cache=bytecode_cache,
+            undefined=jinja2.StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            autoescape=False)
+        self.environment.filters.update(FILTERS)
+        self.environment.globals.update(type_of=type_of, attributes_of=attributes_of)
+        self.dictionary_templates = self._templates('dictionary')
+        self.entity_templates = self._templates('entity')
+        shared = _content_hash('templates', [
+            (p.relative_to(self.templates).as_posix(), _file_hash(p))
+            for p in sorted(self.templates.rglob('*'))
+            if p.is_file() and p.relative_to(self.templates).parts[0] not in (
+                'dictionary', 'entity')])
+        self.template_fingerprints = {
+            t: _content_hash('template', t, _file_hash(self.templates / t), shared)
+            for t in self.dictionary_templates + self.entity_templates}
+        # output path templates, compiled once each
+        self._names = {}
+
+    def _templates(self, kind: str) -> List[str]:
+        root = self.templates / kind
+        return sorted(p.relative_to(self.templates).as_posix()
+                      for p in root.rglob(f'*{TEMPLATE_SUFFIX}') if p.is_file())
+
+    def _render_name(self, template: str, context: dict) -> str:
+        try:
+            name = self._names.get(template, None)
+            if name is None:
+                name = self._names[template] = self.environment.from_string(
+                    template.split('/', 1)[1][:-len(TEMPLATE_SUFFIX)])
+            return name.render(context)
+        except jinja2.TemplateError as exc:
+            raise GenerationError(f'Error rendering the name of template {template}: {exc}') \
+                from exc
+
+    def _render_text(self, template: str, context: dict) -> str:
+        try:
+            return self.environment.get_template(template).render(context)
+        except jinja2.TemplateError as exc:
+            raise GenerationError(f'Error rendering template {template}: {exc}') from exc
+
+    def _render(self, template: str, context: dict) -> tuple:
+        return self._render_name(template, context), self._render_text(template, context)
+
+    def render_dictionary(self, dictionary) -> List[tuple]:
+        """Returns the relative path and the text of each dictionary level output"""
+        context = _dictionary_context(dictionary)
+        return [self._render(t, context) for t in self.dictionary_templates]
+
+    def render_entity(self, entity) -> List[tuple]:
+        """Returns the relative path and the text of each output of an entity"""
+        context = _entity_context(entity)
+        return [self._render(t, context) for t in self.entity_templates]
+
+
+def _dictionary_context(dictionary) -> dict:
+    return {'dictionary': dictionary, 'data_types': dictionary.data_types or [],
+            'enumerations': dictionary.enumerations, 'entities': dictionary.entities}
+
+
+def _entity_context(entity) -> dict:
+    return {'dictionary': entity.dictionary, 'entity': entity, 'properties': entity.properties}
+
+
+class GenerationReport(collections.namedtuple(
+        'GenerationReport', ['outputs', 'written', 'rendered', 'removed'])):
+    """What a run of :func:`generate` did
+
+    Attributes
+    ----------
+    outputs : list of Path
+        All the outputs, dictionary level ones first, then those of each
+        entity in dictionary order.
+    written : list of Path
+        The outputs whose content changed and was written.
+    rendered : int
+        Number of outputs rendered, the others were up to date.
+    removed : list of Path
+        Outputs of a previous run that are no longer generated, and were
+        deleted.
+    """
+    __slots__ = ()
+
+
+class Manifest(object):
+    def __init__(self):
+        """The outputs of a previous run and the inputs they were rendered from
+
+        Attributes
+        ----------
+        outputs : dict
+            For each template and entity id, or template alone for
+            dictionary level outputs, the path of the output relative to
+            the output directory, the fingerprint of its inputs and the
+            sha256 of its content.
+        """
+        self.outputs = {}
+
+    @classmethod
+    def load(cls, path) -> 'Manifest':
+        """Reads a manifest saved by :meth:`save`
+
+        An empty manifest is returned if the file is missing, unreadable or
+        was written by another version of property_rosetta.
+        """
+        from property_rosetta import __version__
+        ret = Manifest()
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest.get('version', None) == MANIFEST_VERSION and \
+                    manifest.get('property_rosetta', None) == __version__:
+                ret.outputs = manifest['outputs']
+        except (OSError, ValueError, KeyError, AttributeError) as exc:
+            if os.path.exists(path):
+                _logger.warning(f"Ignoring unreadable code generation manifest {path}: {exc}")
+        return ret
+
+    def save(self, path):
+        """Writes the manifest to a file, atomically"""
+        from property_rosetta import __version__
+        manifest = json.dumps({'version': MANIFEST_VERSION,
+                               'property_rosetta': __version__,
+                               'outputs': self.outputs}, sort_keys=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(manifest)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def _file_hash(path: Path):
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _entity_inputs(entity) -> str:
+    dictionary = entity.dictionary
+    inputs = [dictionary.id, dictionary.name, dictionary.description, dictionary.version,
+              dictionary.deprecated, entity.fingerprint]
+    for type_id in sorted(set(p.type_id for p in entity.properties), key=str):
+        referenced = dictionary.type_by_id(type_id) or dictionary.enumeration_by_id(type_id)
+        inputs.append(referenced.fingerprint if referenced is not None else None)
+    return _content_hash('entity output', *inputs)
+
+
+def _generate_output(generator: Generator, output: Path, template: str, name: str,
+                     context: dict, inputs: str, previous: dict) -> tuple:
+    """Renders and writes an output to its path relative to output unless it is up to date
+
+    Returns
+    -------
+    tuple
+        The manifest entry of the output, whether it was rendered and
+        whether it was written.
+    """
+    inputs = _content_hash('output', inputs, generator.template_fingerprints[template])
+    if previous is not None and previous['path'] == name and previous['inputs'] == inputs and \
+            _file_hash(output / name) == previous['content']:
+        return previous, False, False
+    data = generator._render_text(template, context).encode('utf-8')
+    content = hashlib.sha256(data).hexdigest()
+    path = output / name
+    # unchanged files are not touched, so that build systems do not see them change
+    written = _file_hash(path) != content
+    if written:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return {'path': name, 'inputs': inputs, 'content': content}, True, written
+
+
+def _output_name(name: str) -> str:
+    """Returns an output path relative to the output directory normalized, None if it leaves it"""
+    name = os.path.normpath(name)
+    if os.path.isabs(name) or os.path.splitdrive(name)[0] or name == os.curdir or \
+            name.split(os.sep, 1)[0] == os.pardir:
+        return None
+    return name
+
+
+def _entity_key(template: str, entity_id) -> str:
+    return f'{template}\x1f{entity_id}'
+
+
+def _name_entity_outputs(generator: Generator, entities) -> List[tuple]:
+    """Returns the key and the path of each output of entities, without rendering them"""
+    ret = []
+    for entity in entities:
+        context = _entity_context(entity)
+        for template in generator.entity_templates:
+            ret.append((_entity_key(template, entity.id),
+                        generator._render_name(template, context)))
+    return ret
+
+
+def _generate_entity_outputs(generator: Generator, output: Path, entities, names: dict,
+                             previous: dict) -> List[tuple]:
+    ret = []
+    for entity in entities:
+        context = _entity_context(entity)
+        inputs = _entity_inputs(entity)
+        for template in generator.entity_templates:
+            key = _entity_key(template, entity.id)
+            ret.append((key,) + _generate_output(
+                generator, output, template, names[key], context, inputs,
+                previous.get(key, None)))
+    return ret
+
+
+# state of the worker processes, set by _init_worker
+_worker = None
+
+
+def _init_worker(path, templates, output, cache_dir, cache, backend):
+    global _worker
+    dictionary = Dictionary.from_yaml_dictionary(Path(path), backend=backend, lazy=True)
+    _worker = (dictionary, Generator(templates, cache_dir, cache), Path(output))
+
+
+def _name_entities(indexes: List[int]) -> List[tuple]:
+    dictionary, generator, _ = _worker
+    return _name_entity_outputs(generator, [dictionary.entities[i] for i in indexes])
+
+
+def _generate_entities(indexes: List[int], names: dict, previous: dict) -> List[tuple]:
+    dictionary, generator, output = _worker
+    return _generate_entity_outputs(
+        generator, output, [dictionary.entities[i] for i in indexes], names, previous)
+
+
+def generate(path, templates, output, workers: int = None, cache_dir=None,
+             cache: bool = True, backend: str = None, force: bool = False) -> GenerationReport:
+    """Renders the templates of a directory over a dictionary into files
+
+    The outputs, and the fingerprints of the inputs they were rendered
+    from, are recorded in a manifest in the output directory. Outputs are
+    only rendered again when their inputs or their template changed, and
+    only written when their content changed. Outputs of a previous run that
+    are no longer generated are deleted, unless they were modified since.
+    The paths of all the outputs are rendered and checked first, so that
+    nothing is written when two outputs would have the same path or one
+    would be outside of the output directory.
+
+    The inputs of an entity level output are the scalar fields of the
+    dictionary, the entity, its properties and their data types or
+    enumerations. Those of a dictionary level output are the whole
+    dictionary. Each template is fingerprinted along with the files of
+    the template directory outside dictionary/ and entity/, where macros
+    and templates to include are expected.
+
+    Parameters
+    ----------
+    path
+        Path to the dictionary yaml file.
+    templates
+        The template directory, see the module documentation.
+    output
+        Directory to write the outputs into, created if missing.
+    workers : int, optional
+        When greater than one, entities are rendered by this many processes,
+        each loading the dictionary lazily and reading only the properties
+        of the entities it renders.
+    cache_dir : optional
+        Directory of the template bytecode cache.
+    cache : bool
+        Whether to use a bytecode cache at all.
+    backend : str, optional
+        The yaml backend to parse the dictionary with.
+    force : bool
+        Render every output, ignoring the manifest.
+
+    Returns
+    -------
+    GenerationReport
+        The outputs, and what was rendered, written and removed.
+
+    Raises
+    ------
+    DictionaryLoadingError
+        If the dictionary cannot be loaded.
+    GenerationError
+        If a template cannot be rendered, two outputs have the same path or
+        an output path is outside of the output directory.
+    OSError
+        If an output or the manifest cannot be written.
+    """
+    path, output = Path(path), Path(output)
+    generator = Generator(templates, cache_dir, cache)
+    dictionary = Dictionary.from_yaml_dictionary(
+        path, backend=backend, lazy=bool(workers and workers > 1))
+    manifest_path = output / MANIFEST_NAME
+    previous = {} if force else Manifest.load(manifest_path).outputs
+    context = _dictionary_context(dictionary)
+    count = len(dictionary.entities)
+    with contextlib.ExitStack() as stack:
+        pool, chunks = None, []
+        if workers and workers > 1 and count > 1:
+            # compile the templates once, workers load them from the bytecode cache
+            for template in generator.entity_templates:
+                generator.environment.get_template(template)
+            chunk = max(1, count // (workers * 4))
+            chunks = [range(i, min(i + chunk, count)) for i in range(0, count, chunk)]
+            pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=_init_worker,
+                initargs=(str(path), str(templates), str(output),
+                          None if cache_dir is None else str(cache_dir), cache,
+                          dictionary.yaml_backend)))
+        # name every output before writing any
+        names = [(t, generator._render_name(t, context)) for t in generator.dictionary_templates]
+        if pool is None:
+            names += _name_entity_outputs(generator, dictionary.entities)
+        else:
+            for future in [pool.submit(_name_entities, indexes) for indexes in chunks]:
+                names += future.result()
+        outside = [name for _, name in names if _output_name(name) is None]
+        if outside:
+            raise GenerationError(
+                f'Output {outside[0]} would be written outside of {output}, '
+                f'template names must render to relative paths')
+        names = [(key, _output_name(name)) for key, name in names]
+        paths = collections.Counter(name for _, name in names)
+        duplicates = [p for p, n in paths.items() if n > 1]
+        if duplicates:
+            raise GenerationError(
+                f'Several outputs would be written to {output / duplicates[0]}, '
+                f'template names must differ')
+        names = dict(names)
+        output.mkdir(parents=True, exist_ok=True)
+        inputs = dictionary.fingerprint if generator.dictionary_templates else None
+        results = [(template,) + _generate_output(
+            generator, output, template, names[template], context, inputs,
+            previous.get(template, None))
+            for template in generator.dictionary_templates]
+        if pool is None:
+            results += _generate_entity_outputs(
+                generator, output, dictionary.entities, names, previous)
+        else:
+            futures = []
+            for indexes in chunks:
+                keys = [_entity_key(t, dictionary.entities[i].id)
+                        for i in indexes for t in generator.entity_templates]
+                futures.append(pool.submit(
+                    _generate_entities, indexes, {k: names[k] for k in keys},
+                    {k: previous[k] for k in keys if k in previous}))
+            for future in futures:
+                results += future.result()
+    outputs = [output / entry['path'] for _, entry, _, _ in results]
+    manifest = Manifest()
+    manifest.outputs = {key: entry for key, entry, _, _ in results}
+    removed = []
+    current = set(outputs)
+    for key, entry in previous.items():
+        name = _output_name(entry['path'])
+        if name is None:
+            continue
+        stale = output / name
+        if key not in manifest.outputs and stale not in current and \
+                _file_hash(stale) == entry['content']:
+            stale.unlink()
+            removed.append(stale)
+    manifest.save(manifest_path)
+    report = GenerationReport(
+        outputs, [output / entry['path'] for _, entry, _, written in results if written],
+        sum(1 for _, _, rendered, _ in results if rendered), removed)
+    _logger.info(f"Generated {len(outputs)} files in {output}: rendered {report.rendered}, "
+                 f"wrote {len(report.written)}, removed {len(removed)}")
+    return report
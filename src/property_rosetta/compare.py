@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+A script comparing two versions of a dictionary
+
+See :mod:`property_rosetta.diff` for what counts as a breaking change.
+"""
+
+import argparse
+import json
+import sys
+import logging
+from pathlib import Path
+
+from property_rosetta.validate import VersionAction, setup_logging
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare two versions of a dictionary")
+    parser.add_argument(
+        "--version",
+        action=VersionAction)
+    parser.add_argument(
+        dest="old",
+        help="path containing the old dictionary, or its snapshot",
+        type=Path)
+    parser.add_argument(
+        dest="new",
+        help="path containing the new dictionary, or its snapshot",
+        type=Path)
+    parser.add_argument(
+        "--json",
+        dest="json",
+        help="print the changes as JSON",
+        action="store_true")
+    parser.add_argument(
+        "--check-version",
+        dest="check_version",
+        help="exit with status 2 if the version of the new dictionary is not incremented "
+             "enough for the changes",
+        action="store_true")
+    parser.add_argument(
+        "--fail-on-breaking",
+        dest="fail_on_breaking",
+        help="exit with status 2 if there are breaking changes",
+        action="store_true")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        help="parse the dictionaries concurrently using this many workers",
+        type=int,
+        default=None)
+    parser.add_argument(
+        "--yaml-backend",
+        dest="yaml_backend",
+        help="yaml parser to use, defaults to libyaml when available",
+        choices=["libyaml", "python"],
+        default=None)
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        help="set loglevel to DEBUG",
+        action="store_const",
+        const=logging.DEBUG)
+    return parser.parse_args(args)
+
+
+def load(path: Path, args):
+    """Loads a dictionary from its yaml file, or from a snapshot ending in .snapshot
+
+    Args:
+      path (:obj:`Path`): path of the dictionary
+      args (:obj:`argparse.Namespace`): command line parameters namespace
+    """
+    from property_rosetta.dictionary import Dictionary
+    _logger.debug(f"Loading dictionary from {path}")
+    if path.suffix == '.snapshot':
+        return Dictionary.from_snapshot(path)
+    return Dictionary.from_yaml_dictionary(path, workers=args.jobs, backend=args.yaml_backend)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+
+    Returns:
+      int: the exit code, 1 if a dictionary cannot be loaded, 2 if a check
+      asked for fails
+    """
+    args = parse_args(args)
+    from property_rosetta.diff import diff
+    from property_rosetta.dictionary import DictionaryError
+    setup_logging(args.loglevel)
+    try:
+        old, new = load(args.old, args), load(args.new, args)
+    except (DictionaryError, OSError) as e:
+        _logger.fatal(f"{e}")
+        return 1
+    result = diff(old, new)
+    if args.json:
+        json.dump(result.to_dict(), sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        for change in result.changes:
+            sys.stdout.write(f"{change}\n")
+        sys.stdout.write(f"{len(result.changes)} changes, {len(result.breaking)} breaking, "
+                         f"version {result.old_version} -> {result.new_version}, "
+                         f"{result.required_bump or 'no'} increment needed\n")
+    if args.check_version and not result.version_is_sufficient:
+        _logger.error(f"Version {result.new_version} needs a {result.required_bump} "
+                      f"increment over {result.old_version}")
+        return 2
+    if args.fail_on_breaking and not result.compatible:
+        _logger.error(f"Found {len(result.breaking)} breaking changes")
+        return 2
+    return 0
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
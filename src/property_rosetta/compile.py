@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+A script compiling a dictionary into a binary snapshot
+"""
+
+import argparse
+import sys
+import logging
+from pathlib import Path
+
+from property_rosetta.validate import VersionAction, setup_logging
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Compile a dictionary into a binary snapshot")
+    parser.add_argument(
+        "--version",
+        action=VersionAction)
+    parser.add_argument(
+        dest="path",
+        help="path containing a dictionary",
+        type=Path)
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        help="snapshot file to write, defaults to the dictionary path with a .snapshot suffix",
+        type=Path,
+        default=None)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        help="parse and validate the dictionary concurrently using this many workers",
+        type=int,
+        default=None)
+    parser.add_argument(
+        "--search-index",
+        dest="search_index",
+        help="also write a search index next to the snapshot, with a .search suffix",
+        action="store_true")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        help="set loglevel to DEBUG",
+        action="store_const",
+        const=logging.DEBUG)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    from property_rosetta import snapshot
+    from property_rosetta.dictionary import Dictionary, DictionaryError
+    setup_logging(args.loglevel)
+    output = args.output or args.path.with_suffix('.snapshot')
+    _logger.debug(f"Loading dictionary from {args.path}")
+    try:
+        # hash first, so that edits made while loading make the snapshot stale
+        digest = snapshot.source_hash(args.path)
+        dictionary = Dictionary.from_yaml_dictionary(
+            args.path, workers=args.jobs)
+    except (DictionaryError, OSError) as e:
+        _logger.fatal(f"{e}")
+        return 1
+    errors = [i for i in dictionary.validate(workers=args.jobs) if i.is_error]
+    if errors:
+        for error in errors:
+            _logger.error(error)
+        return 1
+    try:
+        snapshot.write_snapshot(dictionary, output, digest)
+    except (DictionaryError, OSError) as e:
+        _logger.fatal(f"{e}")
+        return 1
+    _logger.info(f"Snapshot written to {output}")
+    if args.search_index:
+        try:
+            from property_rosetta.search import SearchIndex, index_path
+            index = index_path(output)
+            SearchIndex.build(dictionary).save(index)
+        except (ImportError, OSError) as e:
+            _logger.fatal(f"Cannot write search index: {e}")
+            return 1
+        _logger.info(f"Search index written to {index}")
+    return 0
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
 """
 Rosetta common dictionary classes
+
+Data types, enumerations, properties, entities and the dictionary itself
+have a ``fingerprint``, a hash of their content computed bottom-up: the
+fingerprint of an entity covers those of its properties, the fingerprint of
+the dictionary those of all its members. Equal fingerprints mean equal
+content, whether the objects were loaded from yaml or from a snapshot,
+where the fingerprints are stored. Fingerprints are computed on first
+access and kept, :meth:`Dictionary.reindex` forgets them after changes.
 """
 import sys
+import json
+import hashlib
 import logging
-import yaml
 import weakref
+import functools
+import threading
+import concurrent.futures
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import List
-from property_rosetta import __version__
+from property_rosetta import instrumentation, yaml_backend
 
 __author__ = "Claudio Bantaloukas"
 __copyright__ = "Claudio Bantaloukas"
@@ -48,9 +62,329 @@ class DictionaryValidationError(DictionaryError):
     pass
 
 
+class DictionarySnapshotError(DictionaryLoadingError):
+    """Exception signalling a compiled snapshot is invalid or stale"""
+    pass
+
+
+class _YamlReader(object):
+    def __init__(self, backend: str = None):
+        """Reads and parses single yaml files
+
+        This is the default reader used by all the yaml loaders. Calling it
+        returns the whole document of a file, raising OSError or
+        yaml.YAMLError on failure. Any callable with the same contract can be
+        used as a reader instead.
+
+        Readers may also have an iter_items method, yielding the items of a
+        file holding a list one at a time, which the loaders of entity and
+        property lists use when present so that large lists are never held
+        in memory at once.
+
+        Parameters
+        ----------
+        backend : str, optional
+            The yaml backend to parse files with.
+        """
+        self.backend = backend
+
+    def __call__(self, path, backend: str = None):
+        return yaml_backend.load_file(path, backend or self.backend)
+
+    def iter_items(self, path):
+        return yaml_backend.iter_file_items(path, self.backend)
+
+
+_read_yaml_file = _YamlReader()
+
+
+def _iter_yaml_items(reader, path):
+    """Iterates over the items of a yaml list file, streaming them if the reader can"""
+    iter_items = getattr(reader, 'iter_items', None)
+    if iter_items is not None:
+        return iter_items(path)
+    return yaml_backend.list_items(reader(path))
+
+
+def _read_yaml_file_result(path, backend: str = None):
+    """Reads a yaml file returning a (document, exception) pair instead of raising
+
+    Used by worker pools so that failures travel back to the caller in order.
+    """
+    try:
+        return _read_yaml_file(path, backend), None
+    except (OSError, yaml_backend.YAMLError) as exc:
+        return None, exc
+
+
+def _parse_yaml_result(data, backend: str = None):
+    """Parses yaml data returning a (document, exception) pair instead of raising"""
+    try:
+        return yaml_backend.load(data, backend), None
+    except yaml_backend.YAMLError as exc:
+        return None, exc
+
+
+class _YamlPrefetch(object):
+    def __init__(self, workers: int, executor: str = 'thread', backend: str = None,
+                 cache=None):
+        """A yaml reader that parses files ahead of time using a worker pool
+
+        Instances are callables with the same contract as the default reader:
+        parsed documents are returned and read errors are raised when the
+        loaders ask for a given path, so that errors surface in the same
+        order as a sequential load regardless of the order workers finish in.
+
+        Parameters
+        ----------
+        workers : int
+            Maximum number of concurrent workers.
+        executor : str
+            Either 'thread' or 'process'.
+        backend : str, optional
+            The yaml backend used by workers, see :mod:`yaml_backend`.
+        cache : ParseCache, optional
+            Cache consulted before handing files to workers, and updated
+            with their results.
+        """
+        if executor == 'thread':
+            self._pool = concurrent.futures.ThreadPoolExecutor(workers)
+        elif executor == 'process':
+            self._pool = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            raise ValueError(f'Unknown executor {executor}')
+        self._workers = workers
+        self._backend = yaml_backend.get_backend(backend)
+        self._cache = cache
+        self._results = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._pool.shutdown()
+
+    def prefetch(self, paths):
+        """Parses all paths concurrently, waiting for the results"""
+        paths = [p for p in dict.fromkeys(paths) if p not in self._results]
+        if self._cache:
+            self._prefetch_cached(paths)
+            return
+        read = functools.partial(
+            _read_yaml_file_result, backend=self._backend)
+        results = self._pool.map(read, paths, chunksize=self._chunksize(paths))
+        self._results.update(zip(paths, results))
+
+    def _chunksize(self, items):
+        return max(1, len(items) // (4 * self._workers))
+
+    def _prefetch_cached(self, paths):
+        misses = []
+        for path in paths:
+            try:
+                hit, doc, key, data = self._cache.lookup(path)
+            except OSError as exc:
+                self._results[path] = (None, exc)
+                continue
+            if hit:
+                self._results[path] = (doc, None)
+            else:
+                misses.append((path, key, data))
+        parse = functools.partial(_parse_yaml_result, backend=self._backend)
+        results = self._pool.map(parse, [data for _, _, data in misses],
+                                 chunksize=self._chunksize(misses))
+        for (path, key, _), (doc, exc) in zip(misses, results):
+            if not exc:
+                self._cache.store(key, doc)
+            self._results[path] = (doc, exc)
+
+    def dependent_paths(self, path, directory: str, only_existing: bool):
+        """Discovers the per-id files referenced by a prefetched yaml list
+
+        Parameters
+        ----------
+        path
+            A prefetched yaml file containing a list of mappings with an id.
+        directory : str
+            The directory, relative to path, containing one file per id.
+        only_existing : bool
+            Skip files that are not present on disk.
+        """
+        doc, exc = self._results.get(path, (None, None))
+        if exc or not isinstance(doc, list):
+            return []
+        ids = [d.get('id', None) for d in doc if isinstance(d, dict)]
+        paths = [path.parent / directory / f'{i}.yaml' for i in ids if i]
+        if only_existing:
+            paths = [p for p in paths if p.exists()]
+        return paths
+
+    def __call__(self, path):
+        if path not in self._results:
+            if self._cache:
+                return self._cache.read(path, self._backend)
+            return _read_yaml_file(path, self._backend)
+        doc, exc = self._results[path]
+        if exc:
+            raise exc
+        return doc
+
+
+EMPTY_ATTRIBUTES = MappingProxyType({})
+
+# bytes in a fingerprint, which is shown as twice as many hex digits
+FINGERPRINT_SIZE = 16
+
+
+def _canonical(value):
+    # shared attribute maps are read-only mappings
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    return str(value)
+
+
+def _content_hash(kind: str, *fields) -> str:
+    """Returns the fingerprint of a node from its fields and the fingerprints of its children
+
+    Fields are hashed as canonical JSON, so that the fingerprint does not
+    depend on the Python version, on the order of attributes or on how the
+    dictionary was loaded.
+    """
+    data = json.dumps((kind,) + fields, sort_keys=True, separators=(',', ':'),
+                      default=_canonical)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=FINGERPRINT_SIZE).hexdigest()
+
+
+def _freeze_key(value):
+    """Returns a hashable key telling apart values that are not identical
+
+    Scalars are paired with their type, so that 1, 1.0 and True differ.
+
+    Raises
+    ------
+    TypeError
+        If a value cannot be hashed.
+    """
+    if isinstance(value, dict):
+        return (dict,) + tuple((_freeze_key(k), _freeze_key(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return (list,) + tuple(_freeze_key(v) for v in value)
+    hash(value)
+    return (type(value), value)
+
+
+class Interner(object):
+    def __init__(self):
+        """Deduplicates strings and attribute maps while loading a dictionary
+
+        Identifiers go through :func:`sys.intern`, other strings are shared
+        between objects through a table local to the load, and identical
+        attribute maps are replaced by a single read-only mapping.
+
+        Attributes
+        ----------
+        strings : int
+            Number of strings seen.
+        strings_deduplicated : int
+            Number of strings replaced by an equal one seen before.
+        attribute_maps : int
+            Number of attribute maps seen.
+        attribute_maps_deduplicated : int
+            Number of attribute maps replaced by an identical one seen before.
+        """
+        self._strings = {}
+        self._maps = {}
+        self.strings = 0
+        self.strings_deduplicated = 0
+        self.attribute_maps = 0
+        self.attribute_maps_deduplicated = 0
+
+    def stats(self) -> dict:
+        """Returns the deduplication counters"""
+        return {
+            'strings': self.strings,
+            'strings_deduplicated': self.strings_deduplicated,
+            'attribute_maps': self.attribute_maps,
+            'attribute_maps_deduplicated': self.attribute_maps_deduplicated,
+        }
+
+    def string(self, s):
+        """Returns a shared copy of a string, other values are returned as is"""
+        if type(s) is not str:
+            return s
+        self.strings += 1
+        shared = self._strings.setdefault(s, s)
+        if shared is not s:
+            self.strings_deduplicated += 1
+        return shared
+
+    def identifier(self, s):
+        """Returns the interpreter wide interned copy of an identifier"""
+        if type(s) is not str:
+            return s
+        self.strings += 1
+        shared = self._strings.get(s, None)
+        if shared is None:
+            shared = self._strings[s] = sys.intern(s)
+        if shared is not s:
+            self.strings_deduplicated += 1
+        return shared
+
+    def _freeze(self, value):
+        if isinstance(value, dict):
+            return MappingProxyType({self.identifier(k): self._freeze(v)
+                                     for k, v in value.items()})
+        if isinstance(value, (list, tuple)):
+            return tuple(self._freeze(v) for v in value)
+        return self.string(value)
+
+    def attributes(self, attributes):
+        """Returns a shared read-only copy of an attributes map
+
+        Values that are not maps, such as None, are returned as is.
+        """
+        if not isinstance(attributes, dict):
+            return attributes
+        if not attributes:
+            return EMPTY_ATTRIBUTES
+        self.attribute_maps += 1
+        try:
+            key = _freeze_key(attributes)
+        except TypeError:
+            return self._freeze(attributes)
+        shared = self._maps.get(key, None)
+        if shared is None:
+            shared = self._maps[key] = self._freeze(attributes)
+        else:
+            self.attribute_maps_deduplicated += 1
+        return shared
+
+
+class _StreamingInterner(Interner):
+    """Interns identifiers and freezes attribute maps without remembering them
+
+    Used when scanning, so that memory use does not grow with the number of
+    objects seen.
+    """
+
+    def string(self, s):
+        return s
+
+    def identifier(self, s):
+        return sys.intern(s) if type(s) is str else s
+
+    def attributes(self, attributes):
+        if not isinstance(attributes, dict):
+            return attributes
+        return self._freeze(attributes) if attributes else EMPTY_ATTRIBUTES
+
+
 class DictionaryEnumerationValue(object):
     """A value in an enumeration"""
 
+    __slots__ = ('id', 'enumeration', 'integral_value', 'description',
+                 'deprecated', '__weakref__')
+
     def __init__(self, enumeration):
         """A possible enumeration value
         Parameters
@@ -88,7 +422,7 @@ class DictionaryEnumerationValue(object):
         return self.enumeration.entity if self.enumeration else None
 
     @classmethod
-    def from_dict(cls, enumeration, d: dict):
+    def from_dict(cls, enumeration, d: dict, interner: Interner = None):
         """Create from a python dictionary.
 
         Parameters
@@ -97,6 +431,8 @@ class DictionaryEnumerationValue(object):
             The enumeration this value belongs to.
         d
             The dictionary.
+        interner : Interner, optional
+            Shares strings with other objects loaded with the same interner.
 
         Returns
         -------
@@ -108,8 +444,9 @@ class DictionaryEnumerationValue(object):
         DictionaryLoadingError
             If id or integral_value are missing
         """
+        interner = interner or Interner()
         e = DictionaryEnumerationValue(enumeration)
-        e.id = d.get('id', None)
+        e.id = interner.identifier(d.get('id', None))
         if not e.id:
             raise DictionaryLoadingError(
                 'Missing id in enumeration value', None)
@@ -119,18 +456,25 @@ class DictionaryEnumerationValue(object):
         except Exception as exc:
             raise DictionaryLoadingError(
                 f'Invalid integral_value in enumeration value {e.id}', exc)
-        e.description = d.get('description', '')
+        e.description = interner.string(d.get('description', ''))
         e.deprecated = d.get('deprecated', False)
         return e
 
 
 class DictionaryEnumeration(object):
-    def __init__(self, entity):
+    __slots__ = ('id', 'entity', 'name', 'description', 'values',
+                 '_values_by_value_id', '_values_by_integral_value',
+                 '_dictionary', 'deprecated', '_codec', '_fingerprint', '__weakref__')
+
+    def __init__(self, entity, dictionary=None):
         """A generic representation of an enumeration
         Parameters
         ----------
         entity
             The base entity this enumeration belongs to.
+        dictionary
+            The dictionary this enumeration belongs to, for enumerations
+            shared by the whole dictionary rather than owned by an entity.
 
         Attributes
         ----------
@@ -153,55 +497,112 @@ class DictionaryEnumeration(object):
         self.description = None
         self.values = []
         self._values_by_value_id = {}
+        self._values_by_integral_value = {}
+        self._dictionary = weakref.proxy(dictionary) if dictionary else None
         self.deprecated = False
+        self._codec = None
+        self._fingerprint = None
 
     @property
     def dictionary(self):
         """The dictionary this enumeration value belongs to"""
-        return self.entity.dictionary if self.entity else None
+        return self.entity.dictionary if self.entity else self._dictionary
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the enumeration and its values, as hex digits"""
+        if self._fingerprint is None:
+            self._fingerprint = _content_hash(
+                'enumeration', self.id, self.name, self.description, bool(self.deprecated),
+                [(v.id, v.integral_value, v.description, bool(v.deprecated))
+                 for v in self.values])
+        return self._fingerprint
 
     def value_for_id(self, id: str) -> DictionaryEnumerationValue:
         """Returns the value assiciated with an id"""
         return self._values_by_value_id[id]
 
+    def value_for_integral(self, integral_value: int) -> DictionaryEnumerationValue:
+        """Returns the value assiciated with an integral value"""
+        return self._values_by_integral_value[integral_value]
+
+    def reindex(self):
+        """Rebuilds the value lookups, needed after values is modified"""
+        self._values_by_value_id = {v.id: v for v in self.values}
+        self._values_by_integral_value = {
+            v.integral_value: v for v in self.values}
+        self._codec = None
+        self._fingerprint = None
+
+    def codec(self, **policy):
+        """Returns a codec converting arrays of value ids and integral values
+
+        Needs numpy. The codec compiled with the default policy is kept until
+        the next :meth:`reindex`, codecs with another policy are compiled on
+        every call.
+
+        Parameters
+        ----------
+        **policy
+            Keyword arguments of
+            :class:`property_rosetta.codec.EnumerationCodec`.
+
+        Returns
+        -------
+        property_rosetta.codec.EnumerationCodec
+            The compiled codec.
+        """
+        from property_rosetta.codec import EnumerationCodec
+        if policy:
+            return EnumerationCodec(self, **policy)
+        if self._codec is None:
+            self._codec = EnumerationCodec(self)
+        return self._codec
+
     @classmethod
-    def from_dict(cls, entity, d: dict):
-        _logger.debug(f"Loading enumeration {d}")
-        e = DictionaryEnumeration(entity)
-        e.id = d.get('id', None)
+    def from_dict(cls, entity, d: dict, dictionary=None, interner: Interner = None):
+        _logger.debug("Loading enumeration %s", d)
+        interner = interner or Interner()
+        e = DictionaryEnumeration(entity, dictionary)
+        e.id = interner.identifier(d.get('id', None))
         if not e.id:
             raise DictionaryLoadingError('Missing id in enumeration', None)
-        e.name = d.get('name', None)
+        e.name = interner.string(d.get('name', None))
         if not e.name:
             raise DictionaryLoadingError(
                 f'Missing name in enumeration {e.id}', None)
-        e.description = d.get('description', None)
+        e.description = interner.string(d.get('description', None))
         e.deprecated = d.get('deprecated', False)
         e.values = [DictionaryEnumerationValue.from_dict(
-            e, v) for v in d['values']]
+            e, v, interner) for v in d['values']]
         if len(set([v.id for v in e.values])) != len(e.values):
             raise DictionaryValidationError(
                 f'Duplicate value ids in enumeration {e.id}', None)
         if len(set([v.integral_value for v in e.values])) != len(e.values):
             raise DictionaryValidationError(
                 f'Duplicate integral values in enumeration {e.id}', None)
-        e._values_by_value_id = {v.id: weakref.proxy(v) for v in e.values}
+        e.reindex()
         return e
 
     @classmethod
-    def from_yaml_enum_list(cls, entity, path) -> List:
+    def from_yaml_enum_list(cls, entity, path, reader=_read_yaml_file, dictionary=None,
+                            interner: Interner = None) -> List:
         """Returns a list of enumerations from a yaml file"""
+        interner = interner or Interner()
         try:
-            _logger.debug(f"Loading enumerations from {path}")
-            with open(path) as f:
-                yamlenum = yaml.safe_load(f)
-            return [DictionaryEnumeration.from_dict(entity, d) for d in yamlenum]
-        except (OSError, yaml.YAMLError) as exc:
+            _logger.debug("Loading enumerations from %s", path)
+            yamlenum = reader(path)
+            return [DictionaryEnumeration.from_dict(entity, d, dictionary, interner)
+                    for d in yamlenum]
+        except (OSError, yaml_backend.YAMLError) as exc:
             raise DictionaryLoadingError(
                 f"Error reading enumeration file: {path}", exc)
 
 
 class DictionaryDataType(object):
+    __slots__ = ('id', 'dictionary', 'name', 'description', 'semantics',
+                 'attributes', 'deprecated', '_fingerprint', '__weakref__')
+
     def __init__(self, dictionary):
         """A generic representation of a data type
         Parameters
@@ -233,50 +634,64 @@ class DictionaryDataType(object):
         self.semantics = 'value'
         self.attributes = {}
         self.deprecated = False
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the data type, as hex digits"""
+        if self._fingerprint is None:
+            self._fingerprint = _content_hash(
+                'data type', self.id, self.name, self.description, self.semantics,
+                self.attributes, bool(self.deprecated))
+        return self._fingerprint
 
     @classmethod
-    def from_dict(cls, dictionary, d: dict):
-        _logger.debug(f"Loading data type {d}")
+    def from_dict(cls, dictionary, d: dict, interner: Interner = None):
+        _logger.debug("Loading data type %s", d)
+        interner = interner or Interner()
         e = DictionaryDataType(dictionary)
-        e.id = d.get('id', None)
+        e.id = interner.identifier(d.get('id', None))
         if not e.id:
             raise DictionaryLoadingError('Missing id in data type', None)
-        e.name = d.get('name', None)
+        e.name = interner.string(d.get('name', None))
         if not e.name:
             raise DictionaryLoadingError(
                 f'Missing name in data type {e.id}', None)
-        e.description = d.get('description', None)
-        e.semantics = d.get('semantics', 'value')
-        e.attributes = d.get('attributes', {})
+        e.description = interner.string(d.get('description', None))
+        e.semantics = interner.identifier(d.get('semantics', 'value'))
+        e.attributes = interner.attributes(d.get('attributes', {}))
         e.deprecated = d.get('deprecated', False)
         return e
 
     @classmethod
-    def from_yaml_data_type_list(cls, dictionary, path) -> List:
+    def from_yaml_data_type_list(cls, dictionary, path, reader=_read_yaml_file,
+                                 interner: Interner = None) -> List:
         """Returns a list of enumerations from a yaml file"""
+        interner = interner or Interner()
         try:
-            _logger.debug(f"Loading data types from {path}")
-            with open(path) as f:
-                yamlenum = yaml.safe_load(f)
+            _logger.debug("Loading data types from %s", path)
+            yamlenum = reader(path)
             ret = []
             for dt in yamlenum:
-                v = DictionaryDataType.from_dict(dictionary, dt)
+                v = DictionaryDataType.from_dict(dictionary, dt, interner)
                 attributes_path = path.parent / \
                     'data-type-attributes' / f'{v.id}.yaml'
                 if attributes_path.exists():
-                    _logger.debug(
-                        f"Loading attributes for data type {v.id} from {attributes_path}")
-                    with open(attributes_path) as af:
-                        attributes = yaml.safe_load(af)
-                        v.attributes = attributes
+                    _logger.debug("Loading attributes for data type %s from %s",
+                                  v.id, attributes_path)
+                    v.attributes = interner.attributes(
+                        reader(attributes_path))
                 ret.append(v)
             return ret
-        except (OSError, yaml.YAMLError) as exc:
+        except (OSError, yaml_backend.YAMLError) as exc:
             raise DictionaryLoadingError(
                 f"Error reading enumeration file: {path}", exc)
 
 
 class DictionaryProperty(object):
+    __slots__ = ('id', 'entity', 'name', 'type_id', 'description',
+                 'entity_id', 'attributes', 'deprecated', '_fingerprint', '__weakref__')
+
     def __init__(self, entity):
         """A generic representation of a property of an entity
 
@@ -310,52 +725,131 @@ class DictionaryProperty(object):
         self.description = None
         self.entity_id = None
         self.attributes = {}
+        self.deprecated = False
+        self._fingerprint = None
 
     @property
     def dictionary(self):
         """The dictionary this enumeration value belongs to"""
         return self.entity.dictionary if self.entity else None
 
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the property, as hex digits"""
+        if self._fingerprint is None:
+            self._fingerprint = _content_hash(
+                'property', self.id, self.name, self.type_id, self.description,
+                self.attributes, bool(self.deprecated))
+        return self._fingerprint
+
     @property
     def dictionary_type(self):
         return self.dictionary.type_by_id(self.type_id) if self.dictionary else None
 
     @classmethod
-    def from_dict(cls, entity, d: dict):
-        _logger.debug(f"Loading property {d}")
+    def from_dict(cls, entity, d: dict, interner: Interner = None):
+        _logger.debug("Loading property %s", d)
+        interner = interner or Interner()
         e = DictionaryProperty(entity)
-        e.id = d.get('id', None)
+        e.id = interner.identifier(d.get('id', None))
         if not e.id:
             raise DictionaryLoadingError('Missing id in property', None)
-        e.name = d.get('name', None)
+        e.name = interner.string(d.get('name', None))
         if not e.name:
             raise DictionaryLoadingError(
                 f'Missing name in property {e.id}', None)
-        e.type_id = d.get('type', None)
+        e.type_id = interner.identifier(d.get('type', None))
         if not e.type_id:
             raise DictionaryLoadingError(
                 f'Missing type in property {e.id}', None)
-        e.description = d.get('description', None)
-        e.attributes = d.get('attributes', {})
+        e.description = interner.string(d.get('description', None))
+        e.attributes = interner.attributes(d.get('attributes', {}))
         e.deprecated = d.get('deprecated', False)
         return e
 
     @classmethod
-    def from_yaml_property_list(cls, entity, path) -> List:
+    def from_yaml_property_list(cls, entity, path, reader=_read_yaml_file,
+                                interner: Interner = None) -> List:
         """Returns a list of properties from a yaml file"""
+        return list(DictionaryProperty.iter_yaml_property_list(entity, path, reader, interner))
+
+    @classmethod
+    def iter_yaml_property_list(cls, entity, path, reader=_read_yaml_file,
+                                interner: Interner = None):
+        """Yields the properties of a yaml file one at a time
+
+        With a reader able to stream, the default one, each property is
+        parsed only when the previous one has been consumed.
+        """
+        interner = interner or Interner()
+        count = 0
         try:
-            _logger.debug(f"Loading properties from {path}")
-            with open(path) as f:
-                yamllist = yaml.safe_load(f)
-            return [DictionaryProperty.from_dict(entity, prop) for prop in yamllist]
-        except (OSError, yaml.YAMLError) as exc:
+            _logger.debug("Loading properties from %s", path)
+            for prop in _iter_yaml_items(reader, path):
+                p = DictionaryProperty.from_dict(entity, prop, interner)
+                count += 1
+                yield p
+        except (OSError, yaml_backend.YAMLError) as exc:
             raise DictionaryLoadingError(
                 f"Error reading property list file: {path}", exc)
+        finally:
+            instrumentation.count(instrumentation.PROPERTIES, count)
+
+
+def iter_properties(path, entity=None, backend: str = None, interner: Interner = None):
+    """Yields the properties of a yaml property list file one at a time
+
+    The file is parsed as a stream, only the property being yielded is held
+    in memory, so tools scanning huge property files never materialize them.
+
+    Parameters
+    ----------
+    path
+        Path to the property list file, such as
+        properties-by-entity/<entity id>.yaml.
+    entity : DictionaryEntity, optional
+        The entity the properties are attached to.
+    backend : str, optional
+        The yaml backend to parse the file with.
+    interner : Interner, optional
+        Shares strings and attribute maps between the properties. Without
+        one, nothing is shared and memory use does not grow with the file.
+
+    Raises
+    ------
+    DictionaryLoadingError
+        If the file is missing or invalid, possibly after some properties
+        have been yielded.
+    """
+    return DictionaryProperty.iter_yaml_property_list(
+        entity, path, _YamlReader(backend), interner or _StreamingInterner())
+
+
+class _PropertyLoader(object):
+    """Loads the properties of an entity on first access"""
+
+    __slots__ = ('path', 'reader', 'interner', 'lock')
+
+    def __init__(self, path, reader, interner: Interner):
+        self.path = path
+        self.reader = reader
+        self.interner = interner
+        self.lock = threading.Lock()
+
+    def load(self, entity) -> List:
+        _logger.debug("Loading properties for entity %s from %s", entity.id, self.path)
+        with instrumentation.span(instrumentation.BUILD):
+            return DictionaryProperty.from_yaml_property_list(
+                entity, self.path, self.reader, self.interner)
 
 
 class DictionaryEntity(object):
     """A generic representation of a base entity"""
 
+    __slots__ = ('dictionary', 'id', 'name', 'description', '_properties',
+                 '_properties_loader', '_properties_by_id', 'attributes', 'deprecated',
+                 '_fingerprint', '__weakref__')
+
     def __init__(self, dictionary):
         """A generic representation of a base entity
 
@@ -372,7 +866,9 @@ class DictionaryEntity(object):
         name : str
             A unique readable brief name for a base entity
         properties : list
-            a list of properties that the entity can contain
+            a list of properties that the entity can contain. When the
+            dictionary was loaded lazily, they are read from their file on
+            first access, which raises DictionaryLoadingError if that fails
         attributes : map
             custom attributes of the base entity. Useful to inform code generators
         deprecated : bool
@@ -382,60 +878,263 @@ class DictionaryEntity(object):
         self.id = None
         self.name = None
         self.description = None
-        self.properties = []
+        self._properties = []
+        self._properties_loader = None
         self._properties_by_id = {}
         self.attributes = {}
         self.deprecated = False
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the entity and of the fingerprints of its properties, as hex digits
+
+        Loads the properties of entities loaded lazily.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = _content_hash(
+                'entity', self.id, self.name, self.description, self.attributes,
+                bool(self.deprecated), [p.fingerprint for p in self.properties])
+        return self._fingerprint
+
+    @property
+    def properties(self) -> List:
+        if self._properties_loader is not None:
+            self.preload()
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties: List):
+        self._properties_loader = None
+        self._properties = properties
+
+    @property
+    def properties_loaded(self) -> bool:
+        """Whether the properties are in memory, False until a lazy load happens"""
+        return self._properties_loader is None
+
+    def preload(self):
+        """Loads the properties now if they are loaded lazily
+
+        Concurrent calls load the properties only once.
+
+        Raises
+        ------
+        DictionaryLoadingError
+            If the property file is missing or invalid. The load is
+            attempted again on the next access.
+        """
+        loader = self._properties_loader
+        if loader is None:
+            return
+        with loader.lock:
+            if self._properties_loader is None:
+                return
+            properties = loader.load(self)
+            self._properties = properties
+            self._properties_by_id = {p.id: p for p in properties}
+            # cleared last, threads seeing no loader see the properties
+            self._properties_loader = None
 
     def property_by_id(self, property_id):
+        if self._properties_loader is not None:
+            self.preload()
         return self._properties_by_id.get(property_id, None)
 
+    def reindex(self):
+        """Rebuilds the property lookup and forgets the fingerprints, needed after changes"""
+        self._fingerprint = None
+        if self._properties_loader is None:
+            self._properties_by_id = {p.id: p for p in self._properties}
+            for p in self._properties:
+                p._fingerprint = None
+
     @classmethod
-    def from_dict(cls, dictionary, d: dict):
-        _logger.debug(f"Loading entity {d}")
+    def from_dict(cls, dictionary, d: dict, interner: Interner = None):
+        _logger.debug("Loading entity %s", d)
+        interner = interner or Interner()
         e = DictionaryEntity(dictionary)
-        e.id = d.get('id', None)
+        e.id = interner.identifier(d.get('id', None))
         if not e.id:
             raise DictionaryLoadingError('Missing id in entity', None)
-        e.name = d.get('name', None)
+        e.name = interner.string(d.get('name', None))
         if not e.name:
             raise DictionaryLoadingError(
                 f'Missing name in entity {e.id}', None)
-        e.description = d.get('description', None)
+        e.description = interner.string(d.get('description', None))
         if 'properties' in d:
             e.properties = [DictionaryProperty.from_dict(
-                dictionary, p) for p in d['properties']]
-            e._properties_by_id = {
-                p.id: weakref.proxy(p) for p in e.properties}
-        e.attributes = d.get('attributes', {})
+                e, p, interner) for p in d['properties']]
+            e.reindex()
+        e.attributes = interner.attributes(d.get('attributes', {}))
         e.deprecated = d.get('deprecated', False)
         return e
 
     @classmethod
-    def from_yaml_entity_list(cls, dictionary, path) -> List:
-        """Returns a list of entities from a yaml file"""
+    def from_yaml_entity_list(cls, dictionary, path, reader=_read_yaml_file,
+                              interner: Interner = None, lazy: bool = False) -> List:
+        """Returns a list of entities from a yaml file
+
+        Unless lazy is True, the properties of each entity are read from
+        properties-by-entity/<entity id>.yaml right away. Otherwise they are
+        read with the same reader on first access.
+        """
+        interner = interner or Interner()
         try:
-            _logger.debug(f"Loading entities from {path}")
-            with open(path) as f:
-                yamlentities = yaml.safe_load(f)
+            _logger.debug("Loading entities from %s", path)
             ret = []
-            for e in yamlentities:
-                v = DictionaryEntity.from_dict(dictionary, e)
+            for e in _iter_yaml_items(reader, path):
+                v = DictionaryEntity.from_dict(dictionary, e, interner)
                 properties_path = path.parent / \
                     'properties-by-entity' / f'{v.id}.yaml'
-                _logger.debug(
-                    f"Loading properties for entity {v.id} from {properties_path}")
+                if lazy:
+                    v._properties_loader = _PropertyLoader(properties_path, reader, interner)
+                    ret.append(v)
+                    continue
+                _logger.debug("Loading properties for entity %s from %s", v.id, properties_path)
                 v.properties = DictionaryProperty.from_yaml_property_list(
-                    v, properties_path)
-                v._properties_by_id = {
-                    p.id: weakref.proxy(p) for p in v.properties}
+                    v, properties_path, reader, interner)
+                v.reindex()
                 ret.append(v)
             return ret
-        except (OSError, yaml.YAMLError) as exc:
+        except (OSError, yaml_backend.YAMLError) as exc:
             raise DictionaryLoadingError(
                 f"Error reading enumeration file: {path}", exc)
 
 
+class DictionaryDialectProperty(object):
+    """How a dialect names a property of the dictionary and its values"""
+
+    __slots__ = ('dialect', 'property_id', 'name', 'values', '__weakref__')
+
+    def __init__(self, dialect):
+        """A property as seen by a dialect
+
+        Parameters
+        ----------
+        dialect
+            The dialect this mapping belongs to.
+
+        Attributes
+        ----------
+        property_id : str
+            Id of the property of the dictionary.
+        name : str
+            Name of the property in the dialect.
+        values : map
+            Enumeration value ids of the dictionary by dialect value, for
+            dialects that spell the values of an enumeration differently.
+            Values missing from the map are the same in the dialect.
+        """
+        self.dialect = weakref.proxy(dialect) if dialect else None
+        self.property_id = None
+        self.name = None
+        self.values = EMPTY_ATTRIBUTES
+
+    @classmethod
+    def from_dict(cls, dialect, d: dict, interner: Interner = None):
+        interner = interner or Interner()
+        e = DictionaryDialectProperty(dialect)
+        e.property_id = interner.identifier(d.get('property', None))
+        if not e.property_id:
+            raise DictionaryLoadingError('Missing property in dialect property', None)
+        e.name = interner.identifier(d.get('name', None))
+        if not e.name:
+            raise DictionaryLoadingError(
+                f'Missing name in dialect property {e.property_id}', None)
+        # 'values:' with nothing after it is an empty mapping
+        values = d.get('values', None) or {}
+        if not isinstance(values, Mapping):
+            raise DictionaryLoadingError(
+                f'Values of dialect property {e.property_id} must be a mapping', None)
+        e.values = interner.attributes(values)
+        if len(set(e.values.values())) != len(e.values):
+            raise DictionaryValidationError(
+                f'Several values map to the same value of {e.property_id}', None)
+        return e
+
+
+class DictionaryDialect(object):
+    __slots__ = ('id', 'dictionary', 'name', 'description', 'properties',
+                 '_properties_by_id', 'deprecated', '__weakref__')
+
+    def __init__(self, dictionary):
+        """The names another system uses for the properties of a dictionary
+
+        Parameters
+        ----------
+        dictionary
+            The dictionary this dialect belongs to.
+
+        Attributes
+        ----------
+        id : str
+            A unique identifier for a dialect.
+        name : str
+            A unique readable brief name for a dialect
+        description : str
+            a long winded description of the dialect
+        properties : list
+            the DictionaryDialectProperty of each property the dialect names
+            differently, other properties keep their id as name
+        deprecated : bool
+            whether the dialect is deprecated and should no longer be used
+        """
+        self.id = None
+        self.dictionary = weakref.proxy(dictionary) if dictionary else None
+        self.name = None
+        self.description = None
+        self.properties = []
+        self._properties_by_id = {}
+        self.deprecated = False
+
+    def property_by_id(self, property_id) -> DictionaryDialectProperty:
+        """Returns how the dialect names a property of the dictionary, None if it keeps its id"""
+        return self._properties_by_id.get(property_id, None)
+
+    def reindex(self):
+        """Rebuilds the property lookup, needed after properties is modified"""
+        self._properties_by_id = {p.property_id: p for p in self.properties}
+
+    @classmethod
+    def from_dict(cls, dictionary, d: dict, interner: Interner = None):
+        _logger.debug("Loading dialect %s", d)
+        interner = interner or Interner()
+        e = DictionaryDialect(dictionary)
+        e.id = interner.identifier(d.get('id', None))
+        if not e.id:
+            raise DictionaryLoadingError('Missing id in dialect', None)
+        e.name = interner.string(d.get('name', None))
+        if not e.name:
+            raise DictionaryLoadingError(
+                f'Missing name in dialect {e.id}', None)
+        e.description = interner.string(d.get('description', None))
+        e.deprecated = d.get('deprecated', False)
+        e.properties = [DictionaryDialectProperty.from_dict(e, p, interner)
+                        for p in d.get('properties', None) or []]
+        if len(set(p.property_id for p in e.properties)) != len(e.properties):
+            raise DictionaryValidationError(
+                f'Duplicate properties in dialect {e.id}', None)
+        if len(set(p.name for p in e.properties)) != len(e.properties):
+            raise DictionaryValidationError(
+                f'Duplicate property names in dialect {e.id}', None)
+        e.reindex()
+        return e
+
+    @classmethod
+    def from_yaml_dialect_list(cls, dictionary, path, reader=_read_yaml_file,
+                               interner: Interner = None) -> List:
+        """Returns a list of dialects from a yaml file"""
+        interner = interner or Interner()
+        try:
+            _logger.debug("Loading dialects from %s", path)
+            return [DictionaryDialect.from_dict(dictionary, d, interner)
+                    for d in yaml_backend.list_items(reader(path))]
+        except (OSError, yaml_backend.YAMLError) as exc:
+            raise DictionaryLoadingError(
+                f"Error reading dialect file: {path}", exc)
+
+
 class Dictionary(object):
     """A common dictionary for bridging dialects
 
@@ -444,19 +1143,192 @@ class Dictionary(object):
     * base entities
     * properties contained within each entity
     * enumeration values
+
+    Enumerations are read from the optional enumerations.yaml file that sits
+    next to data-types.yaml and entities.yaml, dialects from the optional
+    dialects.yaml file, see :mod:`property_rosetta.translate`.
+
+    Data types, enumerations, entities, properties and dialects can be
+    looked up by id in constant time through hash indexes built once when
+    the dictionary is loaded. Code modifying data_types, enumerations,
+    entities or dialects afterwards must call :meth:`reindex`.
+
+    Dictionaries loaded with lazy=True read the properties of each entity on
+    first access. Looking a property up by id on the whole dictionary then
+    loads the entities whose id prefixes the property id first, and all
+    remaining ones only if the property is not found there.
     """
 
     def __init__(self):
         self.id = None
+        self.name = None
         self.description = None
         self.version = None
+        self.deprecated = False
         self.data_types = None
+        self.enumerations = []
         self.entities = []
+        self.dialects = []
+        self.yaml_backend = None
+        self.interning_stats = None
+        self.source_digests = None
+        self._types_by_id = None
+        self._enumerations_by_id = None
+        self._entities_by_id = None
+        self._properties_by_id = None
+        self._dialects_by_id = None
+        self._fingerprint = None
+        # entities whose properties are not in _properties_by_id yet
+        self._unindexed_entities = []
+        self._unindexed_lock = threading.Lock()
+
+    def reindex(self):
+        """Rebuilds all the id lookups of the dictionary and of its members
+
+        When ids are duplicated, lookups return the first definition. The
+        fingerprints of the dictionary and of its members are computed again
+        on their next access, and source_digests is forgotten.
+        """
+        self._fingerprint = None
+        self.source_digests = None
+        types_by_id = {}
+        for t in self.data_types or []:
+            t._fingerprint = None
+            types_by_id.setdefault(t.id, t)
+        enumerations_by_id = {}
+        for e in self.enumerations:
+            e.reindex()
+            enumerations_by_id.setdefault(e.id, e)
+        entities_by_id = {}
+        properties_by_id = {}
+        unindexed_entities = []
+        for e in self.entities:
+            e.reindex()
+            entities_by_id.setdefault(e.id, e)
+            if not e.properties_loaded:
+                unindexed_entities.append(e)
+                continue
+            for p in e.properties:
+                properties_by_id.setdefault(p.id, p)
+        dialects_by_id = {}
+        for d in self.dialects:
+            d.reindex()
+            dialects_by_id.setdefault(d.id, d)
+        self._types_by_id = types_by_id
+        self._enumerations_by_id = enumerations_by_id
+        self._entities_by_id = entities_by_id
+        self._properties_by_id = properties_by_id
+        self._dialects_by_id = dialects_by_id
+        self._unindexed_entities = unindexed_entities
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the whole dictionary, as hex digits
+
+        Two dictionaries with the same fingerprint have the same content,
+        down to the attributes of every property. Loads the properties of
+        all entities of dictionaries loaded lazily.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = _content_hash(
+                'dictionary', self.id, self.name, self.description, self.version,
+                bool(self.deprecated),
+                [t.fingerprint for t in self.data_types or []],
+                [e.fingerprint for e in self.enumerations],
+                [e.fingerprint for e in self.entities],
+                [(d.id, d.name, d.description, bool(d.deprecated),
+                  [(p.property_id, p.name, list(p.values.items())) for p in d.properties])
+                 for d in self.dialects])
+        return self._fingerprint
+
+    def _index(self, name: str) -> dict:
+        index = getattr(self, name)
+        if index is None:
+            self.reindex()
+            index = getattr(self, name)
+        return index
+
+    def type_by_id(self, type_id) -> DictionaryDataType:
+        """Returns the data type with an id, None if missing"""
+        return self._index('_types_by_id').get(type_id, None)
+
+    def enumeration_by_id(self, enumeration_id) -> DictionaryEnumeration:
+        """Returns the enumeration with an id, None if missing"""
+        return self._index('_enumerations_by_id').get(enumeration_id, None)
+
+    def entity_by_id(self, entity_id) -> DictionaryEntity:
+        """Returns the entity with an id, None if missing"""
+        return self._index('_entities_by_id').get(entity_id, None)
+
+    def dialect_by_id(self, dialect_id) -> DictionaryDialect:
+        """Returns the dialect with an id, None if missing"""
+        return self._index('_dialects_by_id').get(dialect_id, None)
+
+    def property_by_id(self, property_id) -> DictionaryProperty:
+        """Returns the property with an id from any entity, None if missing"""
+        index = self._index('_properties_by_id')
+        p = index.get(property_id, None)
+        if p is None and self._unindexed_entities:
+            p = self._property_by_id_loading(index, property_id)
+        return p
+
+    def _property_by_id_loading(self, index: dict, property_id) -> DictionaryProperty:
+        with self._unindexed_lock:
+            unindexed = self._unindexed_entities
+            # ids are usually prefixed by the id of their entity
+            likely = [e for e in unindexed if e.properties_loaded or (
+                isinstance(property_id, str) and property_id.startswith(f'{e.id}.'))]
+            for entities in (likely, unindexed):
+                for e in entities:
+                    for p in e.properties:
+                        index.setdefault(p.id, p)
+                indexed = set(map(id, entities))
+                self._unindexed_entities = [e for e in unindexed if id(e) not in indexed]
+                if property_id in index:
+                    break
+            return index.get(property_id, None)
+
+    def preload(self, workers: int = None):
+        """Loads the properties of all the entities, for dictionaries loaded lazily
+
+        Parameters
+        ----------
+        workers : int, optional
+            When greater than one, property files are loaded by this many
+            threads.
+
+        Raises
+        ------
+        DictionaryLoadingError
+            If a property file is missing or invalid.
+        """
+        pending = [e for e in self.entities if not e.properties_loaded]
+        if workers and workers > 1:
+            with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                list(pool.map(DictionaryEntity.preload, pending))
+        else:
+            for e in pending:
+                e.preload()
+        if self._properties_by_id is not None:
+            index = self._properties_by_id
+            with self._unindexed_lock:
+                for e in self._unindexed_entities:
+                    for p in e.properties:
+                        index.setdefault(p.id, p)
+                self._unindexed_entities = []
 
     @classmethod
-    def from_dict(cls, d: dict):
+    def from_dict(cls, d: dict, interner: Interner = None):
+        """Create from a python dictionary.
+
+        Besides id, name, description, version and deprecated, the python
+        dictionary can contain data_types, enumerations, entities and
+        dialects lists, each item being what the respective from_dict
+        expects.
+        """
         import semver
-        _logger.debug(f"Loading dictionary {d}")
+        interner = interner or Interner()
+        _logger.debug("Loading dictionary %s", d)
         e = Dictionary()
         e.id = d.get('id', None)
         if not e.id:
@@ -474,26 +1346,232 @@ class Dictionary(object):
             raise DictionaryValidationError(
                 f'Version {e.version} in dictionary {e.id} is invalid')
         e.deprecated = d.get('deprecated', False)
+        if 'data_types' in d:
+            e.data_types = [DictionaryDataType.from_dict(
+                e, t, interner) for t in d['data_types']]
+        if 'enumerations' in d:
+            e.enumerations = [DictionaryEnumeration.from_dict(
+                None, n, e, interner) for n in d['enumerations']]
+        if 'entities' in d:
+            e.entities = [DictionaryEntity.from_dict(
+                e, n, interner) for n in d['entities']]
+        if 'dialects' in d:
+            e.dialects = [DictionaryDialect.from_dict(
+                e, n, interner) for n in d['dialects']]
+        e.interning_stats = interner.stats()
+        e.reindex()
         return e
 
     @classmethod
-    def from_yaml_dictionary(cls, path) -> List:
-        """Returns a dictionary from a yaml file using files in relative paths"""
-        try:
-            _logger.debug(f"Loading dictionary from {path}")
-            with open(path) as f:
-                yamldictionary = yaml.safe_load(f)
-            ret = Dictionary.from_dict(yamldictionary)
-        except (OSError, yaml.YAMLError) as exc:
-            raise DictionaryLoadingError(
-                f"Error reading dictionary file: {path}", exc)
-        datatypes_path = path.parent / 'data-types.yaml'
-        ret.data_types = DictionaryDataType.from_yaml_data_type_list(
-            ret, datatypes_path)
-        entities_path = path.parent / 'entities.yaml'
-        ret.entities = DictionaryEntity.from_yaml_entity_list(
-            ret, entities_path)
+    def from_yaml_dictionary(cls, path, workers: int = None, executor: str = 'thread',
+                             backend: str = None, cache=None, lazy: bool = False) -> List:
+        """Returns a dictionary from a yaml file using files in relative paths
+
+        Parameters
+        ----------
+        path
+            Path to the dictionary yaml file.
+        workers : int, optional
+            When greater than one, all the data type, attribute, entity and
+            property files are discovered up front and parsed concurrently
+            by this many workers before the dictionary is assembled.
+        executor : str
+            Worker pool to parse files with when workers is greater than one,
+            either 'thread' or 'process'.
+        backend : str, optional
+            The yaml backend to parse files with, 'libyaml' or 'python'.
+            Defaults to the fastest available, the one used is stored in the
+            yaml_backend attribute of the returned dictionary.
+        cache : ParseCache, optional
+            A persistent parse cache, see :mod:`property_rosetta.cache`. Only
+            files that changed since they were cached are parsed.
+        lazy : bool
+            Read the properties of each entity only when they are first
+            accessed, see :meth:`preload`. Only a handful of files are then
+            read up front, and workers are not used.
+
+        Identifiers are interned and identical attribute maps are shared as
+        read-only mappings, the counters of the :class:`Interner` used are
+        stored in the interning_stats attribute of the returned dictionary.
+
+        When loaded through a cache, and not lazily, the source_digests
+        attribute of the returned dictionary maps the path of every file of
+        the dictionary, relative to its directory, to the hash of the
+        content it was loaded from, see :meth:`sources_of`.
+
+        Raises
+        ------
+        DictionaryLoadingError
+            If a file is missing or invalid. When loading concurrently, the
+            error reported is the one a sequential load would have raised.
+        """
+        with instrumentation.span(instrumentation.BUILD):
+            try:
+                _logger.debug("Loading dictionary from %s", path)
+                backend = yaml_backend.get_backend(backend)
+                _logger.debug("Using %s yaml backend", backend)
+                if cache and lazy:
+                    # property files are read after this returns
+                    def read(path):
+                        try:
+                            return cache.read(path, backend)
+                        finally:
+                            cache.flush()
+                elif cache:
+                    read = functools.partial(cache.read, backend=backend)
+                else:
+                    read = _YamlReader(backend)
+                interner = Interner()
+                ret = Dictionary.from_dict(read(path), interner)
+            except (OSError, yaml_backend.YAMLError) as exc:
+                raise DictionaryLoadingError(
+                    f"Error reading dictionary file: {path}", exc)
+            ret.yaml_backend = backend
+            datatypes_path = path.parent / 'data-types.yaml'
+            enumerations_path = path.parent / 'enumerations.yaml'
+            entities_path = path.parent / 'entities.yaml'
+            dialects_path = path.parent / 'dialects.yaml'
+            try:
+                if lazy or not workers or workers <= 1:
+                    ret._load_yaml_contents(
+                        datatypes_path, enumerations_path, entities_path, read, interner, lazy)
+                else:
+                    ret._load_yaml_contents_concurrently(
+                        datatypes_path, enumerations_path, entities_path,
+                        _YamlPrefetch(workers, executor, backend, cache), interner)
+                if dialects_path.exists():
+                    ret.dialects = DictionaryDialect.from_yaml_dialect_list(
+                        ret, dialects_path, read, interner)
+            finally:
+                if cache:
+                    cache.flush()
+            ret.interning_stats = interner.stats()
+            _logger.debug("Interning stats %s", ret.interning_stats)
+            ret.reindex()
+            if cache and not lazy:
+                ret.source_digests = {
+                    name: cache.digest(path.parent / name)
+                    for name in [path.name] + ret._source_files()}
+        instrumentation.count(instrumentation.DATA_TYPES, len(ret.data_types))
+        instrumentation.count(instrumentation.ENUMERATIONS, len(ret.enumerations))
+        instrumentation.count(instrumentation.ENTITIES, len(ret.entities))
         return ret
 
-    def validate(self):
-        return []
+    def _source_files(self, kind: str = None, id=None) -> List[str]:
+        """Returns the yaml files an object is loaded from
+
+        Without a kind, returns the files of all the objects and of the
+        dialects, which is all of them but the dictionary file.
+        """
+        if kind == 'data type':
+            return ['data-types.yaml', f'data-type-attributes/{id}.yaml']
+        if kind == 'enumeration':
+            return ['enumerations.yaml']
+        if kind == 'entity':
+            return ['entities.yaml', f'properties-by-entity/{id}.yaml']
+        return (['dialects.yaml'] +
+                [f for t in self.data_types or [] for f in self._source_files('data type', t.id)] +
+                self._source_files('enumeration') +
+                [f for e in self.entities for f in self._source_files('entity', e.id)])
+
+    def sources_of(self, kind: str, id=None) -> dict:
+        """Returns the hashes of the files a data type, enumeration or entity was loaded from
+
+        Parameters
+        ----------
+        kind : str
+            One of 'data type', 'enumeration', 'entity' or 'dictionary' for
+            all the files of the dictionary.
+        id
+            Id of the object.
+
+        Returns
+        -------
+        dict
+            The hash of each file by path relative to the dictionary
+            directory, None for files that do not exist. Objects loaded from
+            files with the same hashes have the same content, and the same
+            fingerprint. None when source_digests is not known.
+        """
+        if self.source_digests is None:
+            return None
+        # without enumerations.yaml, enumerations come from the dictionary file
+        if kind == 'dictionary' or \
+                kind == 'enumeration' and self.source_digests.get('enumerations.yaml') is None:
+            return self.source_digests
+        return {f: self.source_digests.get(f, None) for f in self._source_files(kind, id)}
+
+    def _load_yaml_contents_concurrently(self, datatypes_path, enumerations_path,
+                                         entities_path, prefetch, interner):
+        with prefetch as reader:
+            reader.prefetch([datatypes_path, entities_path] +
+                            [p for p in [enumerations_path] if p.exists()])
+            reader.prefetch(
+                reader.dependent_paths(
+                    datatypes_path, 'data-type-attributes', True) +
+                reader.dependent_paths(
+                    entities_path, 'properties-by-entity', False))
+            self._load_yaml_contents(
+                datatypes_path, enumerations_path, entities_path, reader, interner)
+
+    @classmethod
+    def from_snapshot(cls, path, source=None):
+        """Returns a dictionary from a snapshot written by rosetta-compile
+
+        Parameters
+        ----------
+        path
+            Path to the snapshot file.
+        source : optional
+            Path to the dictionary yaml file the snapshot was compiled from.
+            When given, the snapshot is rejected if any of the yaml sources
+            changed since it was compiled.
+
+        Raises
+        ------
+        DictionarySnapshotError
+            If the snapshot cannot be read, is invalid or is stale.
+        """
+        from property_rosetta import snapshot
+        return snapshot.read_snapshot(path, source)
+
+    def _load_yaml_contents(self, datatypes_path, enumerations_path, entities_path,
+                            reader, interner, lazy=False):
+        self.data_types = DictionaryDataType.from_yaml_data_type_list(
+            self, datatypes_path, reader, interner)
+        if enumerations_path.exists():
+            self.enumerations = DictionaryEnumeration.from_yaml_enum_list(
+                None, enumerations_path, reader, self, interner)
+        self.entities = DictionaryEntity.from_yaml_entity_list(
+            self, entities_path, reader, interner, lazy)
+
+    def validate(self, rules=None, workers: int = None, state=None) -> List:
+        """Checks the dictionary against validation rules
+
+        Parameters
+        ----------
+        rules : list, optional
+            The :class:`property_rosetta.validation.Rule` objects to run,
+            defaults to property_rosetta.validation.DEFAULT_RULES.
+        workers : int, optional
+            When greater than one, entities are checked by this many
+            threads. Rules written in Python hold the GIL, so this only
+            speeds up rules that release it, such as rules calling into
+            native code or doing I/O.
+        state : ValidationState, optional
+            Results of a previous validation, see
+            :class:`property_rosetta.validation.ValidationState`. Only the
+            rules whose inputs changed since are evaluated again, and state
+            is updated in place.
+
+        Returns
+        -------
+        list
+            All the :class:`property_rosetta.validation.ValidationIssue`
+            found, errors and warnings, in a deterministic order.
+        """
+        from property_rosetta.validation import Validator
+        with instrumentation.span(instrumentation.VALIDATE):
+            issues = Validator(rules, workers).validate(self, state)
+        instrumentation.count(instrumentation.ISSUES, len(issues))
+        return issues
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Structural comparison of two versions of a dictionary
+
+:func:`diff` lists the data types, enumerations, enumeration values,
+entities, properties, dialects and dialect properties added, removed,
+changed, newly deprecated or no longer deprecated between two dictionaries,
+and tells which changes break users of the old version:
+
+* removing anything, changing the type of a property, the integral value of
+  an enumeration value or the semantics of a data type is breaking and needs
+  a major version
+* changing how a dialect spells the name or the values of a property that
+  already existed is breaking too, since records in that dialect no longer
+  translate the same way
+* adding anything, deprecating anything and restoring something deprecated
+  needs a minor version
+* other changes, to names, descriptions and attributes, need a patch version
+
+Objects are matched by id, and only those whose fingerprint differs are
+compared field by field, descending into the properties of an entity only
+when the fingerprint of the entity changed. Fingerprints are computed once
+per object, or read from snapshots, so comparing two large dictionaries
+that barely differ costs little more than matching their ids.
+"""
+import collections
+import logging
+from collections.abc import Mapping
+from typing import List
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+DEPRECATED = 'deprecated'
+RESTORED = 'restored'
+
+MAJOR = 'major'
+MINOR = 'minor'
+PATCH = 'patch'
+_LEVELS = [None, PATCH, MINOR, MAJOR]
+
+
+class Change(collections.namedtuple('Change', ['kind', 'subject', 'id', 'level', 'message'])):
+    """A difference between two versions of a dictionary
+
+    Attributes
+    ----------
+    kind : str
+        ADDED, REMOVED, CHANGED, DEPRECATED or RESTORED, the latter for
+        objects no longer deprecated.
+    subject : str
+        What changed: dictionary, data type, enumeration, enumeration value,
+        entity, property, dialect or dialect property.
+    id : str
+        Id of what changed, enumeration values are prefixed with the id of
+        their enumeration, dialect properties with the id of their dialect.
+    level : str
+        The version increment the change needs: MAJOR, MINOR or PATCH.
+    message : str
+        Human readable description of the change.
+    """
+    __slots__ = ()
+
+    @property
+    def is_breaking(self) -> bool:
+        return self.level == MAJOR
+
+    def __str__(self):
+        return f'{self.level}: {self.message}'
+
+
+class DictionaryDiff(object):
+    def __init__(self, old_version: str, new_version: str, changes: List[Change]):
+        """The changes between two versions of a dictionary
+
+        Attributes
+        ----------
+        old_version : str
+            Version of the old dictionary.
+        new_version : str
+            Version of the new dictionary.
+        changes : list of Change
+            Dictionary changes first, then data types, enumerations,
+            entities and dialects, each in the order of the new dictionary
+            with removals last.
+        """
+        self.old_version = old_version
+        self.new_version = new_version
+        self.changes = changes
+
+    @property
+    def breaking(self) -> List[Change]:
+        """The changes that break users of the old version"""
+        return [c for c in self.changes if c.is_breaking]
+
+    @property
+    def compatible(self) -> bool:
+        """Whether the new version can replace the old one without breaking its users"""
+        return not any(c.is_breaking for c in self.changes)
+
+    @property
+    def required_bump(self) -> str:
+        """The version increment the changes need, None if there are none"""
+        return max((c.level for c in self.changes), key=_LEVELS.index, default=None)
+
+    @property
+    def version_bump(self) -> str:
+        """The increment from the old to the new version
+
+        None if the versions are equal, or if one of them is not a semantic
+        version, like master. Versions going backwards are reported as MAJOR.
+        """
+        import semver
+        try:
+            old = semver.VersionInfo.parse(self.old_version)
+            new = semver.VersionInfo.parse(self.new_version)
+        except (TypeError, ValueError):
+            return None
+        if new < old or new.major != old.major:
+            return MAJOR
+        if new.minor != old.minor:
+            return MINOR
+        return PATCH if new != old else None
+
+    @property
+    def version_is_sufficient(self) -> bool:
+        """Whether the new version is incremented enough for the changes
+
+        Before 1.0.0 a minor increment is enough for breaking changes, as
+        semantic versioning gives no guarantees for those versions. Always
+        True when one of the versions is not a semantic version.
+        """
+        import semver
+        required = self.required_bump
+        if required is None:
+            return True
+        try:
+            old = semver.VersionInfo.parse(self.old_version)
+            semver.VersionInfo.parse(self.new_version)
+        except (TypeError, ValueError):
+            return True
+        if required == MAJOR and old.major == 0:
+            required = MINOR
+        return _LEVELS.index(self.version_bump) >= _LEVELS.index(required)
+
+    def to_dict(self) -> dict:
+        """Returns the diff as plain data, for serialization"""
+        return {
+            'old_version': self.old_version,
+            'new_version': self.new_version,
+            'required_bump': self.required_bump,
+            'compatible': self.compatible,
+            'version_is_sufficient': self.version_is_sufficient,
+            'changes': [c._asdict() for c in self.changes],
+        }
+
+
+def _shown(value) -> str:
+    # attribute maps are read-only proxies, shown as the dicts they wrap
+    return repr(dict(value) if isinstance(value, Mapping) else value)
+
+
+class _Differ(object):
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.changes = []
+
+    def add(self, kind, subject, id, level, message):
+        self.changes.append(Change(kind, subject, id, level, message))
+
+    def fields(self, subject, id, old, new, fields):
+        """Records the changes of the fields of an object, fields maps names to levels"""
+        for name, level in fields.items():
+            before, after = getattr(old, name), getattr(new, name)
+            if before != after:
+                self.add(CHANGED, subject, id, level, f'{subject} {id} changed {name} '
+                                                      f'from {_shown(before)} to {_shown(after)}')
+        if not old.deprecated and new.deprecated:
+            self.add(DEPRECATED, subject, id, MINOR, f'{subject} {id} was deprecated')
+        elif old.deprecated and not new.deprecated:
+            self.add(RESTORED, subject, id, MINOR, f'{subject} {id} is no longer deprecated')
+
+    def match(self, subject, old_items, new_items, compare):
+        """Pairs objects by id and compares those whose fingerprints differ"""
+        old_by_id = {o.id: o for o in old_items}
+        new_ids = set()
+        for n in new_items:
+            new_ids.add(n.id)
+            o = old_by_id.get(n.id, None)
+            if o is None:
+                self.add(ADDED, subject, n.id, MINOR, f'{subject} {n.id} was added')
+            elif o.fingerprint != n.fingerprint:
+                compare(o, n)
+        for o in old_items:
+            if o.id not in new_ids:
+                self.add(REMOVED, subject, o.id, MAJOR, f'{subject} {o.id} was removed')
+
+    def data_type(self, old, new):
+        self.fields('data type', new.id, old, new, {
+            'name': PATCH, 'description': PATCH, 'semantics': MAJOR, 'attributes': PATCH})
+
+    def enumeration(self, old, new):
+        self.fields('enumeration', new.id, old, new, {'name': PATCH, 'description': PATCH})
+        old_values = {v.id: v for v in old.values}
+        new_ids = set()
+        for v in new.values:
+            new_ids.add(v.id)
+            id = f'{new.id}.{v.id}'
+            o = old_values.get(v.id, None)
+            if o is None:
+                self.add(ADDED, 'enumeration value', id, MINOR,
+                         f'enumeration value {id} was added')
+            else:
+                self.fields('enumeration value', id, o, v,
+                            {'integral_value': MAJOR, 'description': PATCH})
+        for v in old.values:
+            if v.id not in new_ids:
+                id = f'{old.id}.{v.id}'
+                self.add(REMOVED, 'enumeration value', id, MAJOR,
+                         f'enumeration value {id} was removed')
+
+    def entity(self, old, new):
+        self.fields('entity', new.id, old, new,
+                    {'name': PATCH, 'description': PATCH, 'attributes': PATCH})
+        self.match('property', old.properties, new.properties, self.property)
+
+    def property(self, old, new):
+        self.fields('property', new.id, old, new, {
+            'name': PATCH, 'type_id': MAJOR, 'description': PATCH, 'attributes': PATCH})
+
+    def dialect(self, old, new):
+        self.fields('dialect', new.id, old, new, {'name': PATCH, 'description': PATCH})
+        old_properties = {p.property_id: p for p in old.properties}
+        new_ids = set()
+        for p in new.properties:
+            new_ids.add(p.property_id)
+            id = f'{new.id}.{p.property_id}'
+            o = old_properties.get(p.property_id, None)
+            if o is None:
+                # the property was spelled as its id until now, unless it is new
+                existed = self.old.property_by_id(p.property_id) is not None
+                self.add(ADDED, 'dialect property', id, MAJOR if existed else MINOR,
+                         f'dialect property {id} was added, naming it {p.name!r}')
+                continue
+            if o.name != p.name:
+                self.add(CHANGED, 'dialect property', id, MAJOR,
+                         f'dialect property {id} changed name from {o.name!r} to {p.name!r}')
+            if dict(o.values) != dict(p.values):
+                self.add(CHANGED, 'dialect property', id, MAJOR,
+                         f'dialect property {id} changed values from {_shown(o.values)} '
+                         f'to {_shown(p.values)}')
+        for o in old.properties:
+            if o.property_id not in new_ids:
+                id = f'{old.id}.{o.property_id}'
+                self.add(REMOVED, 'dialect property', id, MAJOR,
+                         f'dialect property {id} was removed')
+
+    def dialects(self, old_items, new_items):
+        """Pairs dialects by id, they have no fingerprint and are compared in full"""
+        old_by_id = {d.id: d for d in old_items}
+        new_ids = set()
+        for n in new_items:
+            new_ids.add(n.id)
+            o = old_by_id.get(n.id, None)
+            if o is None:
+                self.add(ADDED, 'dialect', n.id, MINOR, f'dialect {n.id} was added')
+            else:
+                self.dialect(o, n)
+        for o in old_items:
+            if o.id not in new_ids:
+                self.add(REMOVED, 'dialect', o.id, MAJOR, f'dialect {o.id} was removed')
+
+    def run(self) -> List[Change]:
+        old, new = self.old, self.new
+        if old.id != new.id:
+            self.add(CHANGED, 'dictionary', new.id, MAJOR,
+                     f'dictionary {old.id} changed id to {new.id}')
+        for name in ('name', 'description'):
+            before, after = getattr(old, name), getattr(new, name)
+            if before != after:
+                self.add(CHANGED, 'dictionary', new.id, PATCH,
+                         f'dictionary {new.id} changed {name} from {before!r} to {after!r}')
+        if not old.deprecated and new.deprecated:
+            self.add(DEPRECATED, 'dictionary', new.id, MINOR,
+                     f'dictionary {new.id} was deprecated')
+        elif old.deprecated and not new.deprecated:
+            self.add(RESTORED, 'dictionary', new.id, MINOR,
+                     f'dictionary {new.id} is no longer deprecated')
+        self.match('data type', old.data_types or [], new.data_types or [], self.data_type)
+        self.match('enumeration', old.enumerations, new.enumerations, self.enumeration)
+        self.match('entity', old.entities, new.entities, self.entity)
+        self.dialects(old.dialects, new.dialects)
+        return self.changes
+
+
+def diff(old, new) -> DictionaryDiff:
+    """Compares two versions of a dictionary
+
+    Parameters
+    ----------
+    old : Dictionary
+        The earlier version.
+    new : Dictionary
+        The later version.
+
+    Returns
+    -------
+    DictionaryDiff
+        The changes and the version increment they need.
+    """
+    changes = _Differ(old, new).run()
+    _logger.debug(f"Found {len(changes)} changes between versions {old.version} "
+                  f"and {new.version} of {new.id}")
+    return DictionaryDiff(old.version, new.version, changes)
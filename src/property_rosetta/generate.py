@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+A script generating code from a dictionary with Jinja2 templates
+
+See :mod:`property_rosetta.codegen` for the layout of the template directory.
+"""
+
+import argparse
+import sys
+import logging
+from pathlib import Path
+
+from property_rosetta.validate import VersionAction, setup_logging
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate code from a dictionary")
+    parser.add_argument(
+        "--version",
+        action=VersionAction)
+    parser.add_argument(
+        dest="path",
+        help="path containing a dictionary",
+        type=Path)
+    parser.add_argument(
+        "-t",
+        "--templates",
+        dest="templates",
+        help="directory holding dictionary/ and entity/ templates",
+        type=Path,
+        required=True)
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        help="directory to write the generated files into",
+        type=Path,
+        required=True)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        help="render entities in parallel using this many processes",
+        type=int,
+        default=None)
+    parser.add_argument(
+        "--yaml-backend",
+        dest="yaml_backend",
+        help="yaml parser to use, defaults to libyaml when available",
+        choices=["libyaml", "python"],
+        default=None)
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="keep compiled templates in this directory, "
+             "defaults to a directory in the temporary directory of the user",
+        type=Path,
+        default=None)
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        help="compile templates on every run",
+        action="store_false")
+    parser.add_argument(
+        "-f",
+        "--force",
+        dest="force",
+        help="render every file, even those whose inputs did not change",
+        action="store_true")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        help="set loglevel to DEBUG",
+        action="store_const",
+        const=logging.DEBUG)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    from property_rosetta.codegen import generate
+    from property_rosetta.dictionary import DictionaryError
+    setup_logging(args.loglevel)
+    _logger.debug(f"Generating code from {args.path} with templates in {args.templates}")
+    try:
+        generate(args.path, args.templates, args.output, workers=args.jobs,
+                 cache_dir=args.cache_dir, cache=args.cache, backend=args.yaml_backend,
+                 force=args.force)
+    except (DictionaryError, OSError) as e:
+        _logger.fatal(f"{e}")
+        return 1
+    return 0
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
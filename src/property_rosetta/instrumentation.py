@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Timings and counters of dictionary loading and validation
+
+Loading and validation report what they do to the hooks registered with
+:func:`add_hook`:
+
+* spans, the time spent in a phase: reading files (IO), parsing yaml
+  (PARSE), building the model objects (BUILD) and validating (VALIDATE).
+  Spans nest, a BUILD span reading a file contains an IO span, and each span
+  is reported with the time spent in it outside of the spans it contains, so
+  that the phases of a single threaded load add up to its duration;
+* counts, of the FILES and BYTES read and of the DATA_TYPES, ENUMERATIONS,
+  ENTITIES and PROPERTIES built, and of the validation ISSUES found.
+
+Without hooks, which is the default, instrumented code only pays for a
+check of an empty tuple. :func:`recording` registers a :class:`Recorder`
+summing everything up for the duration of a ``with`` block, which is what
+``rosetta-validate --stats`` reports.
+
+Spans are tracked per thread. Files parsed by worker threads are reported
+by these threads while the thread waiting for them is in a BUILD span, so
+phases then add up to more than the elapsed time. Work done in worker
+processes is not reported.
+"""
+import contextlib
+import threading
+import time
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+IO = 'io'
+PARSE = 'parse'
+BUILD = 'build'
+VALIDATE = 'validate'
+PHASES = (IO, PARSE, BUILD, VALIDATE)
+
+FILES = 'files'
+BYTES = 'bytes'
+DATA_TYPES = 'data_types'
+ENUMERATIONS = 'enumerations'
+ENTITIES = 'entities'
+PROPERTIES = 'properties'
+ISSUES = 'issues'
+
+# replaced rather than changed, so that instrumented code reads it without locking
+_hooks = ()
+_hooks_lock = threading.Lock()
+_local = threading.local()
+
+
+class Hook(object):
+    """Receives spans and counts, subclasses override what they need
+
+    Hooks are called from any thread that loads or validates, and must not
+    raise.
+    """
+
+    def span(self, phase: str, seconds: float, total_seconds: float):
+        """Called when a span ends
+
+        Parameters
+        ----------
+        phase : str
+            One of PHASES.
+        seconds : float
+            Time spent in the span outside of the spans it contains.
+        total_seconds : float
+            Time spent in the span, including the spans it contains.
+        """
+        pass
+
+    def count(self, counter: str, n: int):
+        """Called when n more of what counter names were read or built"""
+        pass
+
+
+def add_hook(hook: Hook):
+    """Starts reporting spans and counts to a hook"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook: Hook):
+    """Stops reporting to a hook added with :func:`add_hook`"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+def enabled() -> bool:
+    """Whether any hook is registered"""
+    return bool(_hooks)
+
+
+class _Span(object):
+    __slots__ = ('phase', 'hooks', 'start', 'children')
+
+    def __init__(self, phase: str, hooks: tuple):
+        self.phase = phase
+        self.hooks = hooks
+        self.start = None
+        self.children = 0.0
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        total = time.perf_counter() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += total
+        for hook in self.hooks:
+            hook.span(self.phase, total - self.children, total)
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(phase: str):
+    """Returns a context manager timing a phase, see :class:`Hook`"""
+    hooks = _hooks
+    if not hooks:
+        return _NO_SPAN
+    return _Span(phase, hooks)
+
+
+def count(counter: str, n: int = 1):
+    """Reports that n more of what counter names were read or built"""
+    for hook in _hooks:
+        hook.count(counter, n)
+
+
+class Recorder(Hook):
+    def __init__(self):
+        """A hook summing up spans by phase and counts by counter
+
+        Instances are thread safe.
+
+        Attributes
+        ----------
+        spans : dict
+            For each phase seen, the number of spans and the time spent in
+            them outside of the spans they contain.
+        counters : dict
+            The counts reported, by counter.
+        elapsed : float
+            Seconds spent in :func:`recording`, None until it returns.
+        """
+        self.spans = {}
+        self.counters = {}
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def span(self, phase: str, seconds: float, total_seconds: float):
+        with self._lock:
+            entry = self.spans.get(phase, None)
+            if entry is None:
+                entry = self.spans[phase] = {'calls': 0, 'seconds': 0.0}
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+
+    def count(self, counter: str, n: int):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def to_dict(self) -> dict:
+        """Returns what was recorded, in a form suitable for json"""
+        with self._lock:
+            return {
+                'elapsed': self.elapsed,
+                'phases': {p: dict(s) for p, s in self.spans.items()},
+                'counters': dict(self.counters),
+            }
+
+
+@contextlib.contextmanager
+def recording():
+    """Records spans and counts with a :class:`Recorder` for the duration of a with block"""
+    recorder = Recorder()
+    add_hook(recorder)
+    start = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        recorder.elapsed = time.perf_counter() - start
+        remove_hook(recorder)
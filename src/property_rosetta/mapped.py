@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+A read-only dictionary backed by a memory mapped snapshot
+
+Worker processes mapping the same snapshot share its pages through the
+operating system page cache. Data types, enumerations and entities are only
+turned into Python objects when they are first accessed, so each process
+holds in memory roughly the part of the dictionary it actually uses.
+"""
+import mmap
+import logging
+import struct
+import threading
+from collections.abc import Sequence
+
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary, DictionarySnapshotError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+class _LazyList(Sequence):
+    def __init__(self, count: int, factory):
+        """A read-only list whose items are created on first access
+
+        Parameters
+        ----------
+        count : int
+            The number of items.
+        factory
+            Callable creating the item at a given position.
+        """
+        self._count = count
+        self._factory = factory
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('list index out of range')
+        return self._factory(i)
+
+
+class MappedDictionary(Dictionary):
+    """A read-only dictionary memory mapping a snapshot written by rosetta-compile
+
+    It exposes the same attributes and lookups as an in-memory
+    :class:`property_rosetta.dictionary.Dictionary`, with data_types,
+    enumerations and entities being read-only sequences. Entities and
+    enumerations are materialized as regular
+    :class:`property_rosetta.dictionary.DictionaryEntity` and
+    :class:`property_rosetta.dictionary.DictionaryEnumeration` objects, along
+    with all their properties and values, the first time they are accessed,
+    and kept for the lifetime of the dictionary.
+    """
+
+    def __init__(self, path, source=None):
+        """Maps a snapshot file
+
+        Parameters
+        ----------
+        path
+            Path to the snapshot file.
+        source : optional
+            Path to the dictionary yaml file the snapshot was compiled from.
+            When given, the snapshot is rejected if the sources changed since.
+
+        Raises
+        ------
+        DictionarySnapshotError
+            If the snapshot cannot be read, is invalid or is stale.
+        """
+        super().__init__()
+        _logger.debug(f"Mapping dictionary snapshot {path}")
+        try:
+            with open(path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise DictionarySnapshotError(
+                f'Error reading dictionary snapshot: {path}', exc)
+        try:
+            self._reader = snapshot.SnapshotReader(
+                self._mmap, path, eager=False)
+            if source is not None:
+                snapshot.check_digest(self._reader.digest, source, path)
+            self._reader.fill_dictionary(self)
+            try:
+                self.dialects = self._reader.dialects(self)
+            except (ValueError, IndexError, struct.error) as exc:
+                raise self._reader.corrupted(exc)
+        except Exception:
+            self._mmap.close()
+            raise
+        self._dialects_by_id = {}
+        for d in self.dialects:
+            self._dialects_by_id.setdefault(d.id, d)
+        self._lock = threading.Lock()
+        self._materialized = {}
+        self.data_types = self._lazy_list(
+            b'TYPE', snapshot._DATA_TYPE, self._reader.data_type)
+        self.enumerations = self._lazy_list(
+            b'ENUM', snapshot._ENUMERATION, self._reader.enumeration)
+        self.entities = self._lazy_list(
+            b'ENTY', snapshot._ENTITY, self._reader.entity)
+
+    def _lazy_list(self, tag: bytes, record, factory) -> _LazyList:
+        def materialize(i):
+            key = (tag, i)
+            item = self._materialized.get(key, None)
+            if item is None:
+                item = factory(self, self._reader.record(tag, record, i), i)
+                with self._lock:
+                    item = self._materialized.setdefault(key, item)
+            return item
+        return _LazyList(self._reader.count(tag, record), materialize)
+
+    def _by_id(self, items: _LazyList, index_tag: bytes, tag: bytes, record, id):
+        i = self._reader.find(index_tag, tag, record, str(id))
+        return items[i] if i is not None else None
+
+    def type_by_id(self, type_id):
+        """Returns the data type with an id, None if missing"""
+        return self._by_id(self.data_types, b'TIDX', b'TYPE',
+                           snapshot._DATA_TYPE, type_id)
+
+    def enumeration_by_id(self, enumeration_id):
+        """Returns the enumeration with an id, None if missing"""
+        return self._by_id(self.enumerations, b'NIDX', b'ENUM',
+                           snapshot._ENUMERATION, enumeration_id)
+
+    def entity_by_id(self, entity_id):
+        """Returns the entity with an id, None if missing"""
+        return self._by_id(self.entities, b'EIDX', b'ENTY',
+                           snapshot._ENTITY, entity_id)
+
+    def property_by_id(self, property_id):
+        """Returns the property with an id from any entity, None if missing"""
+        i = self._reader.find(b'PIDX', b'PROP', snapshot._PROPERTY, str(property_id))
+        if i is None:
+            return None
+        return self.entities[self._reader.property_owner(i)].property_by_id(property_id)
+
+    def reindex(self):
+        """Lookups are served by the snapshot indexes, there is nothing to rebuild"""
+        pass
+
+    @property
+    def materialized_count(self) -> int:
+        """The number of data types, enumerations and entities materialized so far"""
+        return len(self._materialized)
+
+    def close(self):
+        """Unmaps the snapshot
+
+        Objects already materialized stay usable, others can no longer be read.
+        """
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
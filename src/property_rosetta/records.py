@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Validation of data records against the entities of a dictionary
+
+A record is a mapping from property ids to values. :func:`compile_validator`
+turns an entity into a :class:`RecordValidator` holding one check per
+property, so that checking a record costs a dict lookup and a type test per
+value. It finds properties the entity does not have, values that do not
+match the data type of their property and values outside the enumeration of
+their property. None values are accepted for every property.
+
+Data types are checked according to their id, or to the ``record_type``
+attribute of the data type when it has one, with the checks in
+:data:`TYPE_CHECKS`: ``bool``, ``int8`` to ``int64``, ``uint8`` to
+``uint64``, ``float32``, ``float64`` and ``string``. Values of other data
+types are accepted as they are.
+
+Records can also be given as columns, a mapping from property ids to
+sequences of values. NumPy arrays with a matching dtype are checked in bulk
+without looking at each value, other sequences value by value.
+"""
+import collections
+import logging
+import threading
+import weakref
+from collections.abc import Mapping
+from numbers import Integral, Real
+from typing import List
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+class RecordIssue(collections.namedtuple('RecordIssue', ['record', 'property', 'message'])):
+    """A problem found in a record
+
+    Attributes
+    ----------
+    record : int
+        Position of the record in the batch, None for problems of a whole
+        column.
+    property : str
+        Id of the property the problem is about, None for problems of the
+        whole record.
+    message : str
+        Human readable description of the problem.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        subject = 'column' if self.record is None else f'record {self.record}'
+        return f'{subject}: {self.message}'
+
+
+class TypeCheck(object):
+    def __init__(self, check, kinds: str = None, bounds: tuple = None):
+        """Tells whether values belong to a data type
+
+        Parameters
+        ----------
+        check
+            Callable returning whether a single value, never None, is valid.
+        kinds : str, optional
+            NumPy dtype kinds whose arrays hold valid values only, or values
+            valid within bounds. Without kinds, arrays are checked value by
+            value.
+        bounds : tuple, optional
+            The lowest valid value and the first value past the highest.
+        """
+        self.check = check
+        self.kinds = kinds
+        self.bounds = bounds
+
+    def invalid(self, values):
+        """Returns a boolean array marking the invalid values of an array"""
+        import numpy as np
+        if self.kinds is None or values.dtype.kind not in self.kinds:
+            if values.dtype.kind != 'O' and self.kinds is not None:
+                return np.ones(values.shape, dtype=bool)
+            check = self.check
+            return np.fromiter((v is not None and not check(v) for v in values.tolist()),
+                               dtype=bool, count=values.size)
+        if self.bounds is not None and values.dtype.kind in 'iu':
+            low, high = self.bounds
+            return (values < low) | (values >= high)
+        return np.zeros(values.shape, dtype=bool)
+
+
+def _is_bool(v) -> bool:
+    return v is True or v is False
+
+
+def _is_string(v) -> bool:
+    return isinstance(v, str)
+
+
+def _integer(bits: int, signed: bool) -> TypeCheck:
+    low, high = (-(1 << bits - 1), 1 << bits - 1) if signed else (0, 1 << bits)
+
+    def check(v):
+        return (type(v) is int or isinstance(v, Integral) and not isinstance(v, bool)) \
+            and low <= v < high
+    return TypeCheck(check, 'iu', (low, high))
+
+
+def _is_real(v) -> bool:
+    return type(v) is float or isinstance(v, Real) and not isinstance(v, bool)
+
+
+TYPE_CHECKS = {
+    'bool': TypeCheck(_is_bool, 'b'),
+    'string': TypeCheck(_is_string, 'U'),
+    'float32': TypeCheck(_is_real, 'fiu'),
+    'float64': TypeCheck(_is_real, 'fiu'),
+}
+TYPE_CHECKS.update((f'int{bits}', _integer(bits, True)) for bits in (8, 16, 32, 64))
+TYPE_CHECKS.update((f'uint{bits}', _integer(bits, False)) for bits in (8, 16, 32, 64))
+
+
+class _EnumerationCheck(TypeCheck):
+    def __init__(self, enumeration):
+        ids = frozenset(v.id for v in enumeration.values)
+        super().__init__(ids.__contains__)
+        self.enumeration = enumeration
+
+    def invalid(self, values):
+        if values.dtype.kind == 'U':
+            return ~self.enumeration.codec().contains(values)
+        return super().invalid(values)
+
+
+class RecordValidator(object):
+    def __init__(self, entity, type_checks: Mapping = None):
+        """Checks records against the properties of an entity
+
+        The checks are compiled from the entity, its properties and the data
+        types and enumerations of its dictionary as they are now. Validators
+        are safe to use from several threads at once.
+
+        Parameters
+        ----------
+        entity : DictionaryEntity
+            The entity records describe.
+        type_checks : Mapping, optional
+            TypeCheck objects by data type id, replacing those of TYPE_CHECKS.
+        """
+        self.entity_id = entity.id
+        type_checks = {**TYPE_CHECKS, **(type_checks or {})}
+        dictionary = entity.dictionary
+        # property id -> (TypeCheck, what values must be), no TypeCheck accepts anything
+        self._column_checks = {}
+        for p in entity.properties:
+            check, expected = None, None
+            data_type = dictionary.type_by_id(p.type_id) if dictionary is not None else None
+            enumeration = dictionary.enumeration_by_id(p.type_id) \
+                if dictionary is not None and data_type is None else None
+            if data_type is not None:
+                name = (data_type.attributes or {}).get('record_type', data_type.id)
+                check, expected = type_checks.get(name, None), f'a {name}'
+            elif enumeration is not None:
+                check = _EnumerationCheck(enumeration)
+                expected = f'in enumeration {enumeration.id}'
+            else:
+                _logger.debug(f"Type {p.type_id} of {p.id} does not resolve, "
+                              f"accepting any value")
+            self._column_checks[p.id] = (check, expected)
+        # the same with the single value checks, for the per record loop
+        self._checks = {id: (check.check if check is not None else None, expected)
+                        for id, (check, expected) in self._column_checks.items()}
+
+    def validate(self, records) -> List[RecordIssue]:
+        """Returns the issues of a batch of records
+
+        Parameters
+        ----------
+        records
+            Iterable of mappings from property ids to values.
+
+        Returns
+        -------
+        list of RecordIssue
+            The issues, in record order.
+        """
+        checks = self._checks
+        issues = []
+        for index, record in enumerate(records):
+            try:
+                items = record.items()
+            except AttributeError:
+                issues.append(RecordIssue(index, None, 'Record is not a mapping'))
+                continue
+            for key, value in items:
+                check = checks.get(key, None)
+                if check is None:
+                    issues.append(RecordIssue(
+                        index, key, f'Entity {self.entity_id} has no property {key}'))
+                elif check[0] is not None and value is not None and not check[0](value):
+                    issues.append(RecordIssue(
+                        index, key, f'Value {value!r} of {key} is not {check[1]}'))
+        return issues
+
+    def validate_record(self, record) -> List[RecordIssue]:
+        """Returns the issues of a single record, numbered 0"""
+        return self.validate((record,))
+
+    def validate_columns(self, columns: Mapping) -> List[RecordIssue]:
+        """Returns the issues of a batch of records given as columns
+
+        Needs numpy.
+
+        Parameters
+        ----------
+        columns : Mapping
+            Sequences or arrays of values, all of the same length, by
+            property id. Sequences other than NumPy arrays are checked value
+            by value, exactly as :meth:`validate` checks records.
+
+        Returns
+        -------
+        list of RecordIssue
+            Columns of unknown properties first, then the issues of each
+            record in record order.
+
+        Raises
+        ------
+        ValueError
+            If the columns do not all have the same length.
+        """
+        import numpy as np
+        issues = []
+        invalid = []
+        length = None
+        for key, values in columns.items():
+            if not isinstance(values, np.ndarray):
+                values = _object_array(values)
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
+                raise ValueError(f'Column {key} has {len(values)} values instead of {length}')
+            check = self._column_checks.get(key, None)
+            if check is None:
+                issues.append(RecordIssue(
+                    None, key, f'Entity {self.entity_id} has no property {key}'))
+            elif check[0] is not None:
+                for index in np.flatnonzero(check[0].invalid(values)).tolist():
+                    invalid.append((index, key, values[index:index + 1].tolist()[0], check[1]))
+        invalid.sort(key=lambda i: i[0])
+        issues += [RecordIssue(index, key, f'Value {value!r} of {key} is not {expected}')
+                   for index, key, value, expected in invalid]
+        return issues
+
+
+def _object_array(values):
+    """Returns the values of a sequence in an object array, keeping their python types"""
+    import numpy as np
+    values = list(values)
+    # assigned one at a time, numpy would turn nested sequences into dimensions
+    ret = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        ret[i] = v
+    return ret
+
+
+_validators = weakref.WeakKeyDictionary()
+_validators_lock = threading.Lock()
+
+
+def compile_validator(entity, type_checks: Mapping = None) -> RecordValidator:
+    """Returns the record validator of an entity
+
+    Validators compiled with the default type checks are kept for as long as
+    the entity exists, call :func:`clear_validators` after modifying the
+    dictionary.
+
+    Parameters
+    ----------
+    entity : DictionaryEntity
+        The entity records describe.
+    type_checks : Mapping, optional
+        TypeCheck objects by data type id, replacing those of TYPE_CHECKS.
+        The validator is not cached when given.
+    """
+    if type_checks:
+        return RecordValidator(entity, type_checks)
+    validator = _validators.get(entity, None)
+    if validator is None:
+        validator = RecordValidator(entity)
+        with _validators_lock:
+            validator = _validators.setdefault(entity, validator)
+    return validator
+
+
+def clear_validators():
+    """Forgets all the validators compiled so far"""
+    with _validators_lock:
+        _validators.clear()
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Several versions of several dictionaries, loaded on demand
+
+A :class:`DictionaryRegistry` serves dictionaries by id and version from a
+directory of releases laid out as::
+
+    releases/
+        <dictionary id>/
+            <version>/
+                dictionary.yaml
+                dictionary.snapshot   (optional, see rosetta-compile)
+                ...
+
+A release is loaded the first time it is asked for, from its snapshot when
+there is one that is up to date and from its yaml files otherwise, and kept
+until it is evicted. The least recently used releases are evicted when more
+than a given number of them, or more than a given estimated size, are
+resident. Threads asking for a release being loaded wait for that load
+rather than starting their own.
+"""
+import collections
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import List
+
+from property_rosetta.dictionary import Dictionary, DictionaryError, DictionarySnapshotError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+DICTIONARY_FILE = 'dictionary.yaml'
+SNAPSHOT_FILE = 'dictionary.snapshot'
+
+
+class RegistryError(DictionaryError):
+    """Raised when a release does not exist or does not hold what its path says"""
+    pass
+
+
+def estimate_size(dictionary) -> int:
+    """Returns an estimate of the memory used by a dictionary, in bytes
+
+    Counts the model objects, their strings and their attribute maps, each
+    shared string or map once. Properties of entities that are not loaded
+    yet are not counted.
+    """
+    seen = set()
+    size = 0
+
+    def add(o):
+        nonlocal size
+        if o is None or id(o) in seen:
+            return
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+
+    def add_map(m):
+        if m is None or id(m) in seen:
+            return
+        add(m)
+        for k, v in m.items():
+            add(k)
+            add(v)
+
+    def add_fields(o, *names):
+        add(o)
+        for name in names:
+            add(getattr(o, name))
+
+    add_fields(dictionary, 'id', 'name', 'description', 'version')
+    for t in dictionary.data_types or []:
+        add_fields(t, 'id', 'name', 'description', 'semantics')
+        add_map(t.attributes)
+    for e in dictionary.enumerations:
+        add_fields(e, 'id', 'name', 'description')
+        for v in e.values:
+            add_fields(v, 'id', 'description')
+    for e in dictionary.entities:
+        add_fields(e, 'id', 'name', 'description')
+        add_map(e.attributes)
+        if not e.properties_loaded:
+            continue
+        for p in e.properties:
+            add_fields(p, 'id', 'name', 'type_id', 'description')
+            add_map(p.attributes)
+    return size
+
+
+class _Load(object):
+    """A load in progress, shared by the threads asking for the same release"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.dictionary = None
+        self.error = None
+
+
+class DictionaryRegistry(object):
+    def __init__(self, root, max_versions: int = 8, max_bytes: int = None,
+                 backend: str = None, lazy: bool = False, sizer=estimate_size):
+        """Loads releases of dictionaries on demand and keeps the most recently used
+
+        Instances are thread safe.
+
+        Parameters
+        ----------
+        root
+            The directory of releases.
+        max_versions : int
+            Maximum number of releases kept loaded, None for no limit.
+        max_bytes : int, optional
+            Maximum total estimated size of the releases kept loaded. The
+            release just loaded is kept even if it is bigger on its own.
+        backend : str, optional
+            The yaml backend to parse releases without a snapshot with.
+        lazy : bool
+            Load the properties of the entities of yaml releases on first
+            access. Their size is then estimated without the properties.
+        sizer
+            Callable returning the size of a dictionary counted against
+            max_bytes, :func:`estimate_size` by default.
+
+        Attributes
+        ----------
+        hits : int
+            Number of requests served with a loaded release.
+        misses : int
+            Number of requests that loaded a release.
+        shared : int
+            Number of requests that waited for a load started by another
+            thread.
+        evictions : int
+            Number of releases evicted.
+        failures : int
+            Number of loads that failed.
+        """
+        self.root = Path(root)
+        self.max_versions = max_versions
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.lazy = lazy
+        self.sizer = sizer
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        # (id, version) -> (dictionary, size), least recently used first
+        self._resident = collections.OrderedDict()
+        self._resident_bytes = 0
+        self._loads = {}
+
+    def release_path(self, id: str, version: str) -> Path:
+        """Returns the path of the dictionary.yaml of a release
+
+        Raises
+        ------
+        RegistryError
+            If the id or the version is not a plain directory name.
+        """
+        for part in (id, version):
+            if not part or part in ('.', '..') or Path(part).name != part or '\\' in part:
+                raise RegistryError(f'Invalid release {id} {version}')
+        return self.root / id / version / DICTIONARY_FILE
+
+    def releases(self) -> List[tuple]:
+        """Returns the (id, version) of every release in the directory, sorted"""
+        return sorted((p.parent.parent.name, p.parent.name)
+                      for p in self.root.glob(f'*/*/{DICTIONARY_FILE}'))
+
+    def _load(self, id: str, version: str) -> Dictionary:
+        path = self.release_path(id, version)
+        if not path.is_file():
+            raise RegistryError(f'No release {version} of dictionary {id} in {self.root}')
+        snapshot = path.parent / SNAPSHOT_FILE
+        dictionary = None
+        if snapshot.is_file():
+            try:
+                dictionary = Dictionary.from_snapshot(snapshot, path)
+            except DictionarySnapshotError as exc:
+                _logger.warning(f"Loading {id} {version} from yaml: {exc}")
+        if dictionary is None:
+            dictionary = Dictionary.from_yaml_dictionary(
+                path, backend=self.backend, lazy=self.lazy)
+        if (dictionary.id, dictionary.version) != (id, version):
+            raise RegistryError(f'Release {id} {version} holds version {dictionary.version} '
+                                f'of dictionary {dictionary.id}')
+        return dictionary
+
+    def get(self, id: str, version: str) -> Dictionary:
+        """Returns a release, loading it if needed
+
+        Raises
+        ------
+        RegistryError
+            If the release does not exist, or holds another dictionary.
+        DictionaryLoadingError
+            If the release cannot be loaded. Failed loads are not kept, the
+            next request tries again.
+        """
+        key = (id, version)
+        with self._lock:
+            entry = self._resident.get(key, None)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            load = self._loads.get(key, None)
+            owner = load is None
+            if owner:
+                load = self._loads[key] = _Load()
+                self.misses += 1
+            else:
+                self.shared += 1
+        if not owner:
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.dictionary
+        try:
+            _logger.debug(f"Loading release {version} of dictionary {id}")
+            load.dictionary = self._load(id, version)
+            size = self.sizer(load.dictionary)
+        except Exception as exc:
+            load.error = exc
+            with self._lock:
+                self.failures += 1
+                del self._loads[key]
+            load.done.set()
+            raise
+        with self._lock:
+            self._resident[key] = (load.dictionary, size)
+            self._resident_bytes += size
+            del self._loads[key]
+            self._evict()
+        load.done.set()
+        return load.dictionary
+
+    def _evict(self):
+        """Evicts the least recently used releases beyond the limits, with the lock held"""
+        while len(self._resident) > 1 and (
+                self.max_versions is not None and len(self._resident) > self.max_versions or
+                self.max_bytes is not None and self._resident_bytes > self.max_bytes):
+            (id, version), (_, size) = self._resident.popitem(last=False)
+            self._resident_bytes -= size
+            self.evictions += 1
+            _logger.debug(f"Evicted release {version} of dictionary {id}, {size} bytes")
+
+    def evict(self, id: str, version: str) -> bool:
+        """Forgets a release, returns whether it was loaded"""
+        with self._lock:
+            entry = self._resident.pop((id, version), None)
+            if entry is None:
+                return False
+            self._resident_bytes -= entry[1]
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        """Forgets all the releases"""
+        with self._lock:
+            self.evictions += len(self._resident)
+            self._resident.clear()
+            self._resident_bytes = 0
+
+    @property
+    def resident(self) -> List[tuple]:
+        """The (id, version) of the releases loaded, least recently used first"""
+        with self._lock:
+            return list(self._resident)
+
+    @property
+    def stats(self) -> dict:
+        """The counters, the number of releases loaded and their estimated size"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'shared': self.shared,
+                    'evictions': self.evictions, 'failures': self.failures,
+                    'resident': len(self._resident), 'resident_bytes': self._resident_bytes}
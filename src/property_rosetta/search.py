@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Full-text and fuzzy search over the objects of a dictionary
+
+A :class:`SearchIndex` is built once from a loaded dictionary and answers
+two kinds of queries over its entities, properties, data types,
+enumerations and enumeration values:
+
+* :meth:`SearchIndex.search` finds the objects whose id, name or
+  description contain all the words of a query, the last word being
+  matched as a prefix so that partial input finds something. Words are
+  split at punctuation and camel case, hits are ranked by the rarity of the
+  words they match and by the field they match them in, ids first, then
+  names, then descriptions.
+* :meth:`SearchIndex.fuzzy` finds the objects whose id, name or last id
+  segment look like the query, sharing enough of its trigrams to tolerate
+  typos, ranked by similarity.
+
+Postings are kept as NumPy arrays in compressed sparse row form, so that
+queries are answered by array intersections and counts rather than Python
+loops, in milliseconds on dictionaries with hundreds of thousands of
+properties. Indexes can be saved next to a compiled snapshot, see
+:func:`index_path` and ``rosetta-compile --search-index``, and are tied to
+the fingerprint of the dictionary they were built from. NumPy is an
+optional dependency, only needed by this module.
+"""
+import bisect
+import collections
+import io
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+from array import array
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from property_rosetta.dictionary import DictionaryError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+ENTITY = 'entity'
+PROPERTY = 'property'
+DATA_TYPE = 'data type'
+ENUMERATION = 'enumeration'
+ENUMERATION_VALUE = 'enumeration value'
+KINDS = (ENTITY, PROPERTY, DATA_TYPE, ENUMERATION, ENUMERATION_VALUE)
+
+# weight of a word by the field it is found in, summed over fields
+ID_WEIGHT = 3
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+# share of the weight kept by words only matching the last word of a query as a prefix
+PREFIX_FACTOR = 0.5
+
+_WORD = re.compile(r'[^\W_]+')
+_CAMEL_CASE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+
+class SearchIndexError(DictionaryError):
+    """Raised when a saved search index cannot be read or is stale"""
+    pass
+
+
+def tokenize(text) -> List[str]:
+    """Returns the lower case words of a text
+
+    Words are split at anything that is not a letter or a digit, camel case
+    words are also split into their parts: ``engineTemp`` gives
+    ``enginetemp``, ``engine`` and ``temp``.
+    """
+    if not text:
+        return []
+    tokens = []
+    for word in _WORD.findall(str(text)):
+        lower = word.lower()
+        tokens.append(lower)
+        if lower != word:
+            parts = _CAMEL_CASE.findall(word)
+            if len(parts) > 1:
+                tokens += [p.lower() for p in parts]
+    return tokens
+
+
+def _trigrams(text: str) -> set:
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_path(snapshot_path) -> Path:
+    """Returns where the search index of a compiled snapshot is kept"""
+    return Path(snapshot_path).with_suffix('.search')
+
+
+class SearchHit(collections.namedtuple('SearchHit', ['kind', 'id', 'name', 'owner', 'score'])):
+    """An object found by a search
+
+    Attributes
+    ----------
+    kind : str
+        One of KINDS.
+    id : str
+        Id of the object.
+    name : str
+        Name of the object, the id for enumeration values.
+    owner : str
+        Id of the entity of a property or of the enumeration of a value,
+        None for other objects.
+    score : float
+        Relevance of the hit, higher is better.
+    """
+    __slots__ = ()
+
+    def resolve(self, dictionary):
+        """Returns the object of the hit in a dictionary, None if it is not there"""
+        if self.kind == ENTITY:
+            return dictionary.entity_by_id(self.id)
+        if self.kind == PROPERTY:
+            entity = dictionary.entity_by_id(self.owner)
+            return entity.property_by_id(self.id) if entity is not None else None
+        if self.kind == DATA_TYPE:
+            return dictionary.type_by_id(self.id)
+        enumeration = dictionary.enumeration_by_id(
+            self.id if self.kind == ENUMERATION else self.owner)
+        if self.kind == ENUMERATION or enumeration is None:
+            return enumeration
+        return enumeration.value_for_id(self.id)
+
+
+class _Postings(object):
+    """(term, item) pairs, collected in ascending item order while building an index"""
+
+    def __init__(self, weighted: bool = False):
+        self.numbers = {}
+        self.terms = array('I')
+        self.items = array('I')
+        self.weights = array('B') if weighted else None
+
+    def number(self, terms) -> List[int]:
+        """Returns the numbers of terms, numbering the new ones"""
+        numbers = self.numbers
+        return [numbers.setdefault(t, len(numbers)) for t in terms]
+
+    def add(self, terms: List[int], item: int, weights=None):
+        """Adds the distinct numbered terms of an item, with their weights when weighted"""
+        self.terms.extend(terms)
+        self.items.extend([item] * len(terms))
+        if self.weights is not None:
+            self.weights.extend(weights)
+
+    def rows(self) -> tuple:
+        """Returns the sorted vocabulary and the compressed sparse rows of its terms
+
+        The rows of the items of the n-th term of the vocabulary are
+        ``offsets[n]:offsets[n + 1]`` of the items and weights, in ascending
+        item order.
+        """
+        vocabulary = list(self.numbers)
+        order = sorted(range(len(vocabulary)), key=vocabulary.__getitem__)
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[order] = np.arange(len(vocabulary))
+        rows = rank[np.frombuffer(self.terms, dtype=np.uint32)] if self.terms else \
+            np.zeros(0, dtype=np.int64)
+        # stable, so that the items of each row stay in ascending order
+        by_row = np.argsort(rows, kind='stable')
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(vocabulary)), out=offsets[1:])
+        items = np.frombuffer(self.items, dtype=np.uint32).astype(np.int32)[by_row]
+        weights = None
+        if self.weights is not None:
+            weights = np.frombuffer(self.weights, dtype=np.uint8)[by_row]
+        return [vocabulary[i] for i in order], offsets, items, weights
+
+
+class SearchIndex(object):
+    def __init__(self):
+        """An index of the objects of a dictionary, see :meth:`build` and :meth:`load`
+
+        Attributes
+        ----------
+        fingerprint : str
+            Fingerprint of the dictionary the index was built from.
+        kinds : numpy.ndarray
+            Kind of each indexed object, as a position in KINDS.
+        ids, names, owners : list
+            Id, name and owner of each indexed object, see
+            :class:`SearchHit`.
+        """
+        self.fingerprint = None
+        self.kinds = np.zeros(0, dtype=np.int8)
+        self.ids = []
+        self.names = []
+        self.owners = []
+        self._words = []
+        self._word_offsets = np.zeros(1, dtype=np.int64)
+        self._word_documents = np.zeros(0, dtype=np.int32)
+        self._word_weights = np.zeros(0, dtype=np.uint8)
+        self._trigrams = {}
+        self._trigram_offsets = np.zeros(1, dtype=np.int64)
+        self._trigram_keys = np.zeros(0, dtype=np.int32)
+        # the keys of the trigram index: id, name and last id segment of the objects
+        self._key_documents = np.zeros(0, dtype=np.int32)
+        self._key_sizes = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def build(cls, dictionary) -> 'SearchIndex':
+        """Indexes the entities, properties, data types, enumerations and values of a dictionary
+
+        Loads the properties of all the entities of dictionaries loaded
+        lazily.
+        """
+        ret = SearchIndex()
+        ret.fingerprint = dictionary.fingerprint
+        kinds = array('b')
+        words, trigrams = _Postings(weighted=True), _Postings()
+        key_documents, key_sizes = array('I'), array('I')
+        # numbered words and trigrams of texts, which are often repeated
+        text_words, key_trigrams = {}, {}
+
+        def add(kind: str, id, name, description, owner=None):
+            document = len(ret.ids)
+            kinds.append(KINDS.index(kind))
+            ret.ids.append(id)
+            ret.names.append(name)
+            ret.owners.append(owner)
+            weights = {}
+            for text, weight in ((id, ID_WEIGHT), (name, NAME_WEIGHT),
+                                 (description, DESCRIPTION_WEIGHT)):
+                found = text_words.get(text, None)
+                if found is None:
+                    found = text_words[text] = words.number(set(tokenize(text)))
+                for word in found:
+                    weights[word] = weights.get(word, 0) + weight
+            words.add(list(weights), document, weights.values())
+            keys = [str(id)]
+            if name and name != id:
+                keys.append(str(name))
+            segment = str(id).rsplit('.', 1)[-1]
+            if segment != id:
+                keys.append(segment)
+            for key in keys:
+                found = key_trigrams.get(key, None)
+                if found is None:
+                    found = key_trigrams[key] = trigrams.number(_trigrams(key))
+                trigrams.add(found, len(key_documents))
+                key_documents.append(document)
+                key_sizes.append(len(found))
+
+        for e in dictionary.entities:
+            add(ENTITY, e.id, e.name, e.description)
+            for p in e.properties:
+                add(PROPERTY, p.id, p.name, p.description, e.id)
+        for t in dictionary.data_types or []:
+            add(DATA_TYPE, t.id, t.name, t.description)
+        for e in dictionary.enumerations:
+            add(ENUMERATION, e.id, e.name, e.description)
+            for v in e.values:
+                add(ENUMERATION_VALUE, v.id, v.id, v.description, e.id)
+        ret.kinds = np.frombuffer(kinds, dtype=np.int8).copy()
+        ret._words, ret._word_offsets, ret._word_documents, ret._word_weights = words.rows()
+        trigram_vocabulary, ret._trigram_offsets, ret._trigram_keys, _ = trigrams.rows()
+        ret._trigrams = {t: i for i, t in enumerate(trigram_vocabulary)}
+        ret._key_documents = np.frombuffer(key_documents, dtype=np.uint32).astype(np.int32)
+        ret._key_sizes = np.frombuffer(key_sizes, dtype=np.uint32).astype(np.int32)
+        _logger.debug(f"Indexed {len(ret.ids)} objects of {dictionary.id}, "
+                      f"{len(ret._words)} words and {len(ret._trigrams)} trigrams")
+        return ret
+
+    def _word_postings(self, word: str, prefix: bool) -> tuple:
+        """Returns the documents with a word, in ascending order, and their weights"""
+        lo = bisect.bisect_left(self._words, word)
+        exact = lo < len(self._words) and self._words[lo] == word
+        hi = bisect.bisect_right(self._words, word + '\U0010ffff') if prefix else lo + exact
+        start, end = self._word_offsets[lo], self._word_offsets[hi]
+        documents = self._word_documents[start:end]
+        weights = self._word_weights[start:end].astype(np.float64)
+        if hi - lo <= exact:
+            return documents, weights
+        # words the query word is only a prefix of weigh less, keep the best per document
+        weights[self._word_offsets[lo + 1] - start if exact else 0:] *= PREFIX_FACTOR
+        order = np.lexsort((-weights, documents))
+        documents, weights = documents[order], weights[order]
+        first = np.ones(documents.size, dtype=bool)
+        first[1:] = documents[1:] != documents[:-1]
+        return documents[first], weights[first]
+
+    def _filter(self, documents, scores, kinds):
+        if kinds is not None:
+            keep = np.isin(self.kinds[documents], [KINDS.index(k) for k in kinds])
+            documents, scores = documents[keep], scores[keep]
+        return documents, scores
+
+    def _hits(self, documents, scores, limit: int) -> List[SearchHit]:
+        if limit is not None and documents.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            documents, scores = documents[top], scores[top]
+        # best first, ties in dictionary order
+        order = np.lexsort((documents, -scores))
+        return [SearchHit(KINDS[self.kinds[d]], self.ids[d], self.names[d], self.owners[d],
+                          float(s))
+                for d, s in zip(documents[order].tolist(), scores[order].tolist())]
+
+    def search(self, query: str, limit: int = 10, kinds=None) -> List[SearchHit]:
+        """Returns the objects containing all the words of a query, best first
+
+        Parameters
+        ----------
+        query : str
+            The words to look for, the last one is also matched as a prefix
+            of longer words.
+        limit : int
+            Maximum number of hits, None for all of them.
+        kinds : iterable, optional
+            Only return objects of these KINDS.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        # the words of the last word of the query, possibly still being typed
+        partial = set(tokenize(_WORD.findall(query)[-1]))
+        documents, scores = None, None
+        total = len(self.ids)
+        for word in words:
+            found, weights = self._word_postings(word, word in partial)
+            if found.size == 0:
+                return []
+            rarity = math.log(1 + total / found.size)
+            if documents is None:
+                documents, scores = found, weights * rarity
+            else:
+                documents, mine, theirs = np.intersect1d(
+                    documents, found, assume_unique=True, return_indices=True)
+                scores = scores[mine] + weights[theirs] * rarity
+        return self._hits(*self._filter(documents, scores, kinds), limit)
+
+    def fuzzy(self, query: str, limit: int = 10, kinds=None,
+              min_similarity: float = 0.3) -> List[SearchHit]:
+        """Returns the objects whose id or name looks like a query, most similar first
+
+        The score is the trigram similarity of the query with the id, name
+        or last id segment of the object, whichever is best: the trigrams
+        they share over all their distinct trigrams.
+
+        Parameters
+        ----------
+        query : str
+            Text to look for, possibly misspelled.
+        limit : int
+            Maximum number of hits, None for all of them.
+        kinds : iterable, optional
+            Only return objects of these KINDS.
+        min_similarity : float
+            Similarity below which objects are not returned, from 0 to 1.
+        """
+        wanted = _trigrams(query.strip())
+        rows = [self._trigrams[t] for t in wanted if t in self._trigrams]
+        if not query.strip() or not rows:
+            return []
+        keys = np.concatenate([self._trigram_keys[self._trigram_offsets[r]:
+                                                  self._trigram_offsets[r + 1]] for r in rows])
+        shared = np.bincount(keys, minlength=self._key_documents.size)
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        similarity = shared / (len(wanted) + self._key_sizes[candidates] - shared)
+        keep = similarity >= min_similarity
+        documents, similarity = self._key_documents[candidates[keep]], similarity[keep]
+        # the best key of each document
+        order = np.lexsort((-similarity, documents))
+        documents, similarity = documents[order], similarity[order]
+        first = np.ones(documents.size, dtype=bool)
+        first[1:] = documents[1:] != documents[:-1]
+        return self._hits(*self._filter(documents[first], similarity[first], kinds), limit)
+
+    def save(self, path):
+        """Writes the index to a file, atomically
+
+        Raises
+        ------
+        OSError
+            If the file cannot be written.
+        """
+        meta = json.dumps({
+            'version': FORMAT_VERSION, 'fingerprint': self.fingerprint, 'ids': self.ids,
+            'names': self.names, 'owners': self.owners, 'words': self._words,
+            'trigrams': sorted(self._trigrams, key=self._trigrams.__getitem__),
+        }, separators=(',', ':'), default=str)
+        buf = io.BytesIO()
+        np.savez(buf, meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8),
+                 kinds=self.kinds, word_offsets=self._word_offsets,
+                 word_documents=self._word_documents, word_weights=self._word_weights,
+                 trigram_offsets=self._trigram_offsets, trigram_keys=self._trigram_keys,
+                 key_documents=self._key_documents, key_sizes=self._key_sizes)
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path, dictionary=None) -> 'SearchIndex':
+        """Reads an index written by :meth:`save`
+
+        Parameters
+        ----------
+        path
+            The index file.
+        dictionary : Dictionary, optional
+            When given, the index is rejected unless it was built from a
+            dictionary with the same fingerprint.
+
+        Raises
+        ------
+        SearchIndexError
+            If the file cannot be read, was written by another version of
+            the format or is stale.
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            meta = json.loads(arrays.pop('meta').tobytes().decode('utf-8'))
+        except (OSError, ValueError, KeyError) as exc:
+            raise SearchIndexError(f'Cannot read search index {path}: {exc}') from exc
+        if meta.get('version', None) != FORMAT_VERSION:
+            raise SearchIndexError(
+                f'Unsupported search index format version {meta.get("version", None)} '
+                f'in {path}, expected {FORMAT_VERSION}')
+        if dictionary is not None and meta['fingerprint'] != dictionary.fingerprint:
+            raise SearchIndexError(f'Stale search index {path}: the dictionary changed')
+        ret = SearchIndex()
+        ret.fingerprint = meta['fingerprint']
+        ret.ids, ret.names, ret.owners = meta['ids'], meta['names'], meta['owners']
+        ret._words = meta['words']
+        ret._trigrams = {t: i for i, t in enumerate(meta['trigrams'])}
+        ret.kinds = arrays['kinds']
+        ret._word_offsets = arrays['word_offsets']
+        ret._word_documents = arrays['word_documents']
+        ret._word_weights = arrays['word_weights']
+        ret._trigram_offsets = arrays['trigram_offsets']
+        ret._trigram_keys = arrays['trigram_keys']
+        ret._key_documents = arrays['key_documents']
+        ret._key_sizes = arrays['key_sizes']
+        return ret
+
+    @classmethod
+    def load_or_build(cls, dictionary, path) -> 'SearchIndex':
+        """Reads the index of a dictionary from a file, building and saving it if needed
+
+        The index is built again when the file is missing, unreadable or
+        stale. Failing to save it is only logged.
+        """
+        try:
+            return cls.load(path, dictionary)
+        except SearchIndexError as exc:
+            if os.path.exists(path):
+                _logger.info(f"Building search index again: {exc}")
+        ret = cls.build(dictionary)
+        try:
+            ret.save(path)
+        except OSError as exc:
+            _logger.warning(f"Could not save search index {path}: {exc}")
+        return ret
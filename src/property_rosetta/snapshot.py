@@ -0,0 +1,653 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled binary snapshots of a dictionary
+
+A snapshot holds a fully loaded dictionary in a compact, versioned binary
+form that can be turned back into Python objects without parsing any yaml.
+
+Layout, all integers little endian:
+
+* header: magic, format version, reserved, sha256 of the yaml sources,
+  section count
+* section table: one (tag, offset, size) entry per section
+* ``STRS``: string table, a count, count + 1 byte offsets and the utf-8
+  blob. Index 0 is reserved for None, every other string is stored once
+* ``DICT``, ``TYPE``, ``ENUM``, ``EVAL``, ``ENTY``, ``PROP``: arrays of
+  fixed size records referring to strings by index. Enumerations and
+  entities own a contiguous range of values and properties respectively
+* ``TIDX``, ``NIDX``, ``EIDX``, ``PIDX``: record numbers of data types,
+  enumerations, entities and properties sorted by the utf-8 bytes of their
+  id, for binary search
+* ``DIAL``: the index of the dialects as a JSON string, dialects being few
+  and read as a whole
+* ``HASH``: the fingerprints of the dictionary, then of each data type,
+  enumeration, entity and property in record order, as raw bytes. The
+  fingerprint of a snapshot dictionary is known without decoding anything
+  else
+
+Attributes are stored as canonical JSON strings, and read back as shared
+read-only mappings, one per distinct map.
+
+Records can be read either all at once, see :func:`from_bytes`, or one at
+a time straight from a memory mapped file, see
+:class:`property_rosetta.mapped.MappedDictionary`.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import List
+
+from property_rosetta import instrumentation
+from property_rosetta.dictionary import FINGERPRINT_SIZE, Dictionary, DictionaryDataType, \
+    DictionaryDialect, DictionaryDialectProperty, DictionaryEntity, DictionaryEnumeration, \
+    DictionaryEnumerationValue, DictionaryProperty, DictionaryError, DictionarySnapshotError, \
+    Interner
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+MAGIC = b'PRSNAPSH'
+FORMAT_VERSION = 5
+
+_HEADER = struct.Struct('<8sHH32sI')
+_SECTION = struct.Struct('<4sQQ')
+_COUNT = struct.Struct('<I')
+_INDEX = struct.Struct('<I')
+_OFFSETS = struct.Struct('<II')
+
+# id, name, description, version, deprecated
+_DICTIONARY = struct.Struct('<IIIIB')
+# id, name, description, semantics, attributes, deprecated
+_DATA_TYPE = struct.Struct('<IIIIIB')
+# id, name, description, deprecated, first value, value count
+_ENUMERATION = struct.Struct('<IIIBII')
+# id, integral value, description, deprecated
+_ENUMERATION_VALUE = struct.Struct('<IqIB')
+# id, name, description, attributes, deprecated, first property, property count
+_ENTITY = struct.Struct('<IIIIBII')
+# id, name, type id, description, attributes, deprecated
+_PROPERTY = struct.Struct('<IIIIIB')
+
+_NONE = 0
+
+
+def source_files(path) -> List[Path]:
+    """Returns the files a yaml dictionary is loaded from, in a stable order
+
+    Parameters
+    ----------
+    path
+        Path to the dictionary yaml file.
+    """
+    path = Path(path)
+    root = path.parent
+    files = [path] + [root / name for name in (
+        'data-types.yaml', 'enumerations.yaml', 'entities.yaml', 'dialects.yaml')]
+    for directory in ('data-type-attributes', 'properties-by-entity'):
+        files += sorted((root / directory).glob('*.yaml'))
+    return [f for f in files if f.is_file()]
+
+
+def source_hash(path) -> bytes:
+    """Returns the sha256 digest of the files a yaml dictionary is loaded from
+
+    Both file names, relative to the dictionary, and contents are hashed so
+    that renaming a per-entity file changes the digest.
+
+    Raises
+    ------
+    OSError
+        If a file cannot be read.
+    """
+    path = Path(path)
+    h = hashlib.sha256()
+    for f in source_files(path):
+        name = f.relative_to(path.parent).as_posix().encode('utf-8')
+        data = f.read_bytes()
+        h.update(struct.pack('<QQ', len(name), len(data)))
+        h.update(name)
+        h.update(data)
+    return h.digest()
+
+
+def _json_default(value):
+    # shared attribute maps are read-only mappings
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+class _StringTable(object):
+    def __init__(self):
+        """Deduplicated strings, referenced by index"""
+        self._indexes = {}
+        self._strings = [b'']
+
+    def add(self, s) -> int:
+        """Returns the index of a string, None is always index 0"""
+        if s is None:
+            return _NONE
+        s = str(s)
+        index = self._indexes.get(s, None)
+        if index is None:
+            index = self._indexes[s] = len(self._strings)
+            self._strings.append(s.encode('utf-8'))
+        return index
+
+    def add_json(self, value) -> int:
+        """Returns the index of the canonical JSON form of a value"""
+        if value is None:
+            return _NONE
+        return self.add(json.dumps(dict(value), sort_keys=True,
+                                   separators=(',', ':'), default=_json_default))
+
+    def to_bytes(self) -> bytes:
+        offsets = array('I', [0])
+        for s in self._strings:
+            offsets.append(offsets[-1] + len(s))
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        return _COUNT.pack(len(self._strings)) + offsets.tobytes() + b''.join(self._strings)
+
+
+def _sorted_index(ids) -> bytes:
+    """Returns record numbers sorted by the utf-8 bytes of their ids"""
+    order = sorted(range(len(ids)), key=lambda i: ids[i].encode('utf-8'))
+    return b''.join(_INDEX.pack(i) for i in order)
+
+
+def to_bytes(dictionary, digest: bytes) -> bytes:
+    """Serializes a loaded dictionary into a snapshot
+
+    Parameters
+    ----------
+    dictionary : Dictionary
+        The dictionary to serialize.
+    digest : bytes
+        The sha256 digest of its sources, see :func:`source_hash`.
+
+    Raises
+    ------
+    DictionaryError
+        If a value cannot be represented in the snapshot.
+    """
+    strings = _StringTable()
+    s = strings.add
+    sections = {}
+    try:
+        sections[b'DICT'] = _DICTIONARY.pack(
+            s(dictionary.id), s(dictionary.name), s(dictionary.description),
+            s(dictionary.version), bool(dictionary.deprecated))
+        sections[b'TYPE'] = b''.join(_DATA_TYPE.pack(
+            s(t.id), s(t.name), s(t.description), s(t.semantics),
+            strings.add_json(t.attributes), bool(t.deprecated))
+            for t in dictionary.data_types or [])
+        enumerations = []
+        values = []
+        for e in dictionary.enumerations:
+            enumerations.append(_ENUMERATION.pack(
+                s(e.id), s(e.name), s(e.description), bool(e.deprecated),
+                len(values), len(e.values)))
+            values += [_ENUMERATION_VALUE.pack(
+                s(v.id), v.integral_value, s(v.description), bool(v.deprecated))
+                for v in e.values]
+        sections[b'ENUM'] = b''.join(enumerations)
+        sections[b'EVAL'] = b''.join(values)
+        entities = []
+        properties = []
+        for e in dictionary.entities:
+            entities.append(_ENTITY.pack(
+                s(e.id), s(e.name), s(e.description),
+                strings.add_json(e.attributes), bool(e.deprecated),
+                len(properties), len(e.properties)))
+            properties += [_PROPERTY.pack(
+                s(p.id), s(p.name), s(p.type_id), s(p.description),
+                strings.add_json(p.attributes), bool(p.deprecated))
+                for p in e.properties]
+        sections[b'ENTY'] = b''.join(entities)
+        sections[b'PROP'] = b''.join(properties)
+        sections[b'TIDX'] = _sorted_index(
+            [str(t.id) for t in dictionary.data_types or []])
+        sections[b'NIDX'] = _sorted_index(
+            [str(e.id) for e in dictionary.enumerations])
+        sections[b'EIDX'] = _sorted_index(
+            [str(e.id) for e in dictionary.entities])
+        sections[b'PIDX'] = _sorted_index(
+            [str(p.id) for e in dictionary.entities for p in e.properties])
+        # value maps are lists of pairs, JSON would turn integer keys into strings
+        sections[b'DIAL'] = _INDEX.pack(s(json.dumps([
+            [d.id, d.name, d.description, bool(d.deprecated),
+             [[p.property_id, p.name, list(p.values.items())] for p in d.properties]]
+            for d in dictionary.dialects], separators=(',', ':'))))
+        sections[b'HASH'] = b''.join(bytes.fromhex(o.fingerprint) for o in itertools.chain(
+            [dictionary], dictionary.data_types or [], dictionary.enumerations,
+            dictionary.entities, (p for e in dictionary.entities for p in e.properties)))
+    except (struct.error, TypeError, ValueError) as exc:
+        raise DictionaryError(
+            f'Dictionary {dictionary.id} cannot be stored in a snapshot: {exc}')
+    sections = dict([(b'STRS', strings.to_bytes())] + list(sections.items()))
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for tag, data in sections.items():
+        table.append(_SECTION.pack(tag, offset, len(data)))
+        offset += len(data)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, digest, len(sections))
+    return b''.join([header] + table + list(sections.values()))
+
+
+def write_snapshot(dictionary, path, digest: bytes):
+    """Writes a dictionary snapshot to a file, see :func:`to_bytes`
+
+    The snapshot is written to a temporary file renamed over path, so that
+    processes mapping the previous snapshot keep reading it unchanged.
+    """
+    path = Path(path)
+    _logger.debug(f"Writing snapshot of {dictionary.id} to {path}")
+    data = to_bytes(dictionary, digest)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_header(buf, path=None):
+    """Validates a snapshot header and returns its digest and sections
+
+    Returns
+    -------
+    tuple
+        The source digest and a map from section tag to (offset, size).
+
+    Raises
+    ------
+    DictionarySnapshotError
+        If the data is not a snapshot or has an unsupported format version.
+    """
+    try:
+        magic, version, _, digest, count = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise DictionarySnapshotError(
+                f'Not a dictionary snapshot: {path}', None)
+        if version != FORMAT_VERSION:
+            raise DictionarySnapshotError(
+                f'Unsupported snapshot format version {version} in {path}, '
+                f'expected {FORMAT_VERSION}', None)
+        sections = {}
+        for i in range(count):
+            tag, offset, size = _SECTION.unpack_from(
+                buf, _HEADER.size + i * _SECTION.size)
+            if offset + size > len(buf):
+                raise DictionarySnapshotError(
+                    f'Truncated dictionary snapshot: {path}', None)
+            sections[tag] = (offset, size)
+    except struct.error as exc:
+        raise DictionarySnapshotError(
+            f'Truncated dictionary snapshot: {path}', exc)
+    return digest, sections
+
+
+def check_digest(digest: bytes, source, path=None):
+    """Raises if a snapshot digest does not match the current yaml sources
+
+    Raises
+    ------
+    DictionarySnapshotError
+        If the snapshot is stale or the sources cannot be read.
+    """
+    try:
+        current = source_hash(source)
+    except OSError as exc:
+        raise DictionarySnapshotError(
+            f'Error reading dictionary sources: {source}', exc)
+    if current != digest:
+        raise DictionarySnapshotError(
+            f'Stale dictionary snapshot {path}: sources in {Path(source).parent} changed',
+            None)
+
+
+class SnapshotReader(object):
+    def __init__(self, buf, path=None, eager: bool = True):
+        """Random access to the records of a snapshot
+
+        Records are decoded on demand from any buffer, including a memory
+        mapped file, and turned into dictionary model objects.
+
+        Parameters
+        ----------
+        buf
+            The snapshot data.
+        path : optional
+            Where the data was read from, used in error messages.
+        eager : bool
+            Decode the whole string table and all enumeration value and
+            property records up front, which is faster when most records are
+            going to be read. Otherwise they are decoded from the buffer as
+            they are needed.
+
+        Attributes
+        ----------
+        digest : bytes
+            The sha256 digest of the sources the snapshot was compiled from.
+
+        Raises
+        ------
+        DictionarySnapshotError
+            If the data is not a valid snapshot.
+        """
+        self.digest, self._sections = read_header(buf, path)
+        self._buf = buf
+        self._path = path
+        self._attributes = {}
+        self._interner = Interner()
+        try:
+            self._strings_offset, _ = self._sections[b'STRS']
+            self._string_count, = _COUNT.unpack_from(
+                buf, self._strings_offset)
+            self._blob_offset = self._strings_offset + \
+                _COUNT.size + _INDEX.size * (self._string_count + 1)
+            for tag in (b'DICT', b'TYPE', b'ENUM', b'EVAL', b'ENTY', b'PROP',
+                        b'TIDX', b'NIDX', b'EIDX', b'PIDX', b'DIAL', b'HASH'):
+                self._sections[tag]
+            # position of the first fingerprint of each kind of record
+            self._fingerprint_bases = {b'DICT': 0}
+            base = 1
+            for tag, record in ((b'TYPE', _DATA_TYPE), (b'ENUM', _ENUMERATION),
+                                (b'ENTY', _ENTITY), (b'PROP', _PROPERTY)):
+                self._fingerprint_bases[tag] = base
+                base += self.count(tag, record)
+            if self._sections[b'HASH'][1] != base * FINGERPRINT_SIZE:
+                raise ValueError('Fingerprint count does not match the record count')
+            self._strings = None
+            self._values = None
+            self._properties = None
+            if eager:
+                self._strings = self._decode_all()
+                self._values = list(self.records(
+                    b'EVAL', _ENUMERATION_VALUE))
+                self._properties = list(self.records(b'PROP', _PROPERTY))
+        except (KeyError, ValueError, struct.error) as exc:
+            raise self.corrupted(exc)
+
+    def corrupted(self, exc=None):
+        return DictionarySnapshotError(
+            f'Corrupted dictionary snapshot: {self._path}', exc)
+
+    def _string_bytes(self, index: int):
+        start, end = _OFFSETS.unpack_from(
+            self._buf, self._strings_offset + _COUNT.size + _INDEX.size * index)
+        return self._buf[self._blob_offset + start:self._blob_offset + end]
+
+    def _decode_all(self) -> List:
+        offsets = array('I')
+        offsets.frombytes(self._buf[self._strings_offset + _COUNT.size:self._blob_offset])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        blob = bytes(self._buf[self._blob_offset:self._blob_offset + offsets[-1]])
+        strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+                   for i in range(self._string_count)]
+        strings[_NONE] = None
+        return strings
+
+    def _decode(self, index: int):
+        if index == _NONE:
+            return None
+        return bytes(self._string_bytes(index)).decode('utf-8')
+
+    def string(self, index: int):
+        """Returns a string from the string table, index 0 is None"""
+        if self._strings is not None:
+            return self._strings[index]
+        if index >= self._string_count:
+            raise IndexError(index)
+        return self._decode(index)
+
+    def attributes(self, index: int):
+        """Returns a read-only attributes map, shared by all the objects using it"""
+        if index == _NONE:
+            return None
+        parsed = self._attributes.get(index, None)
+        if parsed is None:
+            parsed = self._attributes.setdefault(
+                index, self._interner.attributes(json.loads(self.string(index))))
+        return parsed
+
+    def count(self, tag: bytes, record: struct.Struct) -> int:
+        """Returns the number of records in a section"""
+        return self._sections[tag][1] // record.size
+
+    def record(self, tag: bytes, record: struct.Struct, i: int) -> tuple:
+        """Returns a single unpacked record from a section"""
+        offset, size = self._sections[tag]
+        if not 0 <= i < size // record.size:
+            raise IndexError(i)
+        return record.unpack_from(self._buf, offset + i * record.size)
+
+    def records(self, tag: bytes, record: struct.Struct):
+        """Iterates over all unpacked records of a section"""
+        offset, size = self._sections[tag]
+        return record.iter_unpack(self._buf[offset:offset + size])
+
+    def _owned_records(self, unpacked, tag: bytes, record: struct.Struct,
+                       first: int, count: int):
+        if unpacked is not None:
+            return unpacked[first:first + count]
+        return [self.record(tag, record, i) for i in range(first, first + count)]
+
+    def find(self, index_tag: bytes, tag: bytes, record: struct.Struct, id: str):
+        """Binary searches a sorted index for the record number with an id
+
+        Returns
+        -------
+        int
+            The record number, or None if no record has that id.
+        """
+        key = id.encode('utf-8')
+        offset, size = self._sections[index_tag]
+        lo, hi = 0, size // _INDEX.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i, = _INDEX.unpack_from(self._buf, offset + mid * _INDEX.size)
+            if bytes(self._string_bytes(self.record(tag, record, i)[0])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == size // _INDEX.size:
+            return None
+        i, = _INDEX.unpack_from(self._buf, offset + lo * _INDEX.size)
+        if bytes(self._string_bytes(self.record(tag, record, i)[0])) != key:
+            return None
+        return i
+
+    def fingerprint(self, tag: bytes, i: int = 0) -> str:
+        """Returns the stored fingerprint of a record, as hex digits"""
+        offset, _ = self._sections[b'HASH']
+        offset += (self._fingerprint_bases[tag] + i) * FINGERPRINT_SIZE
+        return bytes(self._buf[offset:offset + FINGERPRINT_SIZE]).hex()
+
+    def property_owner(self, i: int) -> int:
+        """Returns the record number of the entity owning a property record"""
+        lo, hi = 0, self.count(b'ENTY', _ENTITY)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _, _, _, _, _, first, count = self.record(b'ENTY', _ENTITY, mid)
+            if first + count <= i:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def fill_dictionary(self, ret):
+        """Sets the scalar fields of a dictionary from the snapshot"""
+        id, name, description, version, deprecated = self.record(
+            b'DICT', _DICTIONARY, 0)
+        ret.id = self.string(id)
+        ret.name = self.string(name)
+        ret.description = self.string(description)
+        ret.version = self.string(version)
+        ret.deprecated = bool(deprecated)
+        ret._fingerprint = self.fingerprint(b'DICT')
+        return ret
+
+    def data_type(self, dictionary, record: tuple, i: int) -> DictionaryDataType:
+        """Builds a data type from its unpacked record and its record number"""
+        id, name, description, semantics, attributes, deprecated = record
+        t = DictionaryDataType(dictionary)
+        t.id = self.string(id)
+        t.name = self.string(name)
+        t.description = self.string(description)
+        t.semantics = self.string(semantics)
+        t.attributes = self.attributes(attributes)
+        t.deprecated = bool(deprecated)
+        t._fingerprint = self.fingerprint(b'TYPE', i)
+        return t
+
+    def enumeration(self, dictionary, record: tuple, i: int) -> DictionaryEnumeration:
+        """Builds an enumeration and all its values from its unpacked record and number"""
+        id, name, description, deprecated, first, count = record
+        e = DictionaryEnumeration(None, dictionary)
+        e.id = self.string(id)
+        e.name = self.string(name)
+        e.description = self.string(description)
+        e.deprecated = bool(deprecated)
+        for value_id, integral_value, value_description, value_deprecated in \
+                self._owned_records(self._values, b'EVAL', _ENUMERATION_VALUE, first, count):
+            v = DictionaryEnumerationValue(e)
+            v.id = self.string(value_id)
+            v.integral_value = integral_value
+            v.description = self.string(value_description)
+            v.deprecated = bool(value_deprecated)
+            e.values.append(v)
+        e.reindex()
+        e._fingerprint = self.fingerprint(b'ENUM', i)
+        return e
+
+    def dialects(self, dictionary) -> List[DictionaryDialect]:
+        """Builds all the dialects of the snapshot"""
+        offset, _ = self._sections[b'DIAL']
+        index, = _INDEX.unpack_from(self._buf, offset)
+        ret = []
+        for id, name, description, deprecated, properties in json.loads(self.string(index)):
+            d = DictionaryDialect(dictionary)
+            d.id = self._interner.identifier(id)
+            d.name = name
+            d.description = description
+            d.deprecated = deprecated
+            for property_id, property_name, values in properties:
+                p = DictionaryDialectProperty(d)
+                p.property_id = self._interner.identifier(property_id)
+                p.name = self._interner.identifier(property_name)
+                p.values = self._interner.attributes(dict(values))
+                d.properties.append(p)
+            d.reindex()
+            ret.append(d)
+        return ret
+
+    def entity(self, dictionary, record: tuple, i: int) -> DictionaryEntity:
+        """Builds an entity and all its properties from its unpacked record and number"""
+        id, name, description, attributes, deprecated, first, count = record
+        e = DictionaryEntity(dictionary)
+        e.id = self.string(id)
+        e.name = self.string(name)
+        e.description = self.string(description)
+        e.attributes = self.attributes(attributes)
+        e.deprecated = bool(deprecated)
+        for property_id, property_name, type_id, property_description, \
+                property_attributes, property_deprecated in \
+                self._owned_records(self._properties, b'PROP', _PROPERTY, first, count):
+            p = DictionaryProperty(e)
+            p.id = self.string(property_id)
+            p.name = self.string(property_name)
+            p.type_id = self.string(type_id)
+            p.description = self.string(property_description)
+            p.attributes = self.attributes(property_attributes)
+            p.deprecated = bool(property_deprecated)
+            e.properties.append(p)
+        e.reindex()
+        for n, p in enumerate(e.properties):
+            p._fingerprint = self.fingerprint(b'PROP', first + n)
+        e._fingerprint = self.fingerprint(b'ENTY', i)
+        return e
+
+
+def from_bytes(buf, source=None, path=None) -> Dictionary:
+    """Rebuilds a dictionary from snapshot data
+
+    Parameters
+    ----------
+    buf
+        The snapshot data.
+    source : optional
+        Path to the dictionary yaml file the snapshot was compiled from. When
+        given, the snapshot is rejected if the sources changed since.
+    path : optional
+        Where the data was read from, used in error messages.
+
+    Raises
+    ------
+    DictionarySnapshotError
+        If the data is not a valid snapshot, or it is stale.
+    """
+    reader = SnapshotReader(buf, path)
+    if source is not None:
+        # hashing the sources reads them all
+        with instrumentation.span(instrumentation.IO):
+            check_digest(reader.digest, source, path)
+    try:
+        ret = reader.fill_dictionary(Dictionary())
+        ret.data_types = [reader.data_type(ret, r, i)
+                          for i, r in enumerate(reader.records(b'TYPE', _DATA_TYPE))]
+        ret.enumerations = [reader.enumeration(ret, r, i)
+                            for i, r in enumerate(reader.records(b'ENUM', _ENUMERATION))]
+        ret.entities = [reader.entity(ret, r, i)
+                        for i, r in enumerate(reader.records(b'ENTY', _ENTITY))]
+        ret.dialects = reader.dialects(ret)
+        ret.reindex()
+        # reindex forgot the stored fingerprints, the content did not change
+        ret._fingerprint = reader.fingerprint(b'DICT')
+        for tag, items in ((b'TYPE', ret.data_types), (b'ENUM', ret.enumerations),
+                           (b'ENTY', ret.entities),
+                           (b'PROP', [p for e in ret.entities for p in e.properties])):
+            for i, o in enumerate(items):
+                o._fingerprint = reader.fingerprint(tag, i)
+    except (ValueError, IndexError, struct.error) as exc:
+        raise reader.corrupted(exc)
+    return ret
+
+
+def read_snapshot(path, source=None) -> Dictionary:
+    """Reads a dictionary snapshot from a file, see :func:`from_bytes`"""
+    _logger.debug(f"Loading dictionary snapshot from {path}")
+    try:
+        with instrumentation.span(instrumentation.IO), open(path, 'rb') as f:
+            buf = f.read()
+    except OSError as exc:
+        raise DictionarySnapshotError(
+            f'Error reading dictionary snapshot: {path}', exc)
+    instrumentation.count(instrumentation.FILES)
+    instrumentation.count(instrumentation.BYTES, len(buf))
+    with instrumentation.span(instrumentation.BUILD):
+        ret = from_bytes(buf, source, path)
+    instrumentation.count(instrumentation.DATA_TYPES, len(ret.data_types))
+    instrumentation.count(instrumentation.ENUMERATIONS, len(ret.enumerations))
+    instrumentation.count(instrumentation.ENTITIES, len(ret.entities))
+    instrumentation.count(instrumentation.PROPERTIES, sum(len(e.properties) for e in ret.entities))
+    return ret
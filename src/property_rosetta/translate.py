@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Translation of records between the dialects of a dictionary
+
+A dialect names some properties of the dictionary differently, and may
+spell the values of their enumerations differently, see
+:class:`property_rosetta.dictionary.DictionaryDialect`. Dialects are read
+from the optional dialects.yaml file of a dictionary::
+
+    ---
+    - id: legacy
+      name: The legacy system
+      properties:
+        - property: ok.index
+          name: IDX
+        - property: ok.colour
+          name: COL
+          values:
+            R: red
+            B: blue
+
+Properties a dialect does not mention keep their id as name, values it does
+not mention are spelled as in the dictionary. The dictionary itself is the
+dialect :data:`COMMON`, where every property is named by its id.
+
+:func:`compile_translation` flattens a pair of dialects into a single table
+from the names of the source dialect to the names of the target one, along
+with a map of the enumeration values to respell, so translating a record
+costs one lookup per field.
+"""
+import logging
+import threading
+import weakref
+from typing import Iterable, Iterator, List
+
+from property_rosetta.dictionary import DictionaryError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+COMMON = None
+
+DROP = 'drop'
+KEEP = 'keep'
+RAISE = 'raise'
+
+
+class TranslationError(DictionaryError):
+    """Raised when dialects cannot be translated, or a record has fields no dialect knows"""
+    pass
+
+
+def _dialect_names(dictionary, dialect_id, property_ids) -> dict:
+    """Returns the name and the value map of each property in a dialect"""
+    if dialect_id is COMMON:
+        return {id: (id, {}) for id in property_ids}
+    dialect = dictionary.dialect_by_id(dialect_id)
+    if dialect is None:
+        raise TranslationError(f'Dictionary {dictionary.id} has no dialect {dialect_id}')
+    names = {}
+    for id in property_ids:
+        p = dialect.property_by_id(id)
+        names[id] = (id, {}) if p is None else (p.name, p.values)
+    for p in dialect.properties:
+        if p.property_id not in names:
+            raise TranslationError(
+                f'Dialect {dialect_id} names property {p.property_id}, '
+                f'which is not in dictionary {dictionary.id}')
+        enumeration = dictionary.enumeration_by_id(
+            dictionary.property_by_id(p.property_id).type_id)
+        if p.values and enumeration is None:
+            raise TranslationError(
+                f'Dialect {dialect_id} maps values of {p.property_id}, '
+                f'which is not an enumeration')
+        known = set(v.id for v in enumeration.values) if p.values else set()
+        unknown = [v for v in p.values.values() if v not in known]
+        if unknown:
+            raise TranslationError(
+                f'Dialect {dialect_id} maps values of {p.property_id} to {unknown[0]}, '
+                f'which is not in enumeration {enumeration.id}')
+    return names
+
+
+class Translation(object):
+    def __init__(self, dictionary, source=COMMON, target=COMMON, unmapped: str = DROP):
+        """Translates records from a dialect to another
+
+        Parameters
+        ----------
+        dictionary : Dictionary
+            The dictionary the dialects belong to.
+        source : str, optional
+            Id of the dialect records are in, COMMON for property ids.
+        target : str, optional
+            Id of the dialect to translate records to, COMMON for property
+            ids.
+        unmapped : str
+            What to do with fields that are not a property in the source
+            dialect: DROP them, KEEP them as they are, or RAISE a
+            TranslationError.
+
+        Raises
+        ------
+        TranslationError
+            If a dialect is missing, names properties or values that are
+            not in the dictionary, or gives two properties the same name.
+        ValueError
+            If unmapped is invalid.
+        """
+        if unmapped not in (DROP, KEEP, RAISE):
+            raise ValueError(f'Unmapped fields policy must be drop, keep or raise, not {unmapped}')
+        self.source = source
+        self.target = target
+        self.unmapped = unmapped
+        property_ids = list(dict.fromkeys(
+            p.id for e in dictionary.entities for p in e.properties))
+        sources = _dialect_names(dictionary, source, property_ids)
+        targets = _dialect_names(dictionary, target, property_ids)
+        # source name -> (target name, map of the values to respell or None)
+        self._table = {}
+        target_names = set()
+        for id in property_ids:
+            name, values = sources[id]
+            target_name, target_values = targets[id]
+            if name in self._table:
+                raise TranslationError(f'Dialect {source} uses the name {name} twice')
+            # two fields translated to the same name would overwrite each other
+            if target_name in target_names:
+                raise TranslationError(f'Dialect {target} uses the name {target_name} twice')
+            target_names.add(target_name)
+            respelled = {v: c for c, v in target_values.items()}
+            values = {v: respelled.get(values.get(v, v), values.get(v, v))
+                      for v in set(values) | set(respelled)}
+            values = {v: t for v, t in values.items() if v != t}
+            self._table[name] = (target_name, values or None)
+
+    def translate(self, record) -> dict:
+        """Returns a record with the names and values of the target dialect
+
+        Raises
+        ------
+        TranslationError
+            If a field is not a property in the source dialect and the
+            policy is RAISE.
+        """
+        table = self._table
+        ret = {}
+        for key, value in record.items():
+            entry = table.get(key, None)
+            if entry is None:
+                if self.unmapped == KEEP:
+                    ret[key] = value
+                elif self.unmapped == RAISE:
+                    raise TranslationError(
+                        f'Field {key} is not a property in dialect {self.source}')
+                continue
+            name, values = entry
+            if values is not None:
+                value = values.get(value, value)
+            ret[name] = value
+        return ret
+
+    def translate_many(self, records: Iterable) -> Iterator[dict]:
+        """Translates records one at a time as they are consumed"""
+        translate = self.translate
+        for record in records:
+            yield translate(record)
+
+    def translate_batch(self, records: Iterable) -> List[dict]:
+        """Returns the translations of a batch of records"""
+        translate = self.translate
+        return [translate(r) for r in records]
+
+
+_translations = weakref.WeakKeyDictionary()
+_translations_lock = threading.Lock()
+
+
+def compile_translation(dictionary, source=COMMON, target=COMMON,
+                        unmapped: str = DROP) -> Translation:
+    """Returns the translation between two dialects of a dictionary
+
+    Translations are kept for as long as the dictionary exists, call
+    :func:`clear_translations` after modifying the dictionary. See
+    :class:`Translation` for the parameters.
+    """
+    key = (source, target, unmapped)
+    translations = _translations.get(dictionary, None)
+    translation = translations.get(key, None) if translations is not None else None
+    if translation is None:
+        translation = Translation(dictionary, source, target, unmapped)
+        with _translations_lock:
+            translation = _translations.setdefault(dictionary, {}).setdefault(key, translation)
+    return translation
+
+
+def clear_translations():
+    """Forgets all the translations compiled so far"""
+    with _translations_lock:
+        _translations.clear()
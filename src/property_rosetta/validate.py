@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
 """
 A validation script
+
+Only the standard library is imported up front, so that ``--version`` and
+``--help`` answer quickly. Dictionary loading and yaml parsing are imported
+when a dictionary is actually validated.
 """
 
 import argparse
+import json
+import os
 import sys
 import logging
 from pathlib import Path
 
-from property_rosetta import __version__
-from property_rosetta.dictionary import Dictionary, DictionaryError
-
 __author__ = "Claudio Bantaloukas"
 __copyright__ = "Claudio Bantaloukas"
 __license__ = "new-bsd"
@@ -18,6 +21,20 @@ __license__ = "new-bsd"
 _logger = logging.getLogger(__name__)
 
 
+class VersionAction(argparse.Action):
+    """Prints the version and exits, the version is only looked up when requested"""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS,
+                 help="show program's version number and exit"):
+        super().__init__(option_strings=option_strings, dest=dest, default=default,
+                         nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from property_rosetta import __version__
+        sys.stdout.write(f"property_rosetta {__version__}\n")
+        parser.exit()
+
+
 def parse_args(args):
     """Parse command line parameters
 
@@ -31,12 +48,64 @@ def parse_args(args):
         description="Validate a dictionary")
     parser.add_argument(
         "--version",
-        action="version",
-        version="property_rosetta {ver}".format(ver=__version__))
+        action=VersionAction)
     parser.add_argument(
         dest="path",
         help="path containing a dictionary",
         type=Path)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        help="parse the dictionary files using this many workers; entities are validated by "
+             "as many threads, which only helps rules that release the GIL",
+        type=int,
+        default=None)
+    parser.add_argument(
+        "--yaml-backend",
+        dest="yaml_backend",
+        help="yaml parser to use, defaults to libyaml when available",
+        choices=["libyaml", "python"],
+        default=None)
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="keep parsed dictionary files and validation results in this directory, "
+             "only changed files are parsed and validated again. Entries are plain data, "
+             "never code, but are trusted to match their files: do not share the "
+             "directory with untrusted users",
+        type=Path,
+        default=None)
+    parser.add_argument(
+        "--no-cache",
+        dest="cache_dir",
+        help="do not use a parse cache, overriding --cache-dir",
+        action="store_const",
+        const=None)
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        help="keep running, validating again whenever dictionary files change",
+        action="store_true")
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        help="keep running, answering validation requests on this local socket",
+        type=Path,
+        default=None)
+    parser.add_argument(
+        "--poll",
+        dest="poll",
+        help="poll for changes even if watchdog is installed",
+        action="store_true")
+    parser.add_argument(
+        "--stats",
+        "--profile",
+        dest="stats",
+        help="print the time spent reading, parsing, building and validating the dictionary, "
+             "and how many files, bytes, entities and properties were loaded, as json; "
+             "logs then go to stderr",
+        action="store_true")
     parser.add_argument(
         "-v",
         "--verbose",
@@ -54,14 +123,15 @@ def parse_args(args):
     return parser.parse_args(args)
 
 
-def setup_logging(loglevel):
+def setup_logging(loglevel, stream=None):
     """Setup basic logging
 
     Args:
       loglevel (int): minimum loglevel for emitting messages
+      stream (file): where to log to, defaults to stdout
     """
     logformat = "[%(asctime)s] %(levelname)s:%(name)s:%(message)s"
-    logging.basicConfig(level=loglevel, stream=sys.stdout,
+    logging.basicConfig(level=loglevel, stream=stream or sys.stdout,
                         format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
 
 
@@ -72,27 +142,122 @@ def main(args):
       args ([str]): command line parameter list
     """
     args = parse_args(args)
-    setup_logging(args.loglevel)
+    # stdout is kept for the json statistics
+    setup_logging(args.loglevel, sys.stderr if args.stats else None)
+    if args.watch or args.socket:
+        return watch(args)
+    if not args.stats:
+        return check(args)
+    from property_rosetta import instrumentation
+    with instrumentation.recording() as recorder:
+        ret = check(args)
+    sys.stdout.write(json.dumps(recorder.to_dict(), indent=2, sort_keys=True) + '\n')
+    return ret
+
+
+def check(args):
+    """Validates the dictionary once
+
+    Args:
+      args (:obj:`argparse.Namespace`): command line parameters namespace
+
+    Returns:
+      int: the exit code
+    """
+    from property_rosetta.cache import ParseCache
+    from property_rosetta.dictionary import Dictionary, DictionaryError
     _logger.debug(f"Loading dictionary from {args.path}")
     try:
-        dictionary = Dictionary.from_yaml_dictionary(args.path)
-    except DictionaryError as e:
+        cache = ParseCache(args.cache_dir) if args.cache_dir else None
+        dictionary = Dictionary.from_yaml_dictionary(
+            args.path, workers=args.jobs, backend=args.yaml_backend, cache=cache)
+    except (DictionaryError, ValueError, OSError) as e:
         _logger.fatal(f"{e}")
         return 1
-    errors = dictionary.validate()
+    _logger.info(f"Dictionary parsed with the {dictionary.yaml_backend} yaml backend")
+    stats = dictionary.interning_stats
+    _logger.info(f"Deduplicated {stats['strings_deduplicated']} of {stats['strings']} strings "
+                 f"and {stats['attribute_maps_deduplicated']} of {stats['attribute_maps']} "
+                 f"attribute maps")
+    state = None
+    if cache:
+        from property_rosetta.validation import ValidationState
+        state_path = args.cache_dir / 'validation.json'
+        state = ValidationState.load(state_path)
+    issues = dictionary.validate(workers=args.jobs, state=state)
+    if state:
+        _logger.info(f"Evaluated {state.evaluated} and reused {state.reused} rule results")
+        try:
+            state.save(state_path)
+        except OSError as e:
+            _logger.warning(f"Could not save validation state: {e}")
+    return report(issues)
+
+
+def report(issues) -> int:
+    """Logs validation issues
+
+    Args:
+      issues ([ValidationIssue]): the issues to log
+
+    Returns:
+      int: the exit code, 1 if there are errors
+    """
+    errors = [i for i in issues if i.is_error]
+    for issue in issues:
+        if issue.is_error:
+            _logger.error(issue)
+        else:
+            _logger.warning(issue)
     if not errors:
-        _logger.info('No errors found')
+        _logger.info(f'No errors found, {len(issues)} warnings')
         return 0
-    else:
-        for error in errors:
-            _logger.error(error)
-        return 1
+    return 1
+
+
+def watch(args):
+    """Keeps validating the dictionary until interrupted
+
+    Args:
+      args (:obj:`argparse.Namespace`): command line parameters namespace
+
+    Returns:
+      int: the exit code
+    """
+    from property_rosetta.validation import ValidationIssue
+    from property_rosetta.watch import DictionaryWatcher, serve
+    server = None
+    with DictionaryWatcher(args.path, workers=args.jobs, backend=args.yaml_backend,
+                           polling=args.poll) as watcher:
+        try:
+            if args.socket:
+                server = serve(watcher, args.socket)
+            generation = None
+            while True:
+                result = watcher.current()
+                if args.watch and result['generation'] != generation:
+                    generation = result['generation']
+                    if result['error']:
+                        _logger.error(result['error'])
+                    else:
+                        report([ValidationIssue(**i) for i in result['issues']])
+                watcher.wait(1.0)
+        except KeyboardInterrupt:
+            return 0
+        except OSError as e:
+            _logger.fatal(f"{e}")
+            return 1
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+                os.unlink(args.socket)
 
 
 def run():
     """Entry point for console_scripts
     """
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
 
 
 if __name__ == "__main__":
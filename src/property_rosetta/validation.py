@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Rule based validation of loaded dictionaries
+
+A rule inspects either the whole dictionary or a single entity and returns
+the issues it finds. Entity rules are independent of each other, so the
+entities of a dictionary can be checked by several threads, which pays off
+for rules that release the GIL. Every rule runs to
+completion, all issues are collected, and they are reported in a
+deterministic order: dictionary rules first, then entities in dictionary
+order, each in rule order.
+
+Rules only use the constant time lookups of the dictionary, so validation
+time grows linearly with the size of the dictionary.
+
+Given a :class:`ValidationState`, the data types, enumerations and entities
+looked up by each entity rule are recorded along with their fingerprint. On
+the next run, the results of an entity rule are reused as long as neither
+the entity nor anything it depended on changed.
+"""
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import tempfile
+from typing import List
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+class ValidationIssue(collections.namedtuple(
+        'ValidationIssue', ['severity', 'rule', 'subject', 'message'])):
+    """A problem found by a validation rule
+
+    Attributes
+    ----------
+    severity : str
+        Either ERROR or WARNING.
+    rule : str
+        Name of the rule that found the problem.
+    subject : str
+        Id of the dictionary object the problem is about.
+    message : str
+        Human readable description of the problem.
+    """
+    __slots__ = ()
+
+    @property
+    def is_error(self) -> bool:
+        return self.severity == ERROR
+
+    def __str__(self):
+        return f'{self.subject}: {self.message} [{self.rule}]'
+
+
+class Rule(object):
+    """Base class of validation rules
+
+    Subclasses set name and severity and override :meth:`check_dictionary`,
+    :meth:`check_entity` or both. Rules must not modify the dictionary and
+    must be safe to call from several threads at once.
+    """
+    name = None
+    severity = ERROR
+
+    def issue(self, subject, message: str) -> ValidationIssue:
+        """Returns an issue found by this rule"""
+        return ValidationIssue(self.severity, self.name, subject, message)
+
+    def check_dictionary(self, dictionary) -> List[ValidationIssue]:
+        """Returns the issues of the dictionary as a whole"""
+        return []
+
+    def check_entity(self, dictionary, entity) -> List[ValidationIssue]:
+        """Returns the issues of a single entity and its properties"""
+        return []
+
+
+class PropertyTypeResolves(Rule):
+    """Every property type is a data type or an enumeration of the dictionary"""
+    name = 'property-type-resolves'
+
+    def check_entity(self, dictionary, entity):
+        return [self.issue(p.id, f"Type {p.type_id} is neither a data type nor an enumeration")
+                for p in entity.properties
+                if dictionary.type_by_id(p.type_id) is None and
+                dictionary.enumeration_by_id(p.type_id) is None]
+
+
+class UniqueIds(Rule):
+    """Data type, enumeration, entity and property ids are globally unique"""
+    name = 'unique-ids'
+
+    def check_dictionary(self, dictionary):
+        issues = []
+        for kind, items in [('data type', dictionary.data_types or []),
+                            ('enumeration', dictionary.enumerations),
+                            ('entity', dictionary.entities)]:
+            issues += self._duplicates(kind, (i.id for i in items))
+        issues += self._duplicates(
+            'property', (p.id for e in dictionary.entities for p in e.properties))
+        return issues
+
+    def _duplicates(self, kind: str, ids) -> List[ValidationIssue]:
+        counts = collections.Counter(ids)
+        return [self.issue(id, f"The {kind} id {id} is used {count} times")
+                for id, count in counts.items() if count > 1]
+
+
+class DeprecatedTypeUsage(Rule):
+    """Properties still in use should not have a deprecated type"""
+    name = 'deprecated-type-usage'
+    severity = WARNING
+
+    def check_entity(self, dictionary, entity):
+        issues = []
+        for p in entity.properties:
+            if p.deprecated:
+                continue
+            t = dictionary.type_by_id(p.type_id) or \
+                dictionary.enumeration_by_id(p.type_id)
+            if t is not None and t.deprecated:
+                issues.append(self.issue(p.id, f"Uses the deprecated type {p.type_id}"))
+        return issues
+
+
+DEFAULT_RULES = [PropertyTypeResolves(), UniqueIds(), DeprecatedTypeUsage()]
+
+STATE_VERSION = 2
+
+
+def _fingerprint_of(o) -> str:
+    return o.fingerprint if o is not None else None
+
+
+class _RecordingDictionary(object):
+    def __init__(self, dictionary):
+        """Wraps a dictionary, recording the objects looked up through it
+
+        Attributes
+        ----------
+        dependencies : list
+            (kind, id, fingerprint) of every lookup, the fingerprint being
+            None for ids that were not found.
+        """
+        self._dictionary = dictionary
+        self._recorded = set()
+        self.dependencies = []
+
+    def __getattr__(self, name):
+        return getattr(self._dictionary, name)
+
+    def _record(self, kind, id, o, fingerprinted=None):
+        if (kind, id) not in self._recorded:
+            self._recorded.add((kind, id))
+            self.dependencies.append((kind, id, _fingerprint_of(fingerprinted or o)))
+        return o
+
+    def type_by_id(self, type_id):
+        return self._record('data type', type_id, self._dictionary.type_by_id(type_id))
+
+    def enumeration_by_id(self, enumeration_id):
+        return self._record('enumeration', enumeration_id,
+                            self._dictionary.enumeration_by_id(enumeration_id))
+
+    def entity_by_id(self, entity_id):
+        return self._record('entity', entity_id, self._dictionary.entity_by_id(entity_id))
+
+    def property_by_id(self, property_id):
+        p = self._dictionary.property_by_id(property_id)
+        return self._record('property', property_id, p, p and p.entity)
+
+
+class ValidationState(object):
+    def __init__(self):
+        """Results of a previous validation, to only re-check what changed
+
+        Besides rule results, the state keeps the fingerprints of the data
+        types, enumerations and entities of dictionaries loaded through a
+        parse cache, along with the hashes of the files they were loaded
+        from, see :meth:`Dictionary.sources_of`. Objects loaded from
+        unchanged files get their fingerprint back instead of hashing their
+        content again, so that re-checking a dictionary where one file
+        changed only hashes what that file holds.
+
+        Attributes
+        ----------
+        reused : int
+            Number of rule results reused by the last validation.
+        evaluated : int
+            Number of rule results evaluated by the last validation.
+        restored : int
+            Number of fingerprints restored by the last validation.
+        """
+        self.results = {}
+        self.fingerprints = {}
+        self.reused = 0
+        self.evaluated = 0
+        self.restored = 0
+
+    def _current(self, dictionary, dependencies) -> bool:
+        lookups = {
+            'data type': dictionary.type_by_id,
+            'enumeration': dictionary.enumeration_by_id,
+            'entity': dictionary.entity_by_id,
+            'property': lambda id: getattr(dictionary.property_by_id(id), 'entity', None),
+        }
+        for kind, id, fingerprint in dependencies:
+            if _fingerprint_of(lookups[kind](id)) != fingerprint:
+                return False
+        return True
+
+    def _restore(self, dictionary, kind: str, items, fingerprints: dict) -> List[tuple]:
+        """Restores the fingerprints of objects loaded from unchanged files
+
+        Returns the objects keyed by kind, id and occurrence, and adds the
+        fingerprints to keep for the next validation to fingerprints.
+        """
+        keyed = []
+        occurrences = collections.Counter()
+        for o in items:
+            key = f'{kind}:{o.id}:{occurrences[o.id]}'
+            occurrences[o.id] += 1
+            keyed.append((key, o))
+            sources = dictionary.sources_of(kind, o.id)
+            if sources is None:
+                continue
+            entry = self.fingerprints.get(key, None)
+            if entry is not None and entry[1] == sources and o._fingerprint is None:
+                o._fingerprint = entry[0]
+                self.restored += 1
+            fingerprints[key] = [o.fingerprint, sources]
+        return keyed
+
+    @classmethod
+    def load(cls, path) -> 'ValidationState':
+        """Reads a state saved by :meth:`save`
+
+        An empty state is returned if the file is missing, unreadable or was
+        written by another version of property_rosetta.
+        """
+        from property_rosetta import __version__
+        ret = ValidationState()
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('version', None) == STATE_VERSION and \
+                    state.get('property_rosetta', None) == __version__:
+                ret.results = state['results']
+                ret.fingerprints = state['fingerprints']
+        except (OSError, ValueError, KeyError, AttributeError) as exc:
+            if os.path.exists(path):
+                _logger.warning(f"Ignoring unreadable validation state {path}: {exc}")
+        return ret
+
+    def save(self, path):
+        """Writes the state to a file, atomically"""
+        from property_rosetta import __version__
+        state = json.dumps({'version': STATE_VERSION,
+                            'property_rosetta': __version__,
+                            'results': self.results,
+                            'fingerprints': self.fingerprints})
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(state)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+class Validator(object):
+    def __init__(self, rules: List[Rule] = None, workers: int = None):
+        """Runs validation rules over dictionaries
+
+        Parameters
+        ----------
+        rules : list, optional
+            The rules to run, defaults to DEFAULT_RULES.
+        workers : int, optional
+            When greater than one, entities are checked by this many
+            threads. Rules written in Python hold the GIL, so this only
+            speeds up rules that release it, such as rules calling into
+            native code or doing I/O.
+        """
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.workers = workers
+
+    def _check_entities(self, dictionary, entities) -> List[ValidationIssue]:
+        issues = []
+        for entity in entities:
+            for rule in self.rules:
+                issues += rule.check_entity(dictionary, entity)
+        return issues
+
+    def _recheck_entities(self, dictionary, entities, state: ValidationState):
+        """Checks entities reusing the still current results held by state
+
+        Returns
+        -------
+        tuple
+            The issues and the new state results of the entities.
+        """
+        issues = []
+        results = {}
+        for key, entity in entities:
+            entity_fingerprint = entity.fingerprint
+            for rule in self.rules:
+                rule_key = f'{rule.name}:{key}'
+                result = state.results.get(rule_key, None)
+                if result is not None and result['entity'] == entity_fingerprint and \
+                        state._current(dictionary, result['dependencies']):
+                    found = [ValidationIssue(*i) for i in result['issues']]
+                else:
+                    recorder = _RecordingDictionary(dictionary)
+                    found = rule.check_entity(recorder, entity)
+                    result = {'entity': entity_fingerprint,
+                              'dependencies': recorder.dependencies,
+                              'issues': found}
+                results[rule_key] = result
+                issues += found
+        return issues, results
+
+    def _recheck_dictionary(self, dictionary, state: ValidationState):
+        dictionary_fingerprint = dictionary.fingerprint
+        issues = []
+        results = {}
+        for rule in self.rules:
+            result = state.results.get(rule.name, None)
+            if result is not None and result['dictionary'] == dictionary_fingerprint:
+                found = [ValidationIssue(*i) for i in result['issues']]
+            else:
+                found = rule.check_dictionary(dictionary)
+                result = {'dictionary': dictionary_fingerprint, 'issues': found}
+            results[rule.name] = result
+            issues += found
+        return issues, results
+
+    def _map_entities(self, check, entities) -> List:
+        if not self.workers or self.workers <= 1 or len(entities) <= 1:
+            return [check(entities)]
+        # a few chunks per worker keep the pool busy without paying
+        # for one task per entity
+        size = max(1, len(entities) // (self.workers * 4))
+        chunks = [entities[i:i + size] for i in range(0, len(entities), size)]
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            return list(pool.map(check, chunks))
+
+    def validate(self, dictionary, state: ValidationState = None) -> List[ValidationIssue]:
+        """Returns all the issues found in a dictionary
+
+        Parameters
+        ----------
+        dictionary
+            The dictionary to validate.
+        state : ValidationState, optional
+            Results of a previous validation. Only the rules whose inputs
+            changed since are evaluated again, and state is updated with the
+            results of this validation.
+        """
+        if state is None:
+            issues = []
+            for rule in self.rules:
+                issues += rule.check_dictionary(dictionary)
+            for chunk_issues in self._map_entities(
+                    lambda chunk: self._check_entities(dictionary, chunk),
+                    list(dictionary.entities)):
+                issues += chunk_issues
+            _logger.debug(f"Validation found {len(issues)} issues")
+            return issues
+
+        fingerprints = {}
+        state.restored = 0
+        state._restore(dictionary, 'data type', dictionary.data_types or [], fingerprints)
+        state._restore(dictionary, 'enumeration', dictionary.enumerations, fingerprints)
+        # entities sharing an id are told apart by their occurrence
+        entities = state._restore(dictionary, 'entity', dictionary.entities, fingerprints)
+        # fingerprint up front, the workers then only read the cached ones
+        for _, entity in entities:
+            entity.fingerprint
+        issues, results = self._recheck_dictionary(dictionary, state)
+        for chunk_issues, chunk_results in self._map_entities(
+                lambda chunk: self._recheck_entities(dictionary, chunk, state), entities):
+            issues += chunk_issues
+            results.update(chunk_results)
+        evaluated = sum(1 for key, result in results.items()
+                        if state.results.get(key, None) is not result)
+        state.evaluated = evaluated
+        state.reused = len(results) - evaluated
+        state.results = results
+        state.fingerprints = fingerprints
+        _logger.debug(f"Validation found {len(issues)} issues, "
+                      f"evaluated {state.evaluated} and reused {state.reused} rule results, "
+                      f"restored {state.restored} fingerprints")
+        return issues
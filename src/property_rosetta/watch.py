@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Keeping a dictionary loaded and validated while its files change
+
+A :class:`DictionaryWatcher` holds the last loaded dictionary along with the
+parsed yaml documents and validation results it came from. When files of
+the dictionary tree change, only those files are parsed again and only the
+rules affected by the change are evaluated again.
+
+Changes are noticed through the watchdog package when it is installed, and
+by periodically comparing the size and modification time of the yaml files
+otherwise.
+
+The results can also be served on a local socket, see :func:`serve`. Each
+request is a line holding a JSON object with a command, either
+``validate`` or ``reload``, answered with a line holding the JSON result::
+
+    $ echo '{"command": "validate"}' | socat - UNIX-CONNECT:/tmp/rosetta.sock
+"""
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from property_rosetta.cache import MemoryParseCache
+from property_rosetta.dictionary import Dictionary, DictionaryError
+from property_rosetta.validation import ValidationState, Validator
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+
+class _PollingMonitor(object):
+    def __init__(self, directory, interval: float):
+        """Notices changes by comparing the stat of the yaml files of a tree"""
+        self._directory = Path(directory)
+        self._interval = interval
+        self._seen = self._scan()
+
+    def _scan(self) -> dict:
+        files = {}
+        for path in self._directory.rglob('*.yaml'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files[str(path)] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    def mark(self):
+        """Takes the current state of the tree as the unchanged one"""
+        self._seen = self._scan()
+
+    def changed(self) -> bool:
+        return self._scan() != self._seen
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits for a change, returns whether there was one"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.changed():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self._interval)
+        return True
+
+    def close(self):
+        pass
+
+
+# watchdog event types that change the contents of the tree, unlike opening or closing files
+_CHANGES = ('created', 'modified', 'deleted', 'moved')
+
+
+def _is_yaml_change(event, directory: Path) -> bool:
+    """Whether a watchdog event changed a yaml file of the tree under directory"""
+    if event.event_type not in _CHANGES:
+        return False
+    # a file moved over a yaml file, as editors saving atomically do, changes the destination
+    for path in (event.src_path, getattr(event, 'dest_path', None)):
+        if path:
+            path = Path(os.fsdecode(path))
+            if path.suffix == '.yaml' and directory in path.parents:
+                return True
+    return False
+
+
+class _WatchdogMonitor(object):
+    def __init__(self, directory):
+        """Notices changes through filesystem notifications"""
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        directory = Path(directory).resolve()
+        changed = self._changed = threading.Event()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if _is_yaml_change(event, directory):
+                    changed.set()
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(directory), recursive=True)
+        self._observer.start()
+
+    def mark(self):
+        self._changed.clear()
+
+    def changed(self) -> bool:
+        return self._changed.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._changed.wait(timeout)
+
+    def close(self):
+        self._observer.stop()
+        self._observer.join()
+
+
+def _monitor(directory, polling: bool, interval: float):
+    if not polling:
+        try:
+            return _WatchdogMonitor(directory)
+        except ImportError:
+            _logger.info("watchdog is not installed, polling for changes")
+        except OSError as exc:
+            _logger.warning(f"Cannot watch {directory}, polling for changes: {exc}")
+    return _PollingMonitor(directory, interval)
+
+
+class DictionaryWatcher(object):
+    def __init__(self, path, workers: int = None, backend: str = None, rules=None,
+                 polling: bool = False, interval: float = 0.5):
+        """Keeps a dictionary and its validation results up to date
+
+        The dictionary is loaded and validated on the first call to
+        :meth:`refresh` or :meth:`current`. Methods are thread safe.
+
+        Parameters
+        ----------
+        path
+            Path to the dictionary yaml file.
+        workers : int, optional
+            Number of workers used to parse files and to validate entities.
+        backend : str, optional
+            The yaml backend to parse files with.
+        rules : list, optional
+            The validation rules, defaults to
+            property_rosetta.validation.DEFAULT_RULES.
+        polling : bool
+            Poll for changes even if watchdog is installed.
+        interval : float
+            Seconds between two polls.
+
+        Attributes
+        ----------
+        dictionary : Dictionary
+            The last dictionary loaded successfully, None until then.
+        generation : int
+            Number of times the dictionary was reloaded.
+        """
+        self.path = Path(path)
+        self.workers = workers
+        self.backend = backend
+        self.dictionary = None
+        self.generation = 0
+        self._validator = Validator(rules, workers)
+        self._cache = MemoryParseCache()
+        self._state = ValidationState()
+        self._lock = threading.RLock()
+        self._result = None
+        self._monitor = _monitor(self.path.parent, polling, interval)
+
+    def refresh(self) -> dict:
+        """Reloads and validates the dictionary
+
+        Returns
+        -------
+        dict
+            The generation, the error preventing the dictionary from loading
+            or None, the number of errors and the list of issues as
+            dictionaries.
+        """
+        with self._lock:
+            # changes made while loading trigger another refresh
+            self._monitor.mark()
+            self.generation += 1
+            start = time.perf_counter()
+            misses = self._cache.misses
+            try:
+                dictionary = Dictionary.from_yaml_dictionary(
+                    self.path, workers=self.workers, backend=self.backend, cache=self._cache)
+                issues = self._validator.validate(dictionary, self._state)
+            except (DictionaryError, ValueError, OSError) as e:
+                _logger.debug(f"Reloading {self.path} failed: {e}")
+                self._result = {'generation': self.generation, 'error': str(e),
+                                'errors': 1, 'issues': []}
+                return self._result
+            self.dictionary = dictionary
+            self._result = {
+                'generation': self.generation,
+                'error': None,
+                'errors': sum(1 for i in issues if i.is_error),
+                'issues': [i._asdict() for i in issues],
+            }
+            _logger.debug(f"Reloaded {self.path} in {time.perf_counter() - start:.3f}s, "
+                          f"parsed {self._cache.misses - misses} files, evaluated "
+                          f"{self._state.evaluated} rule results")
+            return self._result
+
+    def current(self) -> dict:
+        """Returns the validation results, refreshing them if files changed"""
+        with self._lock:
+            if self._result is None or self._monitor.changed():
+                return self.refresh()
+            return self._result
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits for files to change, returns whether they did"""
+        return self._monitor.wait(timeout)
+
+    def close(self):
+        """Stops watching for changes"""
+        self._monitor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                command = request.get('command', 'validate')
+                if command == 'validate':
+                    response = self.server.watcher.current()
+                elif command == 'reload':
+                    response = self.server.watcher.refresh()
+                else:
+                    response = {'error': f'Unknown command {command}'}
+            except (ValueError, AttributeError) as e:
+                response = {'error': f'Invalid request: {e}'}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+def serve(watcher: DictionaryWatcher, path):
+    """Starts answering requests on a local socket in a background thread
+
+    Parameters
+    ----------
+    watcher : DictionaryWatcher
+        The watcher whose results are served.
+    path
+        Path of the unix domain socket to create.
+
+    Returns
+    -------
+    socketserver.BaseServer
+        The server, stop it with its shutdown and server_close methods.
+
+    Raises
+    ------
+    OSError
+        If the socket cannot be created, or local sockets are not supported
+        on this platform.
+    """
+    if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        raise OSError('Local sockets are not supported on this platform')
+    path = str(path)
+    if os.path.exists(path):
+        # a socket left behind by a server that did not shut down
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError(f'Another server is listening on {path}')
+        finally:
+            probe.close()
+    server = socketserver.ThreadingUnixStreamServer(path, _RequestHandler)
+    server.daemon_threads = True
+    server.watcher = watcher
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _logger.info(f"Serving validation results on {path}")
+    return server
+
+
+def request(path, command: str = 'validate', timeout: float = None) -> dict:
+    """Sends a command to a server started by :func:`serve`, returns its answer"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(path))
+        with s.makefile('rwb') as f:
+            f.write(json.dumps({'command': command}).encode('utf-8') + b'\n')
+            f.flush()
+            return json.loads(f.readline())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Yaml parsing backends
+
+All dictionary files are parsed through this module. The libyaml based
+``CSafeLoader`` is used when PyYAML was built with it, the pure python
+``SafeLoader`` otherwise. A backend can also be selected explicitly, either
+process wide with :func:`set_backend` or for a single call.
+
+PyYAML is only imported when a backend is first needed. ``YAMLError`` is
+available from this module as an alias of ``yaml.YAMLError``, so that code
+catching parse errors does not need to import yaml up front.
+"""
+import logging
+import os
+from typing import List
+
+from property_rosetta import instrumentation
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+_logger = logging.getLogger(__name__)
+
+LIBYAML = 'libyaml'
+PYTHON = 'python'
+
+_LOADERS = None
+_STREAMING_LOADERS = None
+
+_selected_backend = None
+
+
+def __getattr__(name):
+    if name == 'YAMLError':
+        import yaml
+        return yaml.YAMLError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _loaders() -> dict:
+    global _LOADERS
+    if _LOADERS is None:
+        import yaml
+        loaders = {PYTHON: yaml.SafeLoader}
+        if getattr(yaml, '__with_libyaml__', False):
+            loaders[LIBYAML] = yaml.CSafeLoader
+        _LOADERS = loaders
+    return _LOADERS
+
+
+def _streaming_loaders() -> dict:
+    global _STREAMING_LOADERS
+    if _STREAMING_LOADERS is None:
+        import yaml
+        loaders = {PYTHON: yaml.SafeLoader}
+        if getattr(yaml, '__with_libyaml__', False):
+            # the libyaml parser only composes whole documents, node by node
+            # composition is done in python on top of its events
+            class CStreamingLoader(yaml.cyaml.CParser, yaml.composer.Composer,
+                                   yaml.constructor.SafeConstructor, yaml.resolver.Resolver):
+                def __init__(self, stream):
+                    yaml.cyaml.CParser.__init__(self, stream)
+                    yaml.composer.Composer.__init__(self)
+                    yaml.constructor.SafeConstructor.__init__(self)
+                    yaml.resolver.Resolver.__init__(self)
+
+            loaders[LIBYAML] = CStreamingLoader
+        _STREAMING_LOADERS = loaders
+    return _STREAMING_LOADERS
+
+
+def available_backends() -> List[str]:
+    """Returns the names of the backends usable in this interpreter, fastest first"""
+    return [b for b in (LIBYAML, PYTHON) if b in _loaders()]
+
+
+def _check_backend(backend: str) -> str:
+    if backend not in (LIBYAML, PYTHON):
+        raise ValueError(f'Unknown yaml backend {backend}')
+    if backend not in _loaders():
+        raise ValueError(
+            f'Yaml backend {backend} is not available, PyYAML was built without libyaml')
+    return backend
+
+
+def set_backend(backend: str = None):
+    """Selects the backend used when none is given explicitly
+
+    Parameters
+    ----------
+    backend : str, optional
+        Either 'libyaml' or 'python'. None restores automatic selection.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown or not available.
+    """
+    global _selected_backend
+    _selected_backend = _check_backend(backend) if backend else None
+
+
+def get_backend(backend: str = None) -> str:
+    """Returns the name of the backend that a load would use
+
+    Parameters
+    ----------
+    backend : str, optional
+        An explicitly requested backend, validated and returned as is.
+    """
+    if backend:
+        return _check_backend(backend)
+    return _selected_backend or available_backends()[0]
+
+
+def loader(backend: str = None):
+    """Returns the yaml Loader class for a backend"""
+    return _loaders()[get_backend(backend)]
+
+
+def load(stream, backend: str = None):
+    """Parses a single yaml document from a string, bytes or file object
+
+    Raises
+    ------
+    yaml.YAMLError
+        If the document is invalid.
+    """
+    import yaml
+    with instrumentation.span(instrumentation.PARSE):
+        return yaml.load(stream, Loader=loader(backend))
+
+
+def load_file(path, backend: str = None):
+    """Reads and parses a single yaml document from a file
+
+    Raises
+    ------
+    OSError
+        If the file cannot be read.
+    yaml.YAMLError
+        If the document is invalid.
+    """
+    with instrumentation.span(instrumentation.IO):
+        with open(path, 'rb') as f:
+            data = f.read()
+    instrumentation.count(instrumentation.FILES)
+    instrumentation.count(instrumentation.BYTES, len(data))
+    return load(data, backend)
+
+
+def iter_items(stream, backend: str = None):
+    """Parses a yaml document holding a list, yielding its items one at a time
+
+    The parser events are composed and constructed one list item at a time,
+    so that only the current item is held in memory. An empty document
+    yields nothing.
+
+    Raises
+    ------
+    yaml.YAMLError
+        If the document is invalid, is not a list or is followed by another
+        document.
+    """
+    import yaml
+    parser = _streaming_loaders()[get_backend(backend)](stream)
+    try:
+        parser.get_event()
+        if parser.check_event(yaml.StreamEndEvent):
+            return
+        parser.get_event()
+        if parser.check_event(yaml.SequenceStartEvent):
+            parser.get_event()
+            while not parser.check_event(yaml.SequenceEndEvent):
+                with instrumentation.span(instrumentation.PARSE):
+                    item = parser.construct_document(parser.compose_node(None, None))
+                yield item
+            parser.get_event()
+        else:
+            document = parser.construct_document(parser.compose_node(None, None))
+            if document is not None:
+                raise yaml.composer.ComposerError(
+                    None, None, "expected a list of items", parser.peek_event().start_mark)
+        parser.get_event()
+        if not parser.check_event(yaml.StreamEndEvent):
+            raise yaml.composer.ComposerError(
+                "expected a single document in the stream", None,
+                "but found another document", parser.get_event().start_mark)
+    finally:
+        parser.dispose()
+
+
+def list_items(document) -> list:
+    """Returns the items of a parsed yaml document holding a list
+
+    This checks a document parsed whole the way :func:`iter_items` checks a
+    streamed one: an empty document holds no items.
+
+    Raises
+    ------
+    yaml.YAMLError
+        If the document is not a list.
+    """
+    import yaml
+    if document is None:
+        return []
+    if not isinstance(document, list):
+        raise yaml.composer.ComposerError(
+            None, None, f"expected a list of items, found {type(document).__name__}", None)
+    return document
+
+
+def iter_file_items(path, backend: str = None):
+    """Reads a yaml file holding a list, yielding its items one at a time
+
+    The file is read while its items are parsed, the time spent reading it is
+    instrumented as parsing.
+
+    Raises
+    ------
+    OSError
+        If the file cannot be read.
+    yaml.YAMLError
+        If the document is invalid or is not a list.
+    """
+    with open(path, 'rb') as f:
+        instrumentation.count(instrumentation.FILES)
+        instrumentation.count(instrumentation.BYTES, os.fstat(f.fileno()).st_size)
+        yield from iter_items(f, backend)
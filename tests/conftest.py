@@ -1,10 +1,42 @@
 # -*- coding: utf-8 -*-
 """
-    Dummy conftest.py for property_rosetta.
+    Fixtures shared by the tests of property_rosetta.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     https://pytest.org/latest/plugins.html
 """
 
-# import pytest
+import os
+import pytest
+import shutil
+import time
+from pathlib import Path
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+TEST_FILES_PATH = Path(__file__).parent / 'data'
+
+
+@pytest.fixture
+def copy_dictionary(tmp_path):
+    """Returns a function copying a dictionary tree of tests/data into tmp_path
+
+    The function takes the path of the tree relative to tests/data and
+    returns the path to the dictionary yaml file of the copy. Copied files
+    are aged, so that caches can trust their stat.
+    """
+    def copy(source: str) -> Path:
+        shutil.copytree(TEST_FILES_PATH/source, tmp_path/'dictionary')
+        old = time.time() - 60
+        for f in (tmp_path/'dictionary').rglob('*.yaml'):
+            os.utime(f, (old, old))
+        return tmp_path/'dictionary'/'dictionary.yaml'
+    return copy
+
+
+@pytest.fixture
+def dictionary_path(copy_dictionary):
+    """A copy of tests/data/dictionary_loading/dictionary_ok"""
+    return copy_dictionary('dictionary_loading/dictionary_ok')
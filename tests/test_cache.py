@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pytest
+import time
+from property_rosetta.cache import ParseCache
+from property_rosetta.dictionary import Dictionary, DictionaryLoadingError
+from property_rosetta.validate import main
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_cache_reparses_only_changed_files(dictionary_path, tmp_path, workers):
+    cache = ParseCache(tmp_path/'cache')
+    expected = Dictionary.from_yaml_dictionary(dictionary_path)
+    Dictionary.from_yaml_dictionary(
+        dictionary_path, workers=workers, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 6)
+
+    cache = ParseCache(tmp_path/'cache')
+    result = Dictionary.from_yaml_dictionary(
+        dictionary_path, workers=workers, cache=cache)
+    assert (cache.hits, cache.misses) == (6, 0)
+    assert [p.id for p in result.entities[0].properties] == \
+        [p.id for p in expected.entities[0].properties]
+    assert result.data_types[1].attributes == {'boolean_attribute': 'cool'}
+
+    properties = dictionary_path.parent/'properties-by-entity'/'ok.yaml'
+    properties.write_text(properties.read_text().replace('void', 'abyss'))
+    cache = ParseCache(tmp_path/'cache')
+    result = Dictionary.from_yaml_dictionary(
+        dictionary_path, workers=workers, cache=cache)
+    assert (cache.hits, cache.misses) == (5, 1)
+    assert result.entities[0].property_by_id(
+        'ok.index').name == 'an index into the abyss'
+
+
+def test_cache_does_not_hide_errors(dictionary_path, tmp_path):
+    cache = ParseCache(tmp_path/'cache')
+    Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    (dictionary_path.parent/'properties-by-entity'/'ok.yaml').write_text('- [')
+    with pytest.raises(DictionaryLoadingError):
+        Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    (dictionary_path.parent/'properties-by-entity'/'ok.yaml').unlink()
+    with pytest.raises(DictionaryLoadingError):
+        Dictionary.from_yaml_dictionary(
+            dictionary_path, workers=2, cache=cache)
+
+
+def test_cache_eviction(dictionary_path, tmp_path):
+    cache = ParseCache(tmp_path/'cache', max_bytes=400)
+    Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    assert cache.evictions > 0
+    assert sum(f.stat().st_size for f in (tmp_path/'cache'/'objects').iterdir()) <= 400
+    cache.clear()
+    assert not list((tmp_path/'cache'/'objects').iterdir())
+
+
+def test_validation_with_cache(dictionary_path, tmp_path):
+    assert main(['--cache-dir', str(tmp_path/'cache'), str(dictionary_path)]) == 0
+    assert (tmp_path/'cache'/'index.json').exists()
+    assert main(['--cache-dir', str(tmp_path/'other'), '--no-cache',
+                 str(dictionary_path)]) == 0
+    assert not (tmp_path/'other').exists()
+
+
+def test_cache_entries_are_plain_data(dictionary_path, tmp_path):
+    cache = ParseCache(tmp_path/'cache')
+    Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    entries = list((tmp_path/'cache'/'objects').iterdir())
+    assert entries and all(e.suffix == '.marshal' for e in entries)
+    assert not any(e.read_bytes().startswith(b'\x80') for e in entries)
+    # timestamps cannot be marshalled, their files are parsed every time
+    dated = tmp_path/'dated.yaml'
+    dated.write_text('released: 2020-01-02\n')
+    os.utime(dated, (time.time() - 60, time.time() - 60))
+    for _ in range(2):
+        assert str(ParseCache(tmp_path/'cache').read(dated)['released']) == '2020-01-02'
+    assert len(list((tmp_path/'cache'/'objects').iterdir())) == len(entries)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import pytest
+from property_rosetta.dictionary import DictionaryEnumeration
+
+np = pytest.importorskip('numpy')
+codec_module = pytest.importorskip('property_rosetta.codec')
+EnumerationCodecError = codec_module.EnumerationCodecError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def make_enumeration(values):
+    return DictionaryEnumeration.from_dict(None, {
+        'id': 'colour', 'name': 'Colour',
+        'values': [{'id': id, 'integral_value': integral, 'deprecated': deprecated}
+                   for id, integral, deprecated in values]})
+
+
+DENSE = [('red', 1), ('green', 2), ('blue', 3), ('mauve', 4)]
+SPARSE = [('red', -5), ('green', 10 ** 12), ('blue', 7), ('mauve', 2 ** 40)]
+
+
+@pytest.mark.parametrize('values,dense', [(DENSE, True), (SPARSE, False)])
+@pytest.mark.parametrize('dtype', [str, object, 'S'])
+def test_round_trip(values, dense, dtype):
+    enumeration = make_enumeration([(i, v, i == 'mauve') for i, v in values])
+    codec = enumeration.codec()
+    assert codec.is_dense == dense
+    ids = np.array([[i for i, _ in values] * 3, ['blue'] * 12], dtype=dtype)
+    integrals = codec.encode(ids)
+    assert integrals.dtype == np.int64 and integrals.shape == ids.shape
+    assert integrals.tolist() == [[v for _, v in values] * 3, [dict(values)['blue']] * 12]
+    assert codec.decode(integrals).tolist() == [[i for i, _ in values] * 3, ['blue'] * 12]
+    assert codec.encode([]).tolist() == [] and codec.decode(np.array([], int)).tolist() == []
+
+
+def test_codec_is_cached_until_reindex():
+    enumeration = make_enumeration([(i, v, False) for i, v in DENSE])
+    codec = enumeration.codec()
+    assert enumeration.codec() is codec
+    assert enumeration.codec(unknown='fill') is not codec
+    enumeration.values.pop()
+    enumeration.reindex()
+    assert enumeration.codec() is not codec
+    with pytest.raises(EnumerationCodecError):
+        enumeration.codec().encode(['mauve'])
+
+
+@pytest.mark.parametrize('values', [DENSE, SPARSE])
+def test_unknown_values(values):
+    enumeration = make_enumeration([(i, v, False) for i, v in values])
+    with pytest.raises(EnumerationCodecError, match="'purple'.*1 unknown"):
+        enumeration.codec().encode(['red', 'purple'])
+    with pytest.raises(EnumerationCodecError, match='999'):
+        enumeration.codec().decode([999])
+    codec = enumeration.codec(unknown='fill', fill_integral=0, fill_id='?')
+    assert codec.encode(['red', 'purple', 're', 'redd', '']).tolist() == [values[0][1], 0, 0, 0, 0]
+    assert codec.decode([999, values[1][1], -1]).tolist() == ['?', 'green', '?']
+    with pytest.raises(ValueError):
+        enumeration.codec(unknown='ignore')
+
+
+def test_long_ids_are_not_truncated():
+    enumeration = make_enumeration([('value10', 10, False), ('value1', 1, False)])
+    codec = enumeration.codec(unknown='fill')
+    assert codec.encode(np.array(['value1', 'value'])).tolist() == [1, -1]
+    assert codec.encode(np.array(['value10', 'value1'])).tolist() == [10, 1]
+
+
+def test_many_values_with_shared_hash_slots():
+    enumeration = make_enumeration([(f'v{i}', i * 3, False) for i in range(5000)])
+    codec = enumeration.codec()
+    picks = np.random.default_rng(0).integers(0, 5000, 20000)
+    ids = np.array([f'v{i}' for i in picks])
+    assert codec.encode(ids).tolist() == (picks * 3).tolist()
+    assert codec.decode(picks * 3).tolist() == ids.tolist()
+
+
+def test_deprecated_values(caplog):
+    enumeration = make_enumeration([('red', 1, False), ('brown', 2, True)])
+    ids = ['red', 'brown', 'brown']
+    assert enumeration.codec().encode(ids).tolist() == [1, 2, 2]
+    with caplog.at_level(logging.WARNING):
+        assert enumeration.codec(deprecated='warn').decode([2]).tolist() == ['brown']
+    assert 'Value 2 of enumeration colour is deprecated' in caplog.text
+    with pytest.raises(EnumerationCodecError, match='2 deprecated'):
+        enumeration.codec(deprecated='raise').encode(ids)
+    codec = enumeration.codec(deprecated='fill')
+    assert codec.encode(ids).tolist() == [1, -1, -1]
+    assert codec.decode([1, 2]).tolist() == ['red', None]
+
+
+def test_decoding_needs_integers():
+    with pytest.raises(EnumerationCodecError):
+        make_enumeration([('red', 1, False)]).codec().decode([1.0])
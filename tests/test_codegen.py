@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import pytest
+import shutil
+from pathlib import Path
+from property_rosetta.codegen import FILTERS, MANIFEST_NAME, GenerationError, Generator, \
+    generate
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.generate import main
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+TEMPLATES_PATH = Path(__file__).parent / 'data' / 'codegen' / 'templates'
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+
+EXPECTED_MODEL = '''class Ok(object):
+    """An Ok entity"""
+    # an index into the void: 32-bit signed int
+    ok_index = [('important', True)]
+    # Element Type: Element identifier (deprecated)
+    ok_element = []
+'''
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_generate(tmp_path, workers):
+    report = generate(OK_PATH, TEMPLATES_PATH, tmp_path / 'out', workers=workers,
+                      cache_dir=tmp_path / 'cache')
+    written = report.outputs
+    assert written == [tmp_path / 'out' / 'index.txt', tmp_path / 'out' / 'models' / 'ok.py']
+    assert report.written == written
+    assert (report.rendered, report.removed) == (2, [])
+    assert written[0].read_text() == 'ok.dictionary 0.0.1\nOk: 2 properties\n'
+    assert written[1].read_text() == EXPECTED_MODEL
+    assert list((tmp_path / 'cache').iterdir())
+
+
+def test_attributes_of_data_types_are_merged(tmp_path):
+    dictionary = Dictionary.from_yaml_dictionary(OK_PATH)
+    entity = dictionary.entity_by_id('ok')
+    entity.properties[0].type_id = 'bool'
+    (tmp_path / 'entity').mkdir()
+    (tmp_path / 'entity' / 'x.j2').write_text(
+        '{{ attributes_of(properties[0]) | dictsort }} {{ type_of(properties[1]).id }}')
+    assert Generator(tmp_path, cache=False).render_entity(entity) == [
+        ('x', "[('boolean_attribute', 'cool'), ('important', True)] elementid")]
+
+
+def test_case_conversions_are_memoized():
+    FILTERS['pascalize'].cache_clear()
+    dictionary = Dictionary.from_yaml_dictionary(OK_PATH)
+    generator = Generator(TEMPLATES_PATH, cache=False)
+    for _ in range(3):
+        generator.render_dictionary(dictionary)
+    info = FILTERS['pascalize'].cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_case_conversions_of_mappings_and_lists(tmp_path):
+    assert FILTERS['camelize']({'a_b': [{'c_d': 1}]}) == {'aB': [{'cD': 1}]}
+    (tmp_path / 'entity').mkdir()
+    (tmp_path / 'entity' / 'x.j2').write_text(
+        '{{ entity.attributes | camelize | dictsort }} {{ [{"a_b": 1}] | camelize }}')
+    entity = Dictionary.from_dict({
+        'id': 'adictionary', 'name': 'A dictionary', 'version': '1.0.0',
+        'entities': [{'id': 'item', 'name': 'Item', 'attributes': {'table_name': 'items'}}],
+    }).entity_by_id('item')
+    assert Generator(tmp_path, cache=False).render_entity(entity) == [
+        ('x', "[('tableName', 'items')] [{'aB': 1}]")]
+
+
+def test_template_errors(tmp_path):
+    with pytest.raises(GenerationError, match='does not exist'):
+        Generator(tmp_path / 'missing')
+    (tmp_path / 'dictionary').mkdir()
+    (tmp_path / 'dictionary' / 'broken.j2').write_text('{{ dictionary.nosuchfield }}')
+    with pytest.raises(GenerationError, match='broken.j2'):
+        generate(OK_PATH, tmp_path, tmp_path / 'out', cache=False)
+    (tmp_path / 'dictionary' / 'broken.j2').write_text('{% for %}')
+    with pytest.raises(GenerationError, match='broken.j2'):
+        generate(OK_PATH, tmp_path, tmp_path / 'out', cache=False)
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_outputs_must_not_collide(tmp_path, workers):
+    shutil.copytree(TEMPLATES_PATH, tmp_path / 'templates')
+    (tmp_path / 'templates' / 'entity' / 'models' / 'ok.py.j2').write_text('')
+    with pytest.raises(GenerationError, match='ok.py'):
+        generate(OK_PATH, tmp_path / 'templates', tmp_path / 'out', workers=workers,
+                 cache=False)
+    # the paths are checked before anything is rendered or written
+    assert not (tmp_path / 'out').exists()
+    generate(OK_PATH, TEMPLATES_PATH, tmp_path / 'out', cache=False)
+    before = {p: p.read_bytes() for p in (tmp_path / 'out').rglob('*') if p.is_file()}
+    (tmp_path / 'templates' / 'dictionary' / 'index.txt.j2').write_text('changed')
+    with pytest.raises(GenerationError, match='ok.py'):
+        generate(OK_PATH, tmp_path / 'templates', tmp_path / 'out', workers=workers,
+                 cache=False)
+    assert {p: p.read_bytes() for p in (tmp_path / 'out').rglob('*') if p.is_file()} == before
+
+
+@pytest.mark.parametrize('name', ["{{ '..' }}/escaped.txt", "sub/{{ '..' }}/{{ '..' }}/x.txt",
+                                  "{{ '' }}/escaped.txt", "{{ '.' }}"])
+def test_outputs_stay_in_the_output_directory(tmp_path, name):
+    # template names cannot hold slashes or be absolute, but they render to names that can
+    template = tmp_path / 'templates' / 'dictionary' / (name + '.j2')
+    template.parent.mkdir(parents=True)
+    template.write_text('escaped')
+    with pytest.raises(GenerationError, match='outside of'):
+        generate(OK_PATH, tmp_path / 'templates', tmp_path / 'out' / 'sub', cache=False)
+    assert not (tmp_path / 'out').exists()
+
+
+def test_stale_outputs_are_removed_from_the_output_directory_only(tmp_path):
+    generate(OK_PATH, TEMPLATES_PATH, tmp_path / 'out', cache=False)
+    manifest = json.loads((tmp_path / 'out' / MANIFEST_NAME).read_text())
+    victim = tmp_path / 'victim.txt'
+    victim.write_text('keep me')
+    entry = dict(manifest['outputs']['dictionary/index.txt.j2'], path='../victim.txt',
+                 content=hashlib.sha256(b'keep me').hexdigest())
+    manifest['outputs']['gone.j2'] = entry
+    (tmp_path / 'out' / MANIFEST_NAME).write_text(json.dumps(manifest))
+    assert generate(OK_PATH, TEMPLATES_PATH, tmp_path / 'out', cache=False).removed == []
+    assert victim.read_text() == 'keep me'
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_only_stale_outputs_are_generated(tmp_path, workers):
+    dictionary = tmp_path / 'dictionary'
+    shutil.copytree(OK_PATH.parent, dictionary)
+    shutil.copytree(TEMPLATES_PATH, tmp_path / 'templates')
+    out = tmp_path / 'out'
+
+    def run(**kwargs):
+        return generate(dictionary / 'dictionary.yaml', tmp_path / 'templates', out,
+                        workers=workers, cache=False, **kwargs)
+    run()
+    report = run()
+    assert (report.rendered, report.written, report.removed) == (0, [], [])
+    assert len(report.outputs) == 2
+    # the entity output changes, the dictionary one is rendered again to the same text
+    properties = dictionary / 'properties-by-entity' / 'ok.yaml'
+    properties.write_text(properties.read_text().replace(
+        'an index into the void', 'an index'))
+    report = run()
+    assert (report.rendered, report.written) == (2, [out / 'models' / 'ok.py'])
+    assert '# an index: ' in (out / 'models' / 'ok.py').read_text()
+    # outputs modified or deleted since are written again
+    (out / 'index.txt').unlink()
+    report = run()
+    assert (report.rendered, report.written) == (1, [out / 'index.txt'])
+    # templates are part of the inputs
+    template = tmp_path / 'templates' / 'entity' / 'models' / '{{ entity.id | identifier }}.py.j2'
+    template.write_text('# generated\n' + template.read_text())
+    report = run()
+    assert (report.rendered, report.written) == (1, [out / 'models' / 'ok.py'])
+    assert run(force=True).rendered == 2
+    # outputs that are not generated any more are removed
+    template.rename(template.with_name('{{ entity.id | identifier }}.pyi.j2'))
+    report = run()
+    assert report.removed == [out / 'models' / 'ok.py']
+    assert report.written == [out / 'models' / 'ok.pyi']
+    assert not (out / 'models' / 'ok.py').exists()
+    assert (out / MANIFEST_NAME).exists()
+
+
+def test_unreadable_manifests_are_ignored(tmp_path, caplog):
+    generate(OK_PATH, TEMPLATES_PATH, tmp_path, cache=False)
+    (tmp_path / MANIFEST_NAME).write_text('{')
+    assert generate(OK_PATH, TEMPLATES_PATH, tmp_path, cache=False).written == []
+    assert 'Ignoring unreadable code generation manifest' in caplog.text
+
+
+def test_main(tmp_path):
+    assert main([str(OK_PATH), '-t', str(TEMPLATES_PATH), '-o', str(tmp_path), '--no-cache']) == 0
+    assert main([str(OK_PATH), '-t', str(TEMPLATES_PATH), '-o', str(tmp_path), '--no-cache',
+                 '--force']) == 0
+    assert (tmp_path / 'models' / 'ok.py').read_text() == EXPECTED_MODEL
+    assert main([str(OK_PATH), '-t', str(tmp_path / 'missing'), '-o', str(tmp_path)]) == 1
@@ -3,9 +3,11 @@
 import pytest
 import os
 from pathlib import Path
+from property_rosetta.cache import ParseCache
 from property_rosetta.dictionary import DictionaryLoadingError, DictionaryValidationError, \
     DictionaryEnumerationValue, DictionaryEnumeration, \
-    DictionaryDataType, DictionaryProperty, DictionaryEntity, Dictionary
+    DictionaryDataType, DictionaryProperty, DictionaryEntity, Dictionary, Interner, \
+    iter_properties
 
 
 TEST_FILES_PATH = Path(__file__).parent / 'data' / 'dictionary_loading'
@@ -249,3 +251,252 @@ def test_dictionary_loading_raises_errors():
     with pytest.raises(DictionaryValidationError):
         Dictionary.from_yaml_dictionary(
             TEST_FILES_PATH/'dictionary_bad_version.yaml')
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_dictionary_loading_from_yaml_parallel(executor):
+    path = TEST_FILES_PATH/'dictionary_ok'/'dictionary.yaml'
+    expected = Dictionary.from_yaml_dictionary(path)
+    result = Dictionary.from_yaml_dictionary(
+        path, workers=4, executor=executor)
+    assert result.id == expected.id
+    assert [t.id for t in result.data_types] == [
+        t.id for t in expected.data_types]
+    assert result.data_types[1].attributes == expected.data_types[1].attributes
+    assert 'boolean_attribute' in result.data_types[1].attributes
+    assert [e.id for e in result.entities] == [e.id for e in expected.entities]
+    assert [p.id for p in result.entities[0].properties] == [
+        p.id for p in expected.entities[0].properties]
+    assert result.entities[0].property_by_id('ok.index').entity.id == 'ok'
+
+
+@pytest.mark.parametrize('workers', [None, 2, 8])
+def test_dictionary_loading_parallel_errors_are_deterministic(workers):
+    path = TEST_FILES_PATH/'dictionary_missing_properties'/'dictionary.yaml'
+    for _ in range(5):
+        with pytest.raises(DictionaryLoadingError) as excinfo:
+            Dictionary.from_yaml_dictionary(path, workers=workers)
+        assert excinfo.value.message.endswith('first.missing.yaml')
+
+
+def test_dictionary_loading_parallel_unknown_executor():
+    with pytest.raises(ValueError):
+        Dictionary.from_yaml_dictionary(
+            TEST_FILES_PATH/'dictionary_ok'/'dictionary.yaml',
+            workers=2, executor='fibers')
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'lazy', 'workers', 'cache'])
+def test_dictionary_loading_checks_list_files_in_every_mode(dictionary_path, tmp_path, mode):
+    def load():
+        if mode == 'cache':
+            return Dictionary.from_yaml_dictionary(
+                dictionary_path, cache=ParseCache(tmp_path/'cache'))
+        return Dictionary.from_yaml_dictionary(
+            dictionary_path, workers=2 if mode == 'workers' else None, lazy=mode == 'lazy')
+    properties = dictionary_path.parent/'properties-by-entity'/'ok.yaml'
+    properties.write_text('')
+    assert load().entities[0].properties == []
+    properties.write_text('id: ok.index\nname: Index\n')
+    with pytest.raises(DictionaryLoadingError) as excinfo:
+        load().entities[0].properties
+    assert excinfo.value.message.endswith('ok.yaml')
+    assert 'expected a list of items' in str(excinfo.value.exc)
+
+
+def test_dictionary_indexes_from_yaml():
+    result = Dictionary.from_yaml_dictionary(
+        TEST_FILES_PATH/'dictionary_ok'/'dictionary.yaml')
+    assert result.type_by_id('bool') is result.data_types[1]
+    assert result.type_by_id('nonexistent') is None
+    assert result.entity_by_id('ok') is result.entities[0]
+    assert result.entity_by_id('nonexistent') is None
+    prop = result.property_by_id('ok.index')
+    assert prop.entity.id == 'ok'
+    assert prop.dictionary_type.id == 'int32'
+    assert result.property_by_id('ok.element').dictionary_type.id == 'elementid'
+    assert result.property_by_id('nonexistent') is None
+    enumeration = result.enumeration_by_id('enum.entity.foo')
+    assert enumeration is result.enumerations[0]
+    assert enumeration.value_for_integral(5).id == 'baz'
+    assert enumeration.value_for_id('baz').integral_value == 5
+    with pytest.raises(KeyError):
+        enumeration.value_for_integral(2)
+    assert result.enumeration_by_id('nonexistent') is None
+
+
+def test_dictionary_indexes_from_dict():
+    result = Dictionary.from_dict({
+        'id': 'adictionary',
+        'name': 'adictionary of sorts',
+        'version': '1.0.0',
+        'data_types': [{'id': 'int64', 'name': 'a 64 bit integer'}],
+        'enumerations': [{
+            'id': 'anenum',
+            'name': 'anenum of sorts',
+            'values': [{'id': 'a', 'integral_value': 1}],
+        }],
+        'entities': [{
+            'id': 'anentity',
+            'name': 'anentity of sorts',
+            'properties': [{'id': 'aproperty', 'name': 'aproperty of sorts', 'type': 'int64'}],
+        }],
+    })
+    prop = result.property_by_id('aproperty')
+    assert prop.name == result.entity_by_id(
+        'anentity').property_by_id('aproperty').name
+    assert prop.entity.id == 'anentity'
+    assert prop.dictionary.id == 'adictionary'
+    assert prop.dictionary_type is result.type_by_id('int64')
+    assert result.enumeration_by_id('anenum').value_for_integral(1).id == 'a'
+    assert result.enumeration_by_id('anenum').dictionary.id == 'adictionary'
+
+    added = DictionaryEntity.from_dict(result, {
+        'id': 'another',
+        'name': 'another entity',
+        'properties': [{'id': 'another.property', 'name': 'another property', 'type': 'int64'}],
+    })
+    result.entities.append(added)
+    assert result.entity_by_id('another') is None
+    result.reindex()
+    assert result.entity_by_id('another') is added
+    assert result.property_by_id('another.property').entity.id == 'another'
+
+
+def test_dictionary_indexes_built_on_demand():
+    result = Dictionary()
+    result.entities = [DictionaryEntity.from_dict(None, {'id': 'anentity', 'name': 'anentity'})]
+    assert result.entity_by_id('anentity') is result.entities[0]
+    assert result.type_by_id('int64') is None
+
+
+def test_model_objects_have_no_instance_dict():
+    enumeration = DictionaryEnumeration(None)
+    entity = DictionaryEntity(None)
+    for o in [DictionaryEnumerationValue(enumeration), enumeration,
+              DictionaryDataType(None), DictionaryProperty(entity), entity]:
+        assert not hasattr(o, '__dict__')
+        with pytest.raises(AttributeError):
+            o.misspelled_attribute = True
+
+
+def test_interner_shares_identical_attribute_maps():
+    interner = Interner()
+    first = interner.attributes({'unit': 'm', 'range': [0, 1], 'nested': {'a': 1}})
+    second = interner.attributes({'unit': 'm', 'range': [0, 1], 'nested': {'a': 1}})
+    different = interner.attributes({'unit': 'm', 'range': [0, True], 'nested': {'a': 1}})
+    assert first is second
+    assert first is not different
+    assert first['range'] == (0, 1)
+    with pytest.raises(TypeError):
+        first['unit'] = 'km'
+    with pytest.raises(TypeError):
+        first['nested']['a'] = 2
+    assert interner.attributes({}) is interner.attributes({})
+    assert interner.attributes(None) is None
+    assert interner.stats()['attribute_maps'] == 3
+    assert interner.stats()['attribute_maps_deduplicated'] == 1
+
+
+def test_interner_unhashable_attribute_values_are_not_shared():
+    interner = Interner()
+    first = interner.attributes({'values': {1, 2}})
+    assert first == {'values': {1, 2}}
+    assert first is not interner.attributes({'values': {1, 2}})
+
+
+def test_dictionary_loading_shares_strings_and_attributes():
+    result = Dictionary.from_dict({
+        'id': 'adictionary',
+        'name': 'A dictionary',
+        'version': '1.0.0',
+        'entities': [{
+            'id': 'anentity',
+            'name': 'anentity',
+            'properties': [
+                {'id': 'anentity.' + name, 'name': name, 'type': ''.join(['int', '64']),
+                 'attributes': {'unit': 'm'}}
+                for name in ['first', 'second']],
+        }],
+    })
+    first, second = result.entities[0].properties
+    assert first.type_id is second.type_id
+    assert first.attributes is second.attributes
+    assert result.interning_stats['attribute_maps_deduplicated'] == 1
+    assert result.interning_stats['strings_deduplicated'] >= 1
+
+
+def test_dictionary_loading_from_yaml_reports_interning_stats():
+    result = Dictionary.from_yaml_dictionary(
+        TEST_FILES_PATH / 'dictionary_ok' / 'dictionary.yaml')
+    assert result.interning_stats['strings'] > 0
+    assert result.type_by_id('bool').attributes['boolean_attribute'] == 'cool'
+
+
+def test_iter_properties_streams():
+    properties = iter_properties(TEST_FILES_PATH/'properties_ok.yaml')
+    first = next(properties)
+    assert isinstance(first, DictionaryProperty)
+    assert first.id == 'foo.index'
+    assert [p.id for p in properties] == [
+        p.id for p in DictionaryProperty.from_yaml_property_list(
+            None, TEST_FILES_PATH/'properties_ok.yaml')][1:]
+    with pytest.raises(DictionaryLoadingError):
+        list(iter_properties(TEST_FILES_PATH/'nonexistent.yaml'))
+    with pytest.raises(DictionaryLoadingError):
+        list(iter_properties(TEST_FILES_PATH/'properties_no_type.yaml'))
+    with pytest.raises(DictionaryLoadingError):
+        list(iter_properties(TEST_FILES_PATH/'dictionary_no_id.yaml'))
+
+
+def test_lazy_loading_reads_properties_on_access():
+    result = Dictionary.from_yaml_dictionary(
+        TEST_FILES_PATH/'dictionary_missing_properties'/'dictionary.yaml', lazy=True)
+    ok, first, second = result.entities
+    assert not ok.properties_loaded
+    assert result.entity_by_id('ok') is ok
+    assert not ok.properties_loaded
+    assert ok.property_by_id('ok.index').entity.id == 'ok'
+    assert ok.properties_loaded
+    assert not first.properties_loaded
+    with pytest.raises(DictionaryLoadingError):
+        first.properties
+    with pytest.raises(DictionaryLoadingError):
+        result.preload()
+    assert not first.properties_loaded
+
+
+def test_lazy_dictionary_property_lookup():
+    path = Path(__file__).parent/'data'/'validation'/'dictionary_invalid'/'dictionary.yaml'
+    expected = Dictionary.from_yaml_dictionary(path)
+    result = Dictionary.from_yaml_dictionary(path, lazy=True)
+    assert result.property_by_id('first.unknown').entity.id == 'first'
+    assert [e.properties_loaded for e in result.entities] == [True, False, False]
+    assert result.property_by_id('nonexistent') is None
+    assert all(e.properties_loaded for e in result.entities)
+    lazy = Dictionary.from_yaml_dictionary(path, lazy=True)
+    lazy.preload(workers=2)
+    assert [p.id for e in lazy.entities for p in e.properties] == \
+        [p.id for e in expected.entities for p in e.properties]
+    assert lazy.property_by_id('first.old').type_id == 'oldint'
+    assert lazy.validate() == expected.validate()
+
+
+def test_lazy_loading_is_thread_safe():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from property_rosetta.dictionary import _read_yaml_file
+    reads = []
+
+    def reader(path):
+        if 'properties-by-entity' in str(path):
+            reads.append(path)
+            time.sleep(0.05)
+        return _read_yaml_file(path)
+
+    entities = DictionaryEntity.from_yaml_entity_list(
+        None, TEST_FILES_PATH/'dictionary_ok'/'entities.yaml', reader, lazy=True)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: entities[0].properties, range(8)))
+    assert len(reads) == 1
+    assert all(r is results[0] for r in results)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import json
+import pytest
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.compare import main
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.diff import ADDED, CHANGED, DEPRECATED, MAJOR, MINOR, PATCH, REMOVED, \
+    RESTORED, diff
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+
+BASE = {
+    'id': 'adictionary', 'name': 'A dictionary', 'version': '1.0.0',
+    'data_types': [{'id': 'int32', 'name': 'Integer', 'semantics': 'value'},
+                   {'id': 'string', 'name': 'String', 'semantics': 'value'}],
+    'enumerations': [{'id': 'colour', 'name': 'Colour', 'values': [
+        {'id': 'red', 'integral_value': 1}, {'id': 'blue', 'integral_value': 2}]}],
+    'entities': [
+        {'id': 'item', 'name': 'Item', 'properties': [
+            {'id': 'item.size', 'name': 'Size', 'type': 'int32'},
+            {'id': 'item.colour', 'name': 'Colour', 'type': 'colour'}]},
+        {'id': 'box', 'name': 'Box', 'properties': [
+            {'id': 'box.label', 'name': 'Label', 'type': 'string'}]}],
+}
+
+
+def changed(edit, version='1.0.0'):
+    d = copy.deepcopy(BASE)
+    edit(d)
+    d['version'] = version
+    return Dictionary.from_dict(d)
+
+
+def test_identical_dictionaries_have_no_changes():
+    result = diff(Dictionary.from_dict(BASE), Dictionary.from_dict(BASE))
+    assert result.changes == []
+    assert result.compatible and result.required_bump is None and result.version_is_sufficient
+
+
+@pytest.mark.parametrize('edit,expected', [
+    (lambda d: d['entities'][0]['properties'].pop(),
+     [(REMOVED, 'property', 'item.colour', MAJOR)]),
+    (lambda d: d['entities'][0]['properties'][0].update(type='string'),
+     [(CHANGED, 'property', 'item.size', MAJOR)]),
+    (lambda d: d['entities'][1]['properties'].append(
+        {'id': 'box.size', 'name': 'Size', 'type': 'int32'}),
+     [(ADDED, 'property', 'box.size', MINOR)]),
+    (lambda d: d['entities'][1]['properties'][0].update(deprecated=True),
+     [(DEPRECATED, 'property', 'box.label', MINOR)]),
+    (lambda d: d['entities'][1]['properties'][0].update(description='The label'),
+     [(CHANGED, 'property', 'box.label', PATCH)]),
+    (lambda d: d['entities'].pop(), [(REMOVED, 'entity', 'box', MAJOR)]),
+    (lambda d: d['entities'][0].update(attributes={'important': True}),
+     [(CHANGED, 'entity', 'item', PATCH)]),
+    (lambda d: d['data_types'][0].update(semantics='reference'),
+     [(CHANGED, 'data type', 'int32', MAJOR)]),
+    (lambda d: d['data_types'].append({'id': 'bool', 'name': 'Boolean'}),
+     [(ADDED, 'data type', 'bool', MINOR)]),
+    (lambda d: d['enumerations'][0]['values'][1].update(integral_value=3),
+     [(CHANGED, 'enumeration value', 'colour.blue', MAJOR)]),
+    (lambda d: d['enumerations'][0]['values'].pop(0),
+     [(REMOVED, 'enumeration value', 'colour.red', MAJOR)]),
+    (lambda d: d['enumerations'][0]['values'].append({'id': 'green', 'integral_value': 3}),
+     [(ADDED, 'enumeration value', 'colour.green', MINOR)]),
+    (lambda d: d['enumerations'][0]['values'][0].update(deprecated=True),
+     [(DEPRECATED, 'enumeration value', 'colour.red', MINOR)]),
+    (lambda d: d.update(name='Renamed'), [(CHANGED, 'dictionary', 'adictionary', PATCH)]),
+])
+def test_changes(edit, expected):
+    old = Dictionary.from_dict(BASE)
+    new = changed(edit)
+    result = diff(old, new)
+    assert [(c.kind, c.subject, c.id, c.level) for c in result.changes] == expected
+    assert result.required_bump == expected[0][3]
+    assert result.compatible == (expected[0][3] != MAJOR)
+    assert result.version_is_sufficient is False
+    # swapping the dictionaries turns additions into removals
+    reverse = {ADDED: REMOVED, REMOVED: ADDED, DEPRECATED: RESTORED}
+    assert diff(new, old).changes[0].kind == reverse.get(expected[0][0], expected[0][0])
+
+
+def test_restoring_deprecated_objects():
+    def deprecate(d):
+        d['deprecated'] = True
+        d['entities'][1]['properties'][0]['deprecated'] = True
+    result = diff(changed(deprecate), Dictionary.from_dict(BASE))
+    assert [(c.kind, c.subject, c.id, c.level) for c in result.changes] == [
+        (RESTORED, 'dictionary', 'adictionary', MINOR),
+        (RESTORED, 'property', 'box.label', MINOR)]
+    assert str(result.changes[1]) == 'minor: property box.label is no longer deprecated'
+
+
+LEGACY = {'id': 'legacy', 'name': 'Legacy', 'properties': [
+    {'property': 'item.size', 'name': 'SIZE'},
+    {'property': 'item.colour', 'name': 'COLOUR', 'values': {'R': 'red', 'B': 'blue'}}]}
+
+
+@pytest.mark.parametrize('edit,expected', [
+    (lambda d: d['dialects'].append({'id': 'web', 'name': 'Web'}),
+     [(ADDED, 'dialect', 'web', MINOR)]),
+    (lambda d: d['dialects'].pop(), [(REMOVED, 'dialect', 'legacy', MAJOR)]),
+    (lambda d: d['dialects'][0].update(description='The old system'),
+     [(CHANGED, 'dialect', 'legacy', PATCH)]),
+    (lambda d: d['dialects'][0].update(deprecated=True),
+     [(DEPRECATED, 'dialect', 'legacy', MINOR)]),
+    (lambda d: d['dialects'][0]['properties'][0].update(name='WIDTH'),
+     [(CHANGED, 'dialect property', 'legacy.item.size', MAJOR)]),
+    (lambda d: d['dialects'][0]['properties'][1].update(values={'R': 'red', 'L': 'blue'}),
+     [(CHANGED, 'dialect property', 'legacy.item.colour', MAJOR)]),
+    (lambda d: d['dialects'][0]['properties'].pop(),
+     [(REMOVED, 'dialect property', 'legacy.item.colour', MAJOR)]),
+    (lambda d: d['dialects'][0]['properties'].append({'property': 'box.label', 'name': 'LBL'}),
+     [(ADDED, 'dialect property', 'legacy.box.label', MAJOR)]),
+    (lambda d: d['entities'][1]['properties'].append(
+        {'id': 'box.size', 'name': 'Size', 'type': 'int32'})
+     or d['dialects'][0]['properties'].append({'property': 'box.size', 'name': 'BOXSIZE'}),
+     [(ADDED, 'property', 'box.size', MINOR),
+      (ADDED, 'dialect property', 'legacy.box.size', MINOR)]),
+])
+def test_dialect_changes(edit, expected):
+    def with_dialect(d):
+        d['dialects'] = [copy.deepcopy(LEGACY)]
+    old = changed(with_dialect)
+    new = changed(lambda d: with_dialect(d) or edit(d))
+    assert old.fingerprint != new.fingerprint
+    result = diff(old, new)
+    assert [(c.kind, c.subject, c.id, c.level) for c in result.changes] == expected
+    assert diff(old, changed(with_dialect)).changes == []
+
+
+def test_messages():
+    result = diff(Dictionary.from_dict(BASE), changed(
+        lambda d: d['entities'][0].update(attributes={'important': True})))
+    assert str(result.changes[0]) == \
+        "patch: entity item changed attributes from {} to {'important': True}"
+
+
+@pytest.mark.parametrize('version,sufficient', [
+    ('1.0.0', False), ('1.0.1', False), ('1.1.0', False), ('2.0.0', True), ('0.9.0', True),
+    ('master', True),
+])
+def test_version_increments(version, sufficient):
+    result = diff(Dictionary.from_dict(BASE),
+                  changed(lambda d: d['entities'].pop(), version=version))
+    assert result.version_is_sufficient is sufficient
+
+
+def test_breaking_changes_need_a_minor_increment_before_1_0_0():
+    old = changed(lambda d: None, version='0.3.1')
+    assert not diff(old, changed(lambda d: d['entities'].pop(), '0.3.2')).version_is_sufficient
+    assert diff(old, changed(lambda d: d['entities'].pop(), '0.4.0')).version_is_sufficient
+
+
+def test_unchanged_objects_are_not_compared(monkeypatch):
+    from property_rosetta import diff as module
+    compared = []
+    monkeypatch.setattr(module._Differ, 'property', lambda self, o, n: compared.append(n.id))
+    diff(Dictionary.from_dict(BASE), changed(
+        lambda d: d['entities'][0]['properties'][0].update(name='Width')))
+    assert compared == ['item.size']
+
+
+def test_main(tmp_path, capsys):
+    compiled = tmp_path / 'ok.snapshot'
+    snapshot.write_snapshot(Dictionary.from_yaml_dictionary(OK_PATH), compiled,
+                            snapshot.source_hash(OK_PATH))
+    assert main([str(OK_PATH), str(compiled), '--check-version', '--fail-on-breaking']) == 0
+    assert '0 changes, 0 breaking' in capsys.readouterr().out
+    assert main([str(OK_PATH), str(OK_PATH), '--json']) == 0
+    assert json.loads(capsys.readouterr().out)['changes'] == []
+    assert main([str(OK_PATH), str(tmp_path / 'missing.yaml')]) == 1
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.mapped import MappedDictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+DIALECTS_PATH = Path(__file__).parent / 'data' / 'translate' / 'dictionary_dialects' / \
+    'dictionary.yaml'
+
+
+def fingerprints(dictionary) -> dict:
+    ret = {('dictionary', dictionary.id): dictionary.fingerprint}
+    ret.update((('data type', t.id), t.fingerprint) for t in dictionary.data_types)
+    ret.update((('enumeration', e.id), e.fingerprint) for e in dictionary.enumerations)
+    ret.update((('entity', e.id), e.fingerprint) for e in dictionary.entities)
+    ret.update((('property', p.id), p.fingerprint)
+               for e in dictionary.entities for p in e.properties)
+    return ret
+
+
+def test_fingerprints_are_stable_across_loaders(tmp_path):
+    for path in (OK_PATH, DIALECTS_PATH):
+        dictionary = Dictionary.from_yaml_dictionary(path)
+        expected = fingerprints(dictionary)
+        assert len(set(expected.values())) == len(expected)
+        assert all(len(f) == 32 for f in expected.values())
+        assert fingerprints(Dictionary.from_yaml_dictionary(path, lazy=True)) == expected
+        compiled = tmp_path / 'dictionary.snapshot'
+        snapshot.write_snapshot(dictionary, compiled, snapshot.source_hash(path))
+        assert fingerprints(Dictionary.from_snapshot(compiled)) == expected
+        with MappedDictionary(compiled) as mapped:
+            assert mapped.fingerprint == dictionary.fingerprint
+            assert mapped.materialized_count == 0
+            assert fingerprints(mapped) == expected
+
+
+def test_changes_propagate_up_after_reindex():
+    dictionary = Dictionary.from_yaml_dictionary(OK_PATH)
+    before = fingerprints(dictionary)
+    dictionary.entities[0].properties[0].description = 'Short description'
+    assert fingerprints(dictionary) == before
+    dictionary.reindex()
+    after = fingerprints(dictionary)
+    assert {k for k in before if before[k] != after[k]} == {
+        ('dictionary', 'ok.dictionary'), ('entity', 'ok'), ('property', 'ok.index')}
+
+
+def test_fingerprints_depend_on_content_only():
+    def make(attributes):
+        return Dictionary.from_dict({
+            'id': 'adictionary', 'name': 'A dictionary', 'version': '1.0.0',
+            'data_types': [{'id': 'int32', 'name': 'Integer', 'attributes': attributes}],
+            'entities': [{'id': 'item', 'name': 'Item', 'properties': [
+                {'id': 'item.size', 'name': 'Size', 'type': 'int32',
+                 'attributes': attributes}]}],
+        })
+    first = make({'a': 1, 'b': [1, 2]})
+    assert fingerprints(make({'b': [1, 2], 'a': 1})) == fingerprints(first)
+    other = fingerprints(make({'a': True, 'b': [1, 2]}))
+    assert other[('data type', 'int32')] != first.data_types[0].fingerprint
+    assert other[('dictionary', 'adictionary')] != first.fingerprint
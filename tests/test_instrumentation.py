@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+import property_rosetta
+from property_rosetta import instrumentation, snapshot
+from property_rosetta.dictionary import Dictionary, DictionaryProperty
+from property_rosetta.validate import main
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+INVALID_PATH = Path(__file__).parent / 'data' / 'validation' / 'dictionary_invalid' / \
+    'dictionary.yaml'
+
+
+class Events(instrumentation.Hook):
+    def __init__(self):
+        self.events = []
+
+    def span(self, phase, seconds, total_seconds):
+        self.events.append((phase, seconds, total_seconds))
+
+    def count(self, counter, n):
+        self.events.append((counter, n))
+
+
+def test_spans_report_their_own_time():
+    hook = Events()
+    instrumentation.add_hook(hook)
+    try:
+        with instrumentation.span(instrumentation.BUILD):
+            time.sleep(0.01)
+            with instrumentation.span(instrumentation.IO):
+                time.sleep(0.02)
+            instrumentation.count(instrumentation.FILES, 2)
+    finally:
+        instrumentation.remove_hook(hook)
+    (io, io_seconds, io_total), counted, (build, build_seconds, build_total) = hook.events
+    assert (io, build, counted) == ('io', 'build', ('files', 2))
+    assert io_seconds == io_total >= 0.02
+    assert build_total >= 0.03
+    assert build_seconds == build_total - io_total
+    assert not instrumentation.enabled()
+    with instrumentation.span(instrumentation.BUILD):
+        instrumentation.count(instrumentation.FILES)
+    assert len(hook.events) == 3
+
+
+def test_spans_are_tracked_per_thread():
+    with instrumentation.recording() as recorder:
+        with instrumentation.span(instrumentation.BUILD):
+            thread = threading.Thread(target=lambda: instrumentation.span(
+                instrumentation.PARSE).__enter__().__exit__(None, None, None))
+            thread.start()
+            thread.join()
+    assert {p: s['calls'] for p, s in recorder.spans.items()} == {'build': 1, 'parse': 1}
+    assert recorder.elapsed >= recorder.spans['build']['seconds']
+
+
+def test_loads_are_recorded(tmp_path):
+    with instrumentation.recording() as recorder:
+        dictionary = Dictionary.from_yaml_dictionary(OK_PATH)
+        dictionary.validate()
+    counters = recorder.to_dict()['counters']
+    assert counters == {'files': 6, 'bytes': counters['bytes'], 'data_types': 4,
+                        'enumerations': 1, 'entities': 1, 'properties': 2, 'issues': 0}
+    assert counters['bytes'] == sum(p.stat().st_size for p in OK_PATH.parent.glob('*.yaml')) + \
+        sum(p.stat().st_size for p in OK_PATH.parent.glob('*/*.yaml'))
+    assert set(recorder.spans) == set(instrumentation.PHASES)
+    compiled = tmp_path / 'ok.snapshot'
+    snapshot.write_snapshot(dictionary, compiled, snapshot.source_hash(OK_PATH))
+    with instrumentation.recording() as recorder:
+        Dictionary.from_snapshot(compiled)
+    assert recorder.counters == {'files': 1, 'bytes': compiled.stat().st_size, 'data_types': 4,
+                                 'enumerations': 1, 'entities': 1, 'properties': 2}
+    with instrumentation.recording() as recorder:
+        lazy = Dictionary.from_yaml_dictionary(OK_PATH, lazy=True)
+        assert 'properties' not in recorder.counters
+        lazy.entities[0].properties
+    assert recorder.counters['properties'] == 2
+    assert recorder.spans['build']['calls'] == 2
+
+
+def test_disabled_debug_logging_does_not_format(caplog):
+    class Item(dict):
+        formatted = 0
+
+        def __repr__(self):
+            Item.formatted += 1
+            return super().__repr__()
+    item = Item(id='item.size', name='Size', type='int32')
+    caplog.set_level(logging.INFO, logger='property_rosetta.dictionary')
+    DictionaryProperty.from_dict(None, item)
+    assert Item.formatted == 0
+    caplog.set_level(logging.DEBUG, logger='property_rosetta.dictionary')
+    DictionaryProperty.from_dict(None, item)
+    assert Item.formatted > 0
+    assert "Loading property {'id': 'item.size'" in caplog.text
+
+
+def test_main(capsys):
+    assert main([str(OK_PATH), '--stats']) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats['counters']['entities'] == 1
+    assert stats['phases']['validate']['calls'] == 1
+    assert stats['elapsed'] > 0
+    assert not instrumentation.enabled()
+
+
+def test_stats_are_not_mixed_with_logs():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(Path(property_rosetta.__file__).parent.parent)] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    result = subprocess.run(
+        [sys.executable, '-m', 'property_rosetta.validate', '-v', '--stats', str(INVALID_PATH)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 1
+    assert json.loads(result.stdout)['counters']['issues'] == 4
+    assert 'Uses the deprecated type oldint' in result.stderr
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary, DictionarySnapshotError
+from property_rosetta.mapped import MappedDictionary
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+DICTIONARY_PATH = Path(__file__).parent / 'data' / \
+    'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / 'dictionary.snapshot'
+    snapshot.write_snapshot(Dictionary.from_yaml_dictionary(DICTIONARY_PATH),
+                            path, snapshot.source_hash(DICTIONARY_PATH))
+    return path
+
+
+def test_mapped_dictionary_lookups(snapshot_path):
+    expected = Dictionary.from_yaml_dictionary(DICTIONARY_PATH)
+    with MappedDictionary(snapshot_path, DICTIONARY_PATH) as result:
+        assert isinstance(result, Dictionary)
+        assert (result.id, result.name, result.version) == \
+            (expected.id, expected.name, expected.version)
+        assert result.materialized_count == 0
+        entity = result.entity_by_id('ok')
+        assert result.materialized_count == 1
+        assert entity is result.entities[0]
+        assert entity.dictionary.id == 'ok.dictionary'
+        assert entity.attributes == expected.entities[0].attributes
+        assert entity.property_by_id('ok.index').attributes['important']
+        assert result.entity_by_id('missing') is None
+        assert result.entity_by_id('o') is None
+        assert result.entity_by_id('okay') is None
+        assert result.property_by_id('ok.element').entity.id == 'ok'
+        assert result.property_by_id('ok.elements') is None
+        assert result.property_by_id('ok.index').dictionary_type.id == 'int32'
+        assert [t.id for t in result.data_types] == \
+            [t.id for t in expected.data_types]
+        assert result.type_by_id('bool').attributes == {
+            'boolean_attribute': 'cool'}
+        assert result.type_by_id('bool') is result.data_types[1]
+        assert result.type_by_id('missing') is None
+        assert result.data_types[-1].deprecated
+        assert [t.id for t in result.data_types[:2]] == ['int32', 'bool']
+        enumeration = result.enumeration_by_id('enum.entity.foo')
+        assert enumeration.value_for_id('baz').integral_value == 5
+        assert enumeration.dictionary.id == 'ok.dictionary'
+        with pytest.raises(IndexError):
+            result.entities[1]
+
+
+def test_snapshots_are_replaced_under_mapped_dictionaries(snapshot_path):
+    small = Dictionary.from_dict({'id': 'small', 'name': 'Small', 'version': '1.0.0',
+                                  'data_types': [], 'entities': []})
+    with MappedDictionary(snapshot_path) as mapped:
+        size = snapshot_path.stat().st_size
+        snapshot.write_snapshot(small, snapshot_path, snapshot.source_hash(DICTIONARY_PATH))
+        assert snapshot_path.stat().st_size < size
+        # the mapping still reads the snapshot it was opened on
+        assert mapped.entity_by_id('ok').property_by_id('ok.index').type_id == 'int32'
+        assert [t.id for t in mapped.data_types][-1] == 'enum'
+    assert Dictionary.from_snapshot(snapshot_path).id == 'small'
+    assert [p.name for p in snapshot_path.parent.iterdir()] == [snapshot_path.name]
+
+
+def test_mapped_dictionary_rejects_invalid_snapshots(snapshot_path, tmp_path):
+    with pytest.raises(DictionarySnapshotError):
+        MappedDictionary(tmp_path / 'nonexistent.snapshot')
+    (tmp_path / 'empty.snapshot').write_bytes(b'')
+    with pytest.raises(DictionarySnapshotError):
+        MappedDictionary(tmp_path / 'empty.snapshot')
+    (tmp_path / 'other' / 'dictionary.yaml').parent.mkdir()
+    (tmp_path / 'other' / 'dictionary.yaml').write_text('---\nid: other\n')
+    with pytest.raises(DictionarySnapshotError):
+        MappedDictionary(snapshot_path, tmp_path / 'other' / 'dictionary.yaml')
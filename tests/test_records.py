@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import pytest
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.records import RecordIssue, RecordValidator, TypeCheck, \
+    clear_validators, compile_validator
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+def make_dictionary():
+    return Dictionary.from_dict({
+        'id': 'adictionary',
+        'name': 'A dictionary',
+        'description': 'A dictionary',
+        'version': '1.0.0',
+        'data_types': [
+            {'id': 'int8', 'name': 'Byte'},
+            {'id': 'bool', 'name': 'Boolean'},
+            {'id': 'float64', 'name': 'Double'},
+            {'id': 'elementid', 'name': 'Element', 'attributes': {'record_type': 'string'}},
+            {'id': 'blob', 'name': 'Anything'},
+        ],
+        'enumerations': [{'id': 'colour', 'name': 'Colour', 'values': [
+            {'id': 'red', 'integral_value': 1},
+            {'id': 'blue', 'integral_value': 2, 'deprecated': True}]}],
+        'entities': [{'id': 'item', 'name': 'Item', 'properties': [
+            {'id': 'item.size', 'name': 'Size', 'type': 'int8'},
+            {'id': 'item.shown', 'name': 'Shown', 'type': 'bool'},
+            {'id': 'item.weight', 'name': 'Weight', 'type': 'float64'},
+            {'id': 'item.parent', 'name': 'Parent', 'type': 'elementid'},
+            {'id': 'item.data', 'name': 'Data', 'type': 'blob'},
+            {'id': 'item.colour', 'name': 'Colour', 'type': 'colour'},
+            {'id': 'item.broken', 'name': 'Broken', 'type': 'nosuchtype'},
+        ]}],
+    })
+
+
+def test_valid_records_have_no_issues():
+    dictionary = make_dictionary()
+    validator = compile_validator(dictionary.entity_by_id('item'))
+    assert validator.validate([
+        {'item.size': -128, 'item.shown': True, 'item.weight': 1, 'item.parent': 'p',
+         'item.data': object(), 'item.colour': 'blue', 'item.broken': [1]},
+        {'item.size': None, 'item.weight': 2.5, 'item.colour': None},
+        {},
+    ]) == []
+
+
+def test_issues_are_reported_per_record_without_raising():
+    dictionary = make_dictionary()
+    validator = compile_validator(dictionary.entity_by_id('item'))
+    issues = validator.validate([
+        {'item.size': 128, 'item.shown': 1},
+        ['not', 'a', 'record'],
+        {'item.weight': True, 'item.parent': 3, 'item.colour': 'green', 'item.nope': 1},
+    ])
+    assert [(i.record, i.property) for i in issues] == [
+        (0, 'item.size'), (0, 'item.shown'), (1, None), (2, 'item.weight'),
+        (2, 'item.parent'), (2, 'item.colour'), (2, 'item.nope')]
+    assert str(issues[0]) == 'record 0: Value 128 of item.size is not a int8'
+    assert issues[5].message == "Value 'green' of item.colour is not in enumeration colour"
+    assert issues[6].message == 'Entity item has no property item.nope'
+    assert validator.validate_record({'item.size': 'big'}) == [
+        RecordIssue(0, 'item.size', "Value 'big' of item.size is not a int8")]
+
+
+def test_types_without_attributes_are_checked_by_id():
+    dictionary = make_dictionary()
+    dictionary.type_by_id('int8').attributes = None
+    validator = RecordValidator(dictionary.entity_by_id('item'))
+    assert validator.validate_record({'item.size': -128}) == []
+    assert validator.validate_record({'item.size': 128})[0].property == 'item.size'
+
+
+def test_validators_are_cached_per_entity():
+    dictionary = make_dictionary()
+    entity = dictionary.entity_by_id('item')
+    validator = compile_validator(entity)
+    assert compile_validator(entity) is validator
+    custom = compile_validator(entity, {'blob': TypeCheck(lambda v: isinstance(v, bytes))})
+    assert custom is not validator
+    assert custom.validate_record({'item.data': 'text'})[0].property == 'item.data'
+    clear_validators()
+    assert compile_validator(entity) is not validator
+    import property_rosetta.records as records
+    del dictionary, entity
+    gc.collect()
+    assert len(records._validators) == 0
+
+
+def test_columns():
+    np = pytest.importorskip('numpy')
+    dictionary = make_dictionary()
+    validator = RecordValidator(dictionary.entity_by_id('item'))
+    assert validator.validate_columns({
+        'item.size': np.array([1, -128, 127], dtype=np.int64),
+        'item.shown': np.array([True, False, True]),
+        'item.weight': np.array([1, 2, 3], dtype=np.int32),
+        'item.colour': np.array(['red', 'blue', 'red']),
+        'item.parent': ['a', None, 'c'],
+    }) == []
+    issues = validator.validate_columns({
+        'item.size': np.array([1, 300, -129]),
+        'item.shown': np.array([1, 0, 1]),
+        'item.colour': np.array(['red', 'green', 'red']),
+        'item.parent': [1, 'b', None],
+        'item.nope': [1, 2, 3],
+    })
+    assert [(i.record, i.property) for i in issues] == [
+        (None, 'item.nope'), (0, 'item.shown'), (0, 'item.parent'), (1, 'item.size'),
+        (1, 'item.shown'), (1, 'item.colour'), (2, 'item.size'), (2, 'item.shown')]
+    assert issues[3].message == 'Value 300 of item.size is not a int8'
+    with pytest.raises(ValueError):
+        validator.validate_columns({'item.size': [1], 'item.shown': [True, False]})
+
+
+@pytest.mark.parametrize('columns', [
+    {'item.parent': [3, 'p']},
+    {'item.size': [True, 5]},
+    {'item.size': [1, 2.5]},
+    {'item.weight': [1, True, 'heavy']},
+    {'item.colour': [1, 'red']},
+    {'item.shown': [1, True]},
+    {'item.broken': [[1], [2, 3]], 'item.size': [None, 1]},
+])
+def test_columns_are_checked_like_records(columns):
+    pytest.importorskip('numpy')
+    dictionary = make_dictionary()
+    validator = RecordValidator(dictionary.entity_by_id('item'))
+    records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    assert validator.validate_columns(columns) == validator.validate(records)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import shutil
+import threading
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary, DictionaryLoadingError
+from property_rosetta.registry import DictionaryRegistry, RegistryError, estimate_size
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+VERSIONS = ['0.0.1', '0.0.2', '0.1.0']
+
+
+@pytest.fixture
+def releases(tmp_path):
+    for version in VERSIONS:
+        release = tmp_path / 'ok.dictionary' / version
+        shutil.copytree(OK_PATH.parent, release)
+        path = release / 'dictionary.yaml'
+        path.write_text(path.read_text().replace('0.0.1', version))
+    return tmp_path
+
+
+def test_releases_are_loaded_once(releases):
+    registry = DictionaryRegistry(releases)
+    assert registry.releases() == [('ok.dictionary', v) for v in VERSIONS]
+    dictionary = registry.get('ok.dictionary', '0.0.2')
+    assert dictionary.version == '0.0.2'
+    assert registry.get('ok.dictionary', '0.0.2') is dictionary
+    stats = registry.stats
+    assert (stats['hits'], stats['misses'], stats['resident']) == (1, 1, 1)
+    assert stats['resident_bytes'] == estimate_size(dictionary) > 0
+
+
+def test_least_recently_used_releases_are_evicted(releases):
+    registry = DictionaryRegistry(releases, max_versions=2)
+    registry.get('ok.dictionary', '0.0.1')
+    registry.get('ok.dictionary', '0.0.2')
+    registry.get('ok.dictionary', '0.0.1')
+    registry.get('ok.dictionary', '0.1.0')
+    assert registry.resident == [('ok.dictionary', '0.0.1'), ('ok.dictionary', '0.1.0')]
+    assert registry.evictions == 1
+    assert registry.evict('ok.dictionary', '0.0.1')
+    assert not registry.evict('ok.dictionary', '0.0.1')
+    registry.clear()
+    assert (registry.resident, registry.evictions) == ([], 3)
+
+
+def test_byte_budget(releases):
+    registry = DictionaryRegistry(releases, max_versions=None, max_bytes=150,
+                                  sizer=lambda d: 100)
+    for version in VERSIONS:
+        registry.get('ok.dictionary', version)
+        assert registry.resident == [('ok.dictionary', version)]
+    assert registry.stats['resident_bytes'] == 100
+    assert registry.evictions == 2
+
+
+def test_concurrent_requests_share_a_load(releases, monkeypatch):
+    registry = DictionaryRegistry(releases)
+    started, release = threading.Event(), threading.Event()
+    load = registry._load
+    loads = []
+
+    def slow_load(id, version):
+        loads.append(version)
+        started.set()
+        release.wait(5)
+        return load(id, version)
+    monkeypatch.setattr(registry, '_load', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        registry.get('ok.dictionary', '0.0.1'))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while registry.stats['shared'] < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert loads == ['0.0.1']
+    assert len(results) == 4 and all(r is results[0] for r in results)
+    assert (registry.misses, registry.shared) == (1, 3)
+
+
+def test_snapshots_are_preferred(releases, caplog):
+    release = releases / 'ok.dictionary' / '0.0.2'
+    snapshot.write_snapshot(Dictionary.from_yaml_dictionary(release / 'dictionary.yaml'),
+                            release / 'dictionary.snapshot',
+                            snapshot.source_hash(release / 'dictionary.yaml'))
+    registry = DictionaryRegistry(releases)
+    assert registry.get('ok.dictionary', '0.0.2').version == '0.0.2'
+    assert caplog.text == ''
+    (release / 'entities.yaml').write_text((release / 'entities.yaml').read_text() + '\n')
+    registry.clear()
+    assert registry.get('ok.dictionary', '0.0.2').version == '0.0.2'
+    assert 'Stale dictionary snapshot' in caplog.text
+
+
+def test_missing_and_invalid_releases(releases):
+    registry = DictionaryRegistry(releases)
+    with pytest.raises(RegistryError, match='No release 9.9.9'):
+        registry.get('ok.dictionary', '9.9.9')
+    for id, version in [('..', '0.0.1'), ('ok.dictionary', '../0.0.1'), ('', '0.0.1')]:
+        with pytest.raises(RegistryError, match='Invalid release'):
+            registry.get(id, version)
+    shutil.copytree(releases / 'ok.dictionary' / '0.0.1', releases / 'ok.dictionary' / '1.0.0')
+    with pytest.raises(RegistryError, match='holds version 0.0.1'):
+        registry.get('ok.dictionary', '1.0.0')
+    (releases / 'ok.dictionary' / '0.0.1' / 'entities.yaml').write_text('- [')
+    with pytest.raises(DictionaryLoadingError):
+        registry.get('ok.dictionary', '0.0.1')
+    assert registry.failures == 6 and registry.resident == []
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import shutil
+from pathlib import Path
+from property_rosetta.cache import ParseCache
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.validate import main
+from property_rosetta.validation import ERROR, WARNING, Rule, Validator, ValidationIssue, \
+    ValidationState, DEFAULT_RULES
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+TEST_FILES_PATH = Path(__file__).parent / 'data' / 'validation'
+INVALID_PATH = TEST_FILES_PATH / 'dictionary_invalid' / 'dictionary.yaml'
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+
+
+def test_valid_dictionary_has_no_issues():
+    assert Dictionary.from_yaml_dictionary(OK_PATH).validate() == []
+
+
+@pytest.mark.parametrize('workers', [None, 2, 8])
+def test_all_issues_are_collected_in_order(workers):
+    dictionary = Dictionary.from_yaml_dictionary(INVALID_PATH)
+    issues = dictionary.validate(workers=workers)
+    assert [(i.severity, i.rule, i.subject) for i in issues] == [
+        (ERROR, 'unique-ids', 'second'),
+        (ERROR, 'unique-ids', 'first.size'),
+        (ERROR, 'property-type-resolves', 'first.unknown'),
+        (WARNING, 'deprecated-type-usage', 'first.old'),
+    ]
+    assert 'nosuchtype' in str(issues[2])
+
+
+def test_properties_may_use_enumerations():
+    dictionary = Dictionary.from_dict({
+        'id': 'adictionary',
+        'name': 'A dictionary',
+        'version': '1.0.0',
+        'enumerations': [{'id': 'anenum', 'name': 'anenum', 'deprecated': True,
+                          'values': [{'id': 'a', 'integral_value': 1}]}],
+        'entities': [{'id': 'anentity', 'name': 'anentity', 'properties': [
+            {'id': 'anentity.value', 'name': 'value', 'type': 'anenum'}]}],
+    })
+    assert [(i.rule, i.subject) for i in dictionary.validate()] == [
+        ('deprecated-type-usage', 'anentity.value')]
+
+
+def test_custom_rules():
+    class NoEntities(Rule):
+        name = 'no-entities'
+
+        def check_entity(self, dictionary, entity):
+            return [self.issue(entity.id, 'Entities are not allowed')]
+
+    dictionary = Dictionary.from_yaml_dictionary(OK_PATH)
+    assert dictionary.validate(rules=[NoEntities()], workers=2) == [
+        ValidationIssue(ERROR, 'no-entities', 'ok', 'Entities are not allowed')]
+    assert Validator([]).validate(dictionary) == []
+    assert len(Validator().rules) == len(DEFAULT_RULES)
+
+
+def test_validate_fails_only_on_errors():
+    assert main([str(INVALID_PATH)]) == 1
+    assert main(['-j', '2', str(INVALID_PATH)]) == 1
+    assert main([str(OK_PATH)]) == 0
+
+
+@pytest.fixture
+def invalid_path(tmp_path):
+    shutil.copytree(INVALID_PATH.parent, tmp_path/'dictionary')
+    return tmp_path/'dictionary'/'dictionary.yaml'
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_incremental_validation_reevaluates_affected_entities(invalid_path, tmp_path, workers):
+    entity_rules = 3 * 3
+    state = ValidationState()
+    expected = Dictionary.from_yaml_dictionary(invalid_path).validate()
+    assert Dictionary.from_yaml_dictionary(invalid_path).validate(
+        workers=workers, state=state) == expected
+    assert (state.evaluated, state.reused) == (3 + entity_rules, 0)
+
+    state.save(tmp_path/'state.json')
+    state = ValidationState.load(tmp_path/'state.json')
+    assert Dictionary.from_yaml_dictionary(invalid_path).validate(
+        workers=workers, state=state) == expected
+    assert (state.evaluated, state.reused) == (0, 3 + entity_rules)
+
+    # fixing a property of the first entity only re-checks that entity
+    first = invalid_path.parent/'properties-by-entity'/'first.yaml'
+    first.write_text(first.read_text().replace('nosuchtype', 'int32'))
+    issues = Dictionary.from_yaml_dictionary(invalid_path).validate(
+        workers=workers, state=state)
+    assert 'property-type-resolves' not in [i.rule for i in issues]
+    assert (state.evaluated, state.reused) == (3 + 3, 6)
+
+    # un-deprecating a type re-checks the entities using it
+    types = invalid_path.parent/'data-types.yaml'
+    types.write_text(types.read_text().replace('deprecated: true', 'deprecated: false'))
+    issues = Dictionary.from_yaml_dictionary(invalid_path).validate(
+        workers=workers, state=state)
+    assert issues == Dictionary.from_yaml_dictionary(invalid_path).validate()
+    assert 'deprecated-type-usage' not in [i.rule for i in issues]
+    # rules of the first entity that did not look oldint up are reused too
+    assert (state.evaluated, state.reused) == (3 + 2, 7)
+
+
+def test_incremental_validation_restores_fingerprints_of_unchanged_files(invalid_path, tmp_path):
+    cache = ParseCache(tmp_path/'cache')
+    state = ValidationState()
+    expected = Dictionary.from_yaml_dictionary(invalid_path).validate()
+    assert Dictionary.from_yaml_dictionary(invalid_path, cache=cache).validate(
+        state=state) == expected
+    assert state.restored == 0
+    state.save(tmp_path/'state.json')
+
+    first = invalid_path.parent/'properties-by-entity'/'first.yaml'
+    first.write_text(first.read_text().replace('nosuchtype', 'int32'))
+    state = ValidationState.load(tmp_path/'state.json')
+    dictionary = Dictionary.from_yaml_dictionary(invalid_path, cache=cache)
+    issues = dictionary.validate(state=state)
+    assert issues == Dictionary.from_yaml_dictionary(invalid_path).validate()
+    assert (state.evaluated, state.reused) == (3 + 3, 6)
+    # every type, the enumerations and all entities but the edited one
+    assert state.restored == len(dictionary.data_types) + len(dictionary.enumerations) + 2
+    dictionary.reindex()
+    assert [e.fingerprint for e in dictionary.entities] == [
+        state.fingerprints[f'entity:{e.id}:{n}'][0] for n, e in zip((0, 0, 1), dictionary.entities)]
+
+    # without a cache the fingerprints are computed
+    Dictionary.from_yaml_dictionary(invalid_path).validate(state=state)
+    assert (state.restored, state.reused) == (0, 12)
+
+
+def test_validation_state_ignores_unreadable_files(tmp_path):
+    assert ValidationState.load(tmp_path/'missing.json').results == {}
+    (tmp_path/'broken.json').write_text('{not json')
+    assert ValidationState.load(tmp_path/'broken.json').results == {}
+
+
+def test_validate_keeps_state_in_cache_dir(invalid_path, tmp_path):
+    assert main(['--cache-dir', str(tmp_path/'cache'), str(invalid_path)]) == 1
+    assert (tmp_path/'cache'/'validation.json').exists()
+    assert main(['--cache-dir', str(tmp_path/'cache'), str(invalid_path)]) == 1
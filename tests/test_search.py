@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary
+
+pytest.importorskip('numpy')
+from property_rosetta.search import ENTITY, ENUMERATION_VALUE, PROPERTY, SearchIndex, \
+    SearchIndexError, index_path, tokenize  # noqa: E402
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+OK_PATH = Path(__file__).parent / 'data' / 'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml'
+
+DICTIONARY = {
+    'id': 'vehicles', 'name': 'Vehicles', 'version': '1.0.0',
+    'data_types': [{'id': 'int32', 'name': 'Integer'}],
+    'enumerations': [{'id': 'fuel', 'name': 'Fuel', 'values': [
+        {'id': 'diesel', 'integral_value': 1, 'description': 'Diesel engines'},
+        {'id': 'petrol', 'integral_value': 2}]}],
+    'entities': [
+        {'id': 'car', 'name': 'Car', 'description': 'A road vehicle', 'properties': [
+            {'id': 'car.engineTemperature', 'name': 'Engine temperature', 'type': 'int32',
+             'description': 'Temperature of the coolant, in degrees'},
+            {'id': 'car.fuel', 'name': 'Fuel', 'type': 'fuel',
+             'description': 'What the engine runs on'},
+            {'id': 'car.seats', 'name': 'Seats', 'type': 'int32'}]},
+        {'id': 'boat', 'name': 'Boat', 'properties': [
+            {'id': 'boat.hullTemperature', 'name': 'Hull temperature', 'type': 'int32'}]}],
+}
+
+
+@pytest.fixture
+def dictionary():
+    return Dictionary.from_dict(DICTIONARY)
+
+
+def test_tokenize():
+    assert tokenize('car.engineTemperature') == [
+        'car', 'enginetemperature', 'engine', 'temperature']
+    assert tokenize('HTTPServer_port 42') == ['httpserver', 'http', 'server', 'port', '42']
+    assert tokenize(None) == []
+
+
+def test_search(dictionary):
+    index = SearchIndex.build(dictionary)
+    hits = index.search('temperature')
+    assert [h.id for h in hits] == ['car.engineTemperature', 'boat.hullTemperature']
+    assert (hits[0].kind, hits[0].owner) == (PROPERTY, 'car')
+    assert hits[0].resolve(dictionary) is dictionary.property_by_id('car.engineTemperature')
+    # all the words must match, the last one as a prefix
+    assert [h.id for h in index.search('engine temp')] == ['car.engineTemperature']
+    assert [h.id for h in index.search('engineTemp')] == ['car.engineTemperature']
+    assert index.search('engine aeroplane') == []
+    # ids weigh more than names, names more than descriptions
+    assert [h.id for h in index.search('fuel')][:2] == ['car.fuel', 'fuel']
+    assert [h.id for h in index.search('engine', kinds=[ENUMERATION_VALUE])] == ['diesel']
+    assert index.search('engine', kinds=[ENUMERATION_VALUE])[0].resolve(dictionary).id == \
+        'diesel'
+    assert len(index.search('e', limit=2)) == 2
+    assert index.search('  ') == []
+
+
+def test_fuzzy(dictionary):
+    index = SearchIndex.build(dictionary)
+    hits = index.fuzzy('engin temprature')
+    assert hits[0].id == 'car.engineTemperature'
+    assert 0 < hits[0].score < 1
+    assert index.fuzzy('car')[0].score == 1
+    assert [h.id for h in index.fuzzy('boat', kinds=[ENTITY])] == ['boat']
+    assert index.fuzzy('xyzzy') == []
+    assert index.fuzzy('seets', min_similarity=0.9) == []
+
+
+def test_saved_indexes(tmp_path, dictionary):
+    compiled = tmp_path / 'ok.snapshot'
+    ok = Dictionary.from_yaml_dictionary(OK_PATH)
+    snapshot.write_snapshot(ok, compiled, snapshot.source_hash(OK_PATH))
+    path = index_path(compiled)
+    assert path == tmp_path / 'ok.search'
+    index = SearchIndex.load_or_build(Dictionary.from_snapshot(compiled), path)
+    assert path.is_file()
+    loaded = SearchIndex.load(path, ok)
+    for query in ('foo', 'enumeration', 'ok ind'):
+        assert loaded.search(query) == index.search(query) != []
+        assert loaded.fuzzy(query) == index.fuzzy(query)
+    with pytest.raises(SearchIndexError, match='Stale'):
+        SearchIndex.load(path, dictionary)
+    assert SearchIndex.load_or_build(dictionary, path).fingerprint == dictionary.fingerprint
+    path.write_bytes(b'garbage')
+    with pytest.raises(SearchIndexError, match='Cannot read'):
+        SearchIndex.load(path)
+    with pytest.raises(SearchIndexError, match='Cannot read'):
+        SearchIndex.load(tmp_path / 'missing.search')
+
+
+def test_compile_writes_the_index(tmp_path):
+    from property_rosetta.compile import main
+    output = tmp_path / 'ok.snapshot'
+    assert main([str(OK_PATH), '-o', str(output), '--search-index']) == 0
+    index = SearchIndex.load(tmp_path / 'ok.search', Dictionary.from_snapshot(output))
+    assert [h.id for h in index.search('ok')][0] == 'ok'
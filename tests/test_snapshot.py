@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.compile import main
+from property_rosetta.dictionary import Dictionary, DictionarySnapshotError, \
+    DictionaryLoadingError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+TEST_FILES_PATH = Path(__file__).parent / 'data' / 'dictionary_loading'
+
+
+def test_snapshot_roundtrip(dictionary_path):
+    expected = Dictionary.from_yaml_dictionary(dictionary_path)
+    assert main([str(dictionary_path)]) == 0
+    result = Dictionary.from_snapshot(
+        dictionary_path.with_suffix('.snapshot'), dictionary_path)
+    assert (result.id, result.name, result.description, result.version) == \
+        (expected.id, expected.name, expected.description, expected.version)
+    assert [(t.id, t.name, t.description, t.semantics, t.attributes, t.deprecated)
+            for t in result.data_types] == \
+        [(t.id, t.name, t.description, t.semantics, t.attributes, t.deprecated)
+         for t in expected.data_types]
+    assert [(e.id, e.name, e.description, e.attributes, e.deprecated)
+            for e in result.entities] == \
+        [(e.id, e.name, e.description, e.attributes, e.deprecated)
+         for e in expected.entities]
+    assert [(p.id, p.name, p.type_id, p.description, p.attributes, p.deprecated)
+            for p in result.entities[0].properties] == \
+        [(p.id, p.name, p.type_id, p.description, p.attributes, p.deprecated)
+         for p in expected.entities[0].properties]
+    enumeration = result.enumerations[0]
+    assert enumeration.id == 'enum.entity.foo'
+    assert enumeration.dictionary.id == 'ok.dictionary'
+    assert [(v.id, v.integral_value, v.deprecated) for v in enumeration.values] == \
+        [('foo', 0, False), ('bar', 1, False), ('baz', 5, True)]
+    assert enumeration.value_for_id('baz').enumeration.id == 'enum.entity.foo'
+    assert result.entities[0].property_by_id('ok.index').entity.id == 'ok'
+
+
+def test_snapshot_rejects_stale_sources(dictionary_path, tmp_path):
+    output = tmp_path/'compiled.snapshot'
+    assert main([str(dictionary_path), '-o', str(output)]) == 0
+    Dictionary.from_snapshot(output, dictionary_path)
+    properties = dictionary_path.parent/'properties-by-entity'/'ok.yaml'
+    properties.write_text(properties.read_text().replace('void', 'abyss'))
+    with pytest.raises(DictionarySnapshotError):
+        Dictionary.from_snapshot(output, dictionary_path)
+    # without sources the snapshot is trusted as is
+    Dictionary.from_snapshot(output)
+
+
+def test_snapshot_rejects_invalid_files(dictionary_path, tmp_path):
+    dictionary = Dictionary.from_yaml_dictionary(dictionary_path)
+    data = snapshot.to_bytes(dictionary, snapshot.source_hash(dictionary_path))
+    with pytest.raises(DictionarySnapshotError):
+        snapshot.from_bytes(b'NOTASNAP' + data[8:])
+    with pytest.raises(DictionarySnapshotError):
+        snapshot.from_bytes(data[:8] + b'\xff\xff' + data[10:])
+    with pytest.raises(DictionarySnapshotError):
+        snapshot.from_bytes(data[:20])
+    with pytest.raises(DictionaryLoadingError):
+        Dictionary.from_snapshot(tmp_path/'nonexistent.snapshot')
+
+
+def test_compile_reports_loading_errors(tmp_path):
+    assert main([str(TEST_FILES_PATH/'dictionary_no_id.yaml'),
+                 '-o', str(tmp_path/'out.snapshot')]) == 1
+    assert not (tmp_path/'out.snapshot').exists()
+
+
+def test_snapshot_shares_attribute_maps():
+    dictionary = Dictionary.from_dict({
+        'id': 'adictionary',
+        'name': 'A dictionary',
+        'version': '1.0.0',
+        'entities': [{
+            'id': 'anentity',
+            'name': 'anentity',
+            'properties': [
+                {'id': f'anentity.{name}', 'name': name, 'type': 'int64',
+                 'attributes': {'unit': 'm', 'limits': {'range': [0, 10]}}}
+                for name in ['first', 'second']],
+        }],
+    })
+    result = snapshot.from_bytes(snapshot.to_bytes(dictionary, b'\0' * 32))
+    first, second = result.entities[0].properties
+    assert first.attributes == {'unit': 'm', 'limits': {'range': (0, 10)}}
+    assert first.attributes is second.attributes
+    with pytest.raises(TypeError):
+        first.attributes['unit'] = 'km'
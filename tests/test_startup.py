@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import property_rosetta
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+# modules that used to make every invocation of the command line tools slow
+HEAVY_MODULES = ['pkg_resources', 'yaml', 'semver', 'importlib.metadata',
+                 'property_rosetta.dictionary', 'jinja2', 'humps']
+
+
+def run_python(*args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(Path(property_rosetta.__file__).parent.parent)] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    return subprocess.run([sys.executable] + list(args), env=env, check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+def test_cli_import_is_light():
+    loaded = run_python('-c', 'import sys, property_rosetta.validate, property_rosetta.compile, '
+                              'property_rosetta.generate, property_rosetta.compare; '
+                              'print(" ".join(sys.modules))').split()
+    assert [m for m in HEAVY_MODULES if m in loaded] == []
+
+
+def test_version():
+    assert run_python('-m', 'property_rosetta.validate', '--version').startswith(
+        'property_rosetta ')
+    assert property_rosetta.__version__
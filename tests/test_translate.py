@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pathlib import Path
+from property_rosetta import snapshot
+from property_rosetta.dictionary import Dictionary, DictionaryLoadingError, \
+    DictionaryValidationError
+from property_rosetta.mapped import MappedDictionary
+from property_rosetta.translate import COMMON, TranslationError, Translation, \
+    clear_translations, compile_translation
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+DIALECTS_PATH = Path(__file__).parent / 'data' / 'translate' / 'dictionary_dialects' / \
+    'dictionary.yaml'
+
+LEGACY = {'SIZE': 3, 'COLOUR': 'B', 'item.label': 'box'}
+WEB = {'item.size': 3, 'colour': 'blue', 'label': 'box'}
+COMMON_RECORD = {'item.size': 3, 'item.colour': 'blue', 'item.label': 'box'}
+
+
+def test_dialects_are_loaded():
+    dictionary = Dictionary.from_yaml_dictionary(DIALECTS_PATH)
+    assert [d.id for d in dictionary.dialects] == ['legacy', 'web']
+    legacy = dictionary.dialect_by_id('legacy')
+    assert legacy.property_by_id('item.colour').name == 'COLOUR'
+    assert legacy.property_by_id('item.colour').values == {'R': 'red', 'G': 'green', 'B': 'blue'}
+    assert legacy.property_by_id('item.label') is None
+    assert dictionary.dialect_by_id('web').property_by_id('item.colour').values[1] == 'red'
+    assert dictionary.dialect_by_id('missing') is None
+
+
+@pytest.mark.parametrize('source,target,record,expected', [
+    ('legacy', COMMON, LEGACY, COMMON_RECORD),
+    (COMMON, 'legacy', COMMON_RECORD, LEGACY),
+    ('legacy', 'web', LEGACY, WEB),
+    ('web', 'legacy', WEB, LEGACY),
+    ('web', 'legacy', {'colour': 1}, {'COLOUR': 'R'}),
+    ('legacy', 'web', {'COLOUR': 'R'}, {'colour': 1}),
+    ('legacy', 'legacy', LEGACY, LEGACY),
+])
+def test_translation(source, target, record, expected):
+    dictionary = Dictionary.from_yaml_dictionary(DIALECTS_PATH)
+    translation = compile_translation(dictionary, source, target)
+    assert translation.translate(record) == expected
+    assert translation.translate_batch([record, record]) == [expected, expected]
+    assert list(translation.translate_many(iter([record]))) == [expected]
+
+
+def test_unmapped_fields():
+    dictionary = Dictionary.from_yaml_dictionary(DIALECTS_PATH)
+    record = {'SIZE': 1, 'item.size': 2, 'extra': 3}
+    assert compile_translation(dictionary, 'legacy').translate(record) == {'item.size': 1}
+    assert compile_translation(dictionary, 'legacy', unmapped='keep').translate(
+        {'SIZE': 1, 'extra': 3}) == {'item.size': 1, 'extra': 3}
+    with pytest.raises(TranslationError, match='item.size is not a property in dialect legacy'):
+        compile_translation(dictionary, 'legacy', unmapped='raise').translate(record)
+    with pytest.raises(ValueError):
+        compile_translation(dictionary, 'legacy', unmapped='ignore')
+
+
+def test_translations_are_cached_per_dictionary():
+    dictionary = Dictionary.from_yaml_dictionary(DIALECTS_PATH)
+    translation = compile_translation(dictionary, 'legacy', 'web')
+    assert compile_translation(dictionary, 'legacy', 'web') is translation
+    assert compile_translation(dictionary, 'web', 'legacy') is not translation
+    assert compile_translation(Dictionary.from_yaml_dictionary(DIALECTS_PATH),
+                               'legacy', 'web') is not translation
+    clear_translations()
+    assert compile_translation(dictionary, 'legacy', 'web') is not translation
+
+
+def make_dictionary(dialect):
+    return Dictionary.from_dict({
+        'id': 'adictionary', 'name': 'A dictionary', 'version': '1.0.0',
+        'data_types': [{'id': 'int32', 'name': 'Integer'}],
+        'enumerations': [{'id': 'colour', 'name': 'Colour', 'values': [
+            {'id': 'red', 'integral_value': 1}]}],
+        'entities': [{'id': 'item', 'name': 'Item', 'properties': [
+            {'id': 'item.size', 'name': 'Size', 'type': 'int32'},
+            {'id': 'item.colour', 'name': 'Colour', 'type': 'colour'}]}],
+        'dialects': [dict(dialect, id='other', name='Other')],
+    })
+
+
+@pytest.mark.parametrize('properties,message', [
+    ([{'property': 'item.weight', 'name': 'w'}], 'not in dictionary'),
+    ([{'property': 'item.size', 'name': 's', 'values': {'x': 'red'}}], 'not an enumeration'),
+    ([{'property': 'item.colour', 'name': 'c', 'values': {'x': 'pink'}}], 'not in enumeration'),
+    ([{'property': 'item.colour', 'name': 'item.size'}], 'name item.size twice'),
+])
+def test_invalid_dialects_do_not_compile(properties, message):
+    dictionary = make_dictionary({'properties': properties})
+    with pytest.raises(TranslationError, match=message):
+        Translation(dictionary, 'other')
+    with pytest.raises(TranslationError, match=message):
+        Translation(dictionary, COMMON, 'other')
+    with pytest.raises(TranslationError, match='has no dialect missing'):
+        Translation(dictionary, 'missing')
+
+
+@pytest.mark.parametrize('properties', [
+    [{'property': 'item.size', 'name': 'a'}, {'property': 'item.size', 'name': 'b'}],
+    [{'property': 'item.size', 'name': 'a'}, {'property': 'item.colour', 'name': 'a'}],
+    [{'property': 'item.colour', 'name': 'c', 'values': {'x': 'red', 'y': 'red'}}],
+])
+def test_ambiguous_dialects_do_not_load(properties):
+    with pytest.raises(DictionaryValidationError):
+        make_dictionary({'properties': properties})
+
+
+def test_dialect_values_may_be_empty():
+    dictionary = Dictionary.from_yaml_dictionary(
+        DIALECTS_PATH.parent.parent / 'dictionary_empty_values' / 'dictionary.yaml')
+    assert dictionary.dialect_by_id('legacy').property_by_id('item.colour').values == {}
+    assert Translation(dictionary, 'legacy').translate({'COLOUR': 'red', 'SIZE': 1}) == \
+        {'item.colour': 'red', 'item.size': 1}
+    with pytest.raises(DictionaryLoadingError, match='must be a mapping'):
+        make_dictionary({'properties': [{'property': 'item.colour', 'name': 'c',
+                                         'values': ['red']}]})
+
+
+def test_dialects_in_snapshots(tmp_path):
+    dictionary = Dictionary.from_yaml_dictionary(DIALECTS_PATH)
+    path = tmp_path / 'dictionary.snapshot'
+    snapshot.write_snapshot(dictionary, path, snapshot.source_hash(DIALECTS_PATH))
+    with MappedDictionary(path, DIALECTS_PATH) as mapped:
+        for loaded in (Dictionary.from_snapshot(path, DIALECTS_PATH), mapped):
+            assert [d.id for d in loaded.dialects] == ['legacy', 'web']
+            assert loaded.dialect_by_id('web').property_by_id('item.colour').values == \
+                {1: 'red', 2: 'green'}
+            assert compile_translation(loaded, 'legacy', 'web').translate(LEGACY) == WEB
@@ -18,3 +18,8 @@ def test_validation():
         assert False
     main([str(Path(__file__).parent / 'data' /
               'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml')])
+
+
+def test_validation_parallel():
+    assert main(['-j', '2', str(Path(__file__).parent / 'data' /
+                                'dictionary_loading' / 'dictionary_ok' / 'dictionary.yaml')]) == 0
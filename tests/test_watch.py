@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import socket
+from types import SimpleNamespace
+from property_rosetta.cache import MemoryParseCache
+from property_rosetta.dictionary import Dictionary
+from property_rosetta.watch import DictionaryWatcher, serve, request, _is_yaml_change
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+
+@pytest.fixture
+def dictionary_path(copy_dictionary):
+    return copy_dictionary('validation/dictionary_invalid')
+
+
+def fix_unknown_type(dictionary_path):
+    first = dictionary_path.parent/'properties-by-entity'/'first.yaml'
+    first.write_text(first.read_text().replace('nosuchtype', 'int32'))
+
+
+def test_memory_parse_cache(dictionary_path):
+    cache = MemoryParseCache()
+    expected = Dictionary.from_yaml_dictionary(dictionary_path)
+    Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    # the properties of the duplicated entity are read twice
+    assert (cache.hits, cache.misses) == (1, 5)
+    result = Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    assert (cache.hits, cache.misses) == (7, 5)
+    assert [p.id for e in result.entities for p in e.properties] == \
+        [p.id for e in expected.entities for p in e.properties]
+    fix_unknown_type(dictionary_path)
+    Dictionary.from_yaml_dictionary(dictionary_path, cache=cache)
+    assert (cache.hits, cache.misses) == (12, 6)
+
+
+def test_watcher_revalidates_changes(dictionary_path):
+    with DictionaryWatcher(dictionary_path, polling=True, interval=0.01) as watcher:
+        result = watcher.current()
+        assert result['generation'] == 1
+        assert result['errors'] == 3
+        assert watcher.current() is result
+        assert not watcher.wait(0.05)
+
+        fix_unknown_type(dictionary_path)
+        assert watcher.wait(5)
+        result = watcher.current()
+        assert result['generation'] == 2
+        assert result['errors'] == 2
+        assert 'property-type-resolves' not in [i['rule'] for i in result['issues']]
+
+        (dictionary_path.parent/'entities.yaml').write_text('- {broken')
+        result = watcher.current()
+        assert result['generation'] == 3
+        assert result['error']
+        assert watcher.dictionary.id == 'invalid.dictionary'
+
+
+@pytest.mark.parametrize('polling', [True, False])
+def test_watcher_ignores_other_files(dictionary_path, polling):
+    if not polling:
+        pytest.importorskip('watchdog')
+    with DictionaryWatcher(dictionary_path, polling=polling, interval=0.01) as watcher:
+        result = watcher.current()
+        for f in dictionary_path.parent.rglob('*.yaml'):
+            f.read_bytes()
+        (dictionary_path.parent/'notes.txt').write_text('not a dictionary file')
+        (dictionary_path.parent/'data-types.yaml.swp').write_text('')
+        assert not watcher.wait(0.2)
+        assert watcher.current() is result
+        assert watcher.generation == 1
+
+
+def test_only_changes_of_yaml_files_count(tmp_path):
+    def event(event_type, src_path, dest_path=''):
+        return SimpleNamespace(event_type=event_type, src_path=src_path, dest_path=dest_path)
+    yaml = str(tmp_path/'dictionary'/'entities.yaml')
+    for event_type in ('created', 'modified', 'deleted'):
+        assert _is_yaml_change(event(event_type, yaml), tmp_path)
+    assert _is_yaml_change(event('modified', yaml.encode()), tmp_path)
+    assert _is_yaml_change(event('moved', yaml + '.tmp', yaml), tmp_path)
+    assert _is_yaml_change(event('moved', yaml, yaml + '.bak'), tmp_path)
+    for event_type in ('opened', 'closed', 'closed_no_write'):
+        assert not _is_yaml_change(event(event_type, yaml), tmp_path)
+    assert not _is_yaml_change(event('modified', str(tmp_path/'dictionary')), tmp_path)
+    assert not _is_yaml_change(event('modified', yaml + '.swp'), tmp_path)
+    assert not _is_yaml_change(event('modified', yaml), tmp_path/'elsewhere')
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs local sockets')
+def test_watcher_server(dictionary_path, tmp_path):
+    with DictionaryWatcher(dictionary_path, polling=True) as watcher:
+        server = serve(watcher, tmp_path/'rosetta.sock')
+        try:
+            result = request(tmp_path/'rosetta.sock', timeout=10)
+            assert (result['generation'], result['errors']) == (1, 3)
+            fix_unknown_type(dictionary_path)
+            result = request(tmp_path/'rosetta.sock', timeout=10)
+            assert (result['generation'], result['errors']) == (2, 2)
+            assert request(tmp_path/'rosetta.sock', 'reload', timeout=10)['generation'] == 3
+            assert request(tmp_path/'rosetta.sock', 'unknown', timeout=10)['error']
+            with pytest.raises(OSError):
+                serve(watcher, tmp_path/'rosetta.sock')
+        finally:
+            server.shutdown()
+            server.server_close()
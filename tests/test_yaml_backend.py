@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import yaml
+from pathlib import Path
+from property_rosetta import yaml_backend
+from property_rosetta.dictionary import Dictionary, DictionaryLoadingError
+
+__author__ = "Claudio Bantaloukas"
+__copyright__ = "Claudio Bantaloukas"
+__license__ = "new-bsd"
+
+TEST_FILES_PATH = Path(__file__).parent / 'data' / 'dictionary_loading'
+
+
+@pytest.fixture
+def restore_backend():
+    yield
+    yaml_backend.set_backend(None)
+
+
+def test_backend_selection(restore_backend):
+    available = yaml_backend.available_backends()
+    assert yaml_backend.PYTHON in available
+    assert yaml_backend.get_backend() == available[0]
+    if yaml.__with_libyaml__:
+        assert yaml_backend.get_backend() == yaml_backend.LIBYAML
+        assert yaml_backend.loader() is yaml.CSafeLoader
+    yaml_backend.set_backend(yaml_backend.PYTHON)
+    assert yaml_backend.get_backend() == yaml_backend.PYTHON
+    assert yaml_backend.loader() is yaml.SafeLoader
+    yaml_backend.set_backend(None)
+    assert yaml_backend.get_backend() == available[0]
+    with pytest.raises(ValueError):
+        yaml_backend.set_backend('fast')
+    with pytest.raises(ValueError):
+        yaml_backend.get_backend('fast')
+
+
+@pytest.mark.parametrize('backend', yaml_backend.available_backends())
+def test_backends_load_the_same_dictionary(backend):
+    path = TEST_FILES_PATH/'dictionary_ok'/'dictionary.yaml'
+    result = Dictionary.from_yaml_dictionary(path, backend=backend)
+    assert result.yaml_backend == backend
+    assert result.version == '0.0.1'
+    assert result.entities[0].property_by_id('ok.index').attributes['important']
+    assert yaml_backend.load('a: [1, yes, ~]', backend) == {
+        'a': [1, True, None]}
+
+
+@pytest.mark.parametrize('backend', yaml_backend.available_backends())
+def test_backends_raise_loading_errors(backend):
+    with pytest.raises(DictionaryLoadingError):
+        Dictionary.from_yaml_dictionary(
+            TEST_FILES_PATH/'nonexistent.yaml', backend=backend)
+    with pytest.raises(yaml.YAMLError):
+        yaml_backend.load('a: [1', backend)
+
+
+@pytest.mark.parametrize('backend', yaml_backend.available_backends())
+def test_backends_stream_list_items(backend):
+    items = yaml_backend.iter_items('- a: 1\n- &x {b: [1, 2]}\n- *x\n', backend)
+    assert next(items) == {'a': 1}
+    assert list(items) == [{'b': [1, 2]}, {'b': [1, 2]}]
+    assert list(yaml_backend.iter_items('', backend)) == []
+    assert list(yaml_backend.iter_items('---\n', backend)) == []
+    for invalid in ['a: 1', '- 1\n---\n- 2', '- [1']:
+        with pytest.raises(yaml.YAMLError):
+            list(yaml_backend.iter_items(invalid, backend))
+    assert yaml_backend.list_items(yaml_backend.load('', backend)) == []
+    with pytest.raises(yaml.YAMLError):
+        yaml_backend.list_items(yaml_backend.load('a: 1', backend))
+    assert [p['id'] for p in yaml_backend.iter_file_items(
+        TEST_FILES_PATH/'properties_ok.yaml', backend)] == \
+        [p['id'] for p in yaml_backend.load_file(TEST_FILES_PATH/'properties_ok.yaml', backend)]